@@ -0,0 +1,53 @@
+"""
+Gunicorn Config
+Production serving: the app and shared state are loaded once in the master (preload_app) and forked into workers
+"""
+
+import gc
+import os
+import multiprocessing
+
+# main.py leaves building the app to create_prefork_app(), so nothing starts threads in the master on import
+os.environ["PIPELINE_SERVER"] = "gunicorn"
+
+wsgi_app = "main:create_prefork_app()"
+preload_app = True
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+workers = int(os.environ["WEB_CONCURRENCY"]) if os.environ.get("WEB_CONCURRENCY") else (os.cpu_count() or 1)
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Requests in flight get this long to finish on shutdown, like the built-in prefork server
+graceful_timeout = 30
+
+def _log_queue():
+    from src.utils.logger import get_worker_log_queue
+    # A spawn-context queue, so the spawned video workers can be handed the same one
+    return get_worker_log_queue(multiprocessing.get_context("spawn"))
+
+def when_ready(server):
+    """Master: create the log queue workers write to and keep the video worker pool running"""
+    
+    from src.services.prefork_server import start_video_pool_supervisor
+    from src.services.video_job_queue import get_worker_pool
+    
+    _log_queue()
+    # Created here, before any worker forks, so post_fork finds the pool without waiting on a lock
+    start_video_pool_supervisor(get_worker_pool())
+
+def pre_fork(server, worker):
+    # Keeps the collector in the worker from copying the pages it shares with the master
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Worker: log through the master, leave it the video pool, then start this worker's background services"""
+    
+    from main import start_background_services
+    from src.services.prefork_server import init_forked_worker
+    
+    init_forked_worker(_log_queue(), {"mode": "gunicorn", "workers": workers})
+    start_background_services()
+
+def on_exit(server):
+    from src.services.video_job_queue import get_worker_pool
+    get_worker_pool().stop()
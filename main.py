@@ -1,52 +1,128 @@
 import os
 import sys
+import threading
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.routes.content_generation import content_bp
-from src.routes.topic_selection import topic_bp
-from src.routes.pipeline_status import status_bp
-from src.routes.media_generation import media_bp
-from src.routes.video_generation import video_bp
-from src.routes.publishing import publishing_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Enable CORS for all routes
-CORS(app)
-
-# Register blueprints for different pipeline components
-app.register_blueprint(content_bp, url_prefix='/api/content')
-app.register_blueprint(topic_bp, url_prefix='/api/topics')
-app.register_blueprint(status_bp, url_prefix='/api/status')
-app.register_blueprint(media_bp, url_prefix='/api/media')
-app.register_blueprint(video_bp, url_prefix='/api/video')
-app.register_blueprint(publishing_bp, url_prefix='/api/publishing')
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
+from src.services.startup_report import get_startup_report, init_app_startup_report
+
+with get_startup_report().phase("import_flask"):
+    from flask import Flask
+    from flask_cors import CORS
+
+from src.services.tracing import init_app_tracing
+from src.services.sampling_profiler import init_app_profiling
+from src.services.static_manifest import StaticManifest, send_static_file
+from src.utils.logger import configure_logging
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+def create_app(background_services: bool = True) -> Flask:
+    """Build the API app; pipeline services are constructed on first use, not here
+    
+    The prefork server passes background_services=False and starts them in each
+    worker after fork instead, since threads don't survive a fork.
+    """
+    
+    report = get_startup_report()
+    
+    with report.phase("configure_logging"):
+        # Structured logs go through a background queue to a rotating file and the in-memory ring
+        configure_logging()
+    
+    with report.phase("create_flask_app"):
+        app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+        app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+        
+        # Enable CORS for all routes
+        CORS(app)
+        
+        # Every request gets a root trace span; X-Trace-Id / traceparent headers continue a caller's trace
+        init_app_tracing(app)
+        
+        # Track which endpoint each request thread serves so on-demand profiles can break down by endpoint
+        init_app_profiling(app)
+        
+        init_app_startup_report(app)
+    
+    with report.phase("register_blueprints"):
+        from src.routes.content_generation import content_bp
+        from src.routes.topic_selection import topic_bp
+        from src.routes.pipeline_status import status_bp
+        from src.routes.media_generation import media_bp
+        from src.routes.video_generation import video_bp
+        from src.routes.publishing import publishing_bp
+        
+        # Register blueprints for different pipeline components
+        app.register_blueprint(content_bp, url_prefix='/api/content')
+        app.register_blueprint(topic_bp, url_prefix='/api/topics')
+        app.register_blueprint(status_bp, url_prefix='/api/status')
+        app.register_blueprint(media_bp, url_prefix='/api/media')
+        app.register_blueprint(video_bp, url_prefix='/api/video')
+        app.register_blueprint(publishing_bp, url_prefix='/api/publishing')
+    
+    with report.phase("build_static_manifest"):
+        # Dashboard files are hashed and loaded once; requests are answered from memory
+        static_manifest = StaticManifest(app.static_folder).build() if app.static_folder else None
+        app.extensions['static_manifest'] = static_manifest
+    
+    if background_services:
+        with report.phase("start_background_services"):
+            start_background_services()
+            if static_manifest is not None:
+                static_manifest.compress_async()
+    
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if static_manifest is None:
+            return "Static folder not configured", 404
+        
+        # Anything that isn't a static file is a dashboard route, answered with index.html
+        entry = (static_manifest.get(path) if path else None) or static_manifest.get('index.html')
+        if entry is None:
             return "index.html not found", 404
+        return send_static_file(entry)
+    
+    report.mark_ready()
+    return app
+
+def create_prefork_app() -> Flask:
+    """The app for a forking server (gunicorn with preload_app): shared state loaded, background services left to workers"""
+    
+    from src.services.prefork_server import preload_shared_state
+    
+    app = create_app(background_services=False)
+    preload_shared_state(app)
+    return app
 
+def start_background_services():
+    """Start this process's background work without waiting on any of it"""
+    
+    from src.services.ffmpeg_capabilities import get_capability_registry
+    
+    # Probe the ffmpeg toolchain once, off the startup path
+    get_capability_registry().probe_async()
+    
+    # Sample system resources in the background so health checks never wait on a measurement;
+    # psutil is imported on that thread rather than here
+    threading.Thread(target=_start_resource_sampler, name="resource-sampler-start", daemon=True).start()
 
-if __name__ == '__main__':
-    app.run(
-        host='0.0.0.0',  # Allow external access
-        port=5001,
-        debug=True
-    )
+def _start_resource_sampler():
+    from src.services.resource_sampler import get_resource_sampler
+    get_resource_sampler()
 
+if __name__ == '__main__' and '--production' in sys.argv[1:]:
+    # Multi-worker production server: services and catalogs are loaded once and forked into
+    # WEB_CONCURRENCY workers (default: one per CPU) listening on PORT (default 5001)
+    from src.services.prefork_server import serve_prefork
+    serve_prefork(create_app(background_services=False), worker_init=start_background_services)
+elif __name__ != '__mp_main__' and os.environ.get('PIPELINE_SERVER') != 'gunicorn':
+    # Spawned video workers import this file as __mp_main__; they don't serve the API, so skip building it.
+    # Under gunicorn (gunicorn.conf.py), create_prefork_app() builds it instead
+    app = create_app()
+    
+    if __name__ == '__main__':
+        app.run(
+            host='0.0.0.0',  # Allow external access
+            port=5001,
+            debug=True
+        )
@@ -9,6 +9,9 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+from src.services.metrics_registry import operation_timer
+from src.services.tracing import trace_span
+
 class ContentType(Enum):
     ALPHABET = "alphabet"
     NUMBERS = "numbers"
@@ -51,6 +54,8 @@ class ScriptGenerator:
         self.templates = self._load_templates()
         self.character_database = self._load_characters()
     
+    @operation_timer("script_generation")
+    @trace_span("script_generation", category="script")
     def generate_script(self, request: ContentRequest) -> GeneratedScript:
         """Generate a complete script based on the content request"""
         
@@ -5,10 +5,29 @@ Handles AI-powered generation of visual assets and audio content
 
 import json
 import random
+import re
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from enum import Enum
 import os
+import threading
+import contextvars
+
+from src.utils.media_tools import (
+    generate_speech, generate_audio, get_wav_duration,
+    concatenate_wav_files
+)
+from src.services.video_assembler import FilterGraphRenderer, SegmentedRenderer
+from src.services.metrics_registry import operation_timer, RENDERED_VIDEO_SECONDS
+from src.services.tracing import trace_span
+from src.services.config_store import get_config
+
+def _stable_hash(text: str) -> str:
+    """Short content hash that, unlike hash(), is the same in every process"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
 
 class VisualStyle(Enum):
     BRIGHT_COLORFUL = "bright_colorful"
@@ -41,6 +60,16 @@ class AudioAsset:
     duration_seconds: float
     metadata: Dict[str, Any]
 
+@dataclass
+class NarrationSegment:
+    segment_id: str
+    section: str
+    text: str
+    file_path: str
+    start_seconds: float
+    duration_seconds: float
+    synthesized: bool  # False when served from the sentence cache
+
 class VisualGenerator:
     """Generates visual assets for educational videos"""
     
@@ -81,11 +110,11 @@ class VisualGenerator:
         background_prompt = self._build_background_prompt(scene_description, style)
         
         asset = VisualAsset(
-            asset_id=f"bg_{hash(scene_description)}_{style.value}",
+            asset_id=f"bg_{_stable_hash(scene_description)}_{style.value}",
             asset_type="background",
             description=f"Background for: {scene_description}",
             style=style,
-            file_path=f"/assets/backgrounds/bg_{hash(scene_description)}.png",
+            file_path=f"/assets/backgrounds/bg_{_stable_hash(scene_description)}_{style.value}.png",
             metadata={
                 "scene_description": scene_description,
                 "generation_prompt": background_prompt,
@@ -124,11 +153,11 @@ class VisualGenerator:
         """Generate text overlay for educational content"""
         
         asset = VisualAsset(
-            asset_id=f"text_{hash(text)}_{style.value}",
+            asset_id=f"text_{_stable_hash(text)}_{style.value}",
             asset_type="text_overlay",
             description=f"Text overlay: {text[:50]}...",
             style=style,
-            file_path=f"/assets/text/text_{hash(text)}.png",
+            file_path=f"/assets/text/text_{_stable_hash(text)}.png",
             metadata={
                 "text_content": text,
                 "position": position,
@@ -351,57 +380,136 @@ class VisualGenerator:
 class AudioGenerator:
     """Generates audio assets for educational videos"""
     
-    def __init__(self):
+    # Music beds are generated once per (style, key) at this length and then
+    # looped or trimmed to each video's duration during assembly
+    MUSIC_BED_SECONDS = 60.0
+    MUSIC_BED_CROSSFADE_SECONDS = 2.0
+    
+    def __init__(self, assets_dir: Optional[str] = None, max_synthesis_workers: Optional[int] = None):
+        if assets_dir is None:
+            assets_dir = os.path.join(os.getcwd(), "generated-assets")
+        self.assets_dir = assets_dir
+        self.voice_dir = os.path.join(assets_dir, "audio", "voice")
+        self.voice_segment_dir = os.path.join(self.voice_dir, "segments")
+        self.music_bed_dir = os.path.join(assets_dir, "audio", "music", "beds")
+        # None follows system_settings.max_tts_workers, read for each narration
+        self.max_synthesis_workers = max_synthesis_workers
+        self._music_bed_locks: Dict[str, threading.Lock] = {}
+        self._music_bed_locks_guard = threading.Lock()
         self.music_templates = self._load_music_templates()
         self.voice_settings = self._load_voice_settings()
         self.sound_effect_library = self._load_sound_effect_library()
     
     def generate_background_music(self, content_type: str, age_group: str, 
                                  duration_seconds: float, style: AudioStyle) -> AudioAsset:
-        """Generate background music for educational content"""
+        """Generate background music for educational content
         
-        music_prompt = self._build_music_prompt(content_type, age_group, style)
+        Music is served from a library of loopable beds, one per (style, key), so
+        videos of any length share the same bed instead of generating new music.
+        """
+        
+        key = self._get_key_for_content(content_type)
+        music_bed = self.get_music_bed(style, key)
         
         asset = AudioAsset(
-            asset_id=f"music_{content_type}_{age_group}_{style.value}",
+            asset_id=music_bed["bed_id"],
             asset_type="music",
             description=f"Background music for {content_type} content ({age_group})",
             style=style,
-            file_path=f"/assets/audio/music_{content_type}_{style.value}.mp3",
+            file_path=music_bed["file_path"],
             duration_seconds=duration_seconds,
             metadata={
                 "content_type": content_type,
                 "age_group": age_group,
-                "generation_prompt": music_prompt,
+                "generation_prompt": music_bed["generation_prompt"],
                 "tempo": self._get_tempo_for_style(style),
-                "key": self._get_key_for_content(content_type),
-                "format": "MP3",
-                "bitrate": "320kbps"
+                "key": key,
+                "bed_duration_seconds": music_bed["duration_seconds"],
+                "loop": True,
+                "crossfade_seconds": self.MUSIC_BED_CROSSFADE_SECONDS,
+                "generated_now": music_bed["generated_now"],
+                "audio_available": music_bed["audio_available"],
+                "format": "WAV"
             }
         )
         
         return asset
     
+    def get_music_bed(self, style: AudioStyle, key: str) -> Dict[str, Any]:
+        """Get the loopable music bed for a style and key, generating it only once"""
+        
+        key_slug = key.lower().replace(" ", "_")
+        bed_id = f"music_bed_{style.value}_{key_slug}"
+        file_path = os.path.join(self.music_bed_dir, f"{bed_id}.wav")
+        music_prompt = self._build_music_bed_prompt(style, key)
+        generated_now = False
+        
+        with self._music_bed_locks_guard:
+            bed_lock = self._music_bed_locks.setdefault(bed_id, threading.Lock())
+        
+        # Concurrent requests for the same bed wait for a single generation
+        with bed_lock:
+            if not os.path.exists(file_path):
+                os.makedirs(self.music_bed_dir, exist_ok=True)
+                generated_now = generate_audio(music_prompt, file_path, self.MUSIC_BED_SECONDS)
+        
+        audio_available = os.path.exists(file_path)
+        bed_duration = get_wav_duration(file_path) if audio_available else None
+        
+        return {
+            "bed_id": bed_id,
+            "style": style.value,
+            "key": key,
+            "file_path": file_path,
+            "generation_prompt": music_prompt,
+            "duration_seconds": bed_duration or self.MUSIC_BED_SECONDS,
+            "generated_now": generated_now,
+            "audio_available": audio_available
+        }
+    
     def generate_voice_narration(self, script_text: str, character_name: str, 
                                 age_group: str) -> AudioAsset:
-        """Generate voice narration for script"""
+        """Generate voice narration for script
+        
+        The script is split into sentences along its section structure and each
+        sentence is synthesized (in parallel) and cached on its own, keyed by text,
+        character and voice settings. Editing one sentence only re-synthesizes that
+        sentence; the narration is then re-joined from the cached pieces.
+        """
         
         voice_settings = self._get_voice_settings(character_name, age_group)
+        sentences = self._split_script_sentences(script_text)
+        segments = self._synthesize_sentences(sentences, character_name, voice_settings)
+        
+        narration_key = hashlib.sha256(
+            "|".join(segment.segment_id for segment in segments).encode("utf-8")
+        ).hexdigest()[:16]
+        character_slug = character_name.replace(" ", "_")
+        file_path = os.path.join(self.voice_dir, f"voice_{character_slug}_{narration_key}.wav")
+        
+        segment_files = [segment.file_path for segment in segments if os.path.exists(segment.file_path)]
+        if segments and len(segment_files) == len(segments) and not os.path.exists(file_path):
+            concatenate_wav_files(segment_files, file_path)
+        
+        duration_seconds = sum(segment.duration_seconds for segment in segments)
         
         asset = AudioAsset(
-            asset_id=f"voice_{character_name}_{hash(script_text)}",
+            asset_id=f"voice_{character_slug}_{narration_key}",
             asset_type="voice",
             description=f"Voice narration by {character_name}",
             style=AudioStyle.EDUCATIONAL_FOCUSED,
-            file_path=f"/assets/audio/voice_{character_name}_{hash(script_text)}.mp3",
-            duration_seconds=self._estimate_speech_duration(script_text),
+            file_path=file_path,
+            duration_seconds=duration_seconds,
             metadata={
                 "character_name": character_name,
                 "script_text": script_text,
                 "voice_settings": voice_settings,
                 "age_group": age_group,
-                "format": "MP3",
-                "bitrate": "320kbps"
+                "segments": [asdict(segment) for segment in segments],
+                "segment_count": len(segments),
+                "segments_synthesized": sum(1 for segment in segments if segment.synthesized),
+                "audio_available": os.path.exists(file_path),
+                "format": "WAV"
             }
         )
         
@@ -413,11 +521,11 @@ class AudioGenerator:
         effect_spec = self.sound_effect_library.get(effect_type, {})
         
         asset = AudioAsset(
-            asset_id=f"sfx_{effect_type}_{hash(context)}",
+            asset_id=f"sfx_{effect_type}_{_stable_hash(context)}",
             asset_type="sound_effect",
             description=f"Sound effect: {effect_type} for {context}",
             style=AudioStyle.PLAYFUL_ENERGETIC,
-            file_path=f"/assets/audio/sfx_{effect_type}.mp3",
+            file_path=os.path.join(self.assets_dir, "audio", "effects", f"sfx_{effect_type}.mp3"),
             duration_seconds=effect_spec.get("duration", 2.0),
             metadata={
                 "effect_type": effect_type,
@@ -549,6 +657,30 @@ class AudioGenerator:
         
         return prompt.strip()
     
+    def _build_music_bed_prompt(self, style: AudioStyle, key: str) -> str:
+        """Build AI prompt for a reusable, loopable music bed"""
+        
+        template = self.music_templates.get(style, {})
+        
+        prompt = f"""
+        Generate a {style.value} instrumental music bed for children's educational videos.
+        
+        Musical requirements:
+        - Tempo: {self._get_tempo_for_style(style)}
+        - Instruments: {', '.join(template.get('instruments', []))}
+        - Mood: {template.get('mood', 'educational and engaging')}
+        - Key signature: {key}
+        - Length: {int(self.MUSIC_BED_SECONDS)} seconds
+        
+        The music should:
+        - Loop seamlessly: the ending must flow back into the beginning
+        - Keep a steady tempo and energy with no intro, outro or final cadence
+        - Support narration without being distracting
+        - Be copyright-free and original
+        """
+        
+        return prompt.strip()
+    
     def _get_voice_settings(self, character_name: str, age_group: str) -> Dict[str, Any]:
         """Get voice settings for character"""
         
@@ -562,6 +694,122 @@ class AudioGenerator:
         
         return settings
     
+    def _split_script_sentences(self, script_text: str) -> List[Dict[str, str]]:
+        """Split a script into narratable sentences, keeping the section each belongs to"""
+        
+        sentences = []
+        header_pattern = re.compile(r'^([A-Z][A-Z _]*):\s*(.*)$')
+        
+        # Sections are separated by blank lines, matching ScriptGenerator._generate_scenes
+        for section_text in script_text.split('\n\n'):
+            lines = [line.strip() for line in section_text.strip().split('\n') if line.strip()]
+            if not lines:
+                continue
+            
+            section = "NARRATION"
+            header_match = header_pattern.match(lines[0])
+            if header_match:
+                section = header_match.group(1).strip()
+                lines = ([header_match.group(2)] if header_match.group(2) else []) + lines[1:]
+            
+            for line in lines:
+                for sentence in re.split(r'(?<=[.!?])\s+', line):
+                    if sentence.strip():
+                        sentences.append({"section": section, "text": sentence.strip()})
+        
+        return sentences
+    
+    def _synthesize_sentences(self, sentences: List[Dict[str, str]], character_name: str,
+                              voice_settings: Dict[str, Any]) -> List[NarrationSegment]:
+        """Synthesize sentences in parallel, reusing cached sentence audio"""
+        
+        os.makedirs(self.voice_segment_dir, exist_ok=True)
+        
+        # Identical sentences share one cache entry, so each is synthesized at most once
+        unique_sentences = {}
+        for sentence in sentences:
+            segment_id = self._get_sentence_cache_key(sentence["text"], character_name, voice_settings)
+            sentence["segment_id"] = segment_id
+            unique_sentences.setdefault(segment_id, sentence["text"])
+        
+        # Each sentence runs in its own copy of this context so its span joins the current trace
+        contexts = [contextvars.copy_context() for _ in unique_sentences]
+        max_workers = self.max_synthesis_workers or get_config().get("system_settings", "max_tts_workers")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(
+                unique_sentences.keys(),
+                executor.map(
+                    lambda context, item: context.run(self._synthesize_sentence, item[0], item[1], voice_settings),
+                    contexts, unique_sentences.items()
+                )
+            ))
+        
+        segments = []
+        start_seconds = 0.0
+        synthesized_ids = set()
+        for sentence in sentences:
+            segment_id = sentence["segment_id"]
+            file_path, duration_seconds, synthesized = results[segment_id]
+            segments.append(NarrationSegment(
+                segment_id=segment_id,
+                section=sentence["section"],
+                text=sentence["text"],
+                file_path=file_path,
+                start_seconds=start_seconds,
+                duration_seconds=duration_seconds,
+                synthesized=synthesized and segment_id not in synthesized_ids
+            ))
+            if synthesized:
+                synthesized_ids.add(segment_id)
+            start_seconds += duration_seconds
+        
+        return segments
+    
+    @trace_span("tts_sentence", category="asset")
+    def _synthesize_sentence(self, segment_id: str, text: str,
+                             voice_settings: Dict[str, Any]) -> tuple:
+        """Synthesize one sentence unless it is already cached"""
+        
+        file_path = os.path.join(self.voice_segment_dir, f"{segment_id}.wav")
+        synthesized = False
+        
+        # Empty or unreadable entries (an older interrupted write) are misses, not hits
+        duration_seconds = get_wav_duration(file_path) if os.path.exists(file_path) else None
+        if not duration_seconds:
+            duration_seconds = None
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            # Synthesize under a private name and publish only a complete, readable file
+            handle, temp_path = tempfile.mkstemp(dir=self.voice_segment_dir, suffix=".partial.wav")
+            os.close(handle)
+            try:
+                if generate_speech(text, temp_path, voice_settings):
+                    duration_seconds = get_wav_duration(temp_path) or None
+                    if duration_seconds is not None:
+                        os.replace(temp_path, file_path)
+                        synthesized = True
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        
+        # Prefer the measured duration; fall back to the pacing estimate without audio
+        if duration_seconds is None:
+            duration_seconds = self._estimate_speech_duration(text)
+        
+        return file_path, duration_seconds, synthesized
+    
+    def _get_sentence_cache_key(self, text: str, character_name: str,
+                                voice_settings: Dict[str, Any]) -> str:
+        """Build the cache key for a synthesized sentence"""
+        
+        key_data = json.dumps({
+            "text": text,
+            "character_name": character_name,
+            "voice_settings": voice_settings
+        }, sort_keys=True)
+        
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()[:24]
+    
     def _estimate_speech_duration(self, script_text: str) -> float:
         """Estimate speech duration for script text"""
         
@@ -599,27 +847,40 @@ class AudioGenerator:
 class VideoAssembler:
     """Assembles visual and audio assets into final video"""
     
-    def __init__(self):
+    def __init__(self, assets_dir: Optional[str] = None):
+        if assets_dir is None:
+            assets_dir = os.path.join(os.getcwd(), "generated-assets")
+        self.assets_dir = assets_dir
         self.rendering_settings = self._load_rendering_settings()
+        self.render_profiles = self._load_render_profiles(self.rendering_settings)
+        self._pcm_cache = None
     
+    @trace_span("assemble_video", category="render")
     def assemble_video(self, script_data: Dict[str, Any], visual_assets: List[VisualAsset],
-                      audio_assets: List[AudioAsset]) -> Dict[str, Any]:
+                      audio_assets: List[AudioAsset], render_profile: str = "final") -> Dict[str, Any]:
         """Assemble final video from assets"""
         
         # Create video assembly plan
         assembly_plan = self._create_assembly_plan(script_data, visual_assets, audio_assets)
         
-        # Generate video file (mock implementation)
-        video_file_path = f"/assets/videos/video_{hash(str(script_data))}.mp4"
+        video_name = f"video_{_stable_hash(json.dumps(script_data, sort_keys=True, default=str))}"
+        video_file_path = self.get_video_path(video_name, render_profile)
+        
+        render_result = self.render_plan(assembly_plan, video_file_path, render_profile)
+        settings = self.render_profiles[render_profile]
         
         # Video metadata
         video_metadata = {
             "title": script_data.get("title", "Educational Video"),
-            "duration_seconds": script_data.get("duration_minutes", 5) * 60,
-            "resolution": "1920x1080",
-            "framerate": "30fps",
+            "duration_seconds": render_result["duration_seconds"],
+            "resolution": settings["resolution"],
+            "framerate": f"{settings['framerate']}fps",
             "format": "MP4",
             "file_path": video_file_path,
+            "video_name": video_name,
+            "render_profile": render_profile,
+            "rendered": render_result["success"],
+            "render": render_result,
             "assembly_plan": assembly_plan,
             "asset_count": {
                 "visual_assets": len(visual_assets),
@@ -629,6 +890,56 @@ class VideoAssembler:
         
         return video_metadata
     
+    def render_plan(self, assembly_plan: Dict[str, Any], output_path: str,
+                    render_profile: str = "final") -> Dict[str, Any]:
+        """Render an existing assembly plan with a render profile
+        
+        Plans reference already generated assets, so a draft can be re-rendered
+        (promoted) with the final profile without regenerating anything.
+        """
+        
+        if render_profile not in self.render_profiles:
+            raise ValueError(f"Unknown render profile: {render_profile}")
+        
+        settings = self.render_profiles[render_profile]
+        
+        # Multi-scene videos render as cached per-scene segments in parallel;
+        # otherwise the whole plan renders in a single ffmpeg pass
+        if settings.get("segmented") and len(assembly_plan.get("scenes", [])) > 1:
+            renderer = SegmentedRenderer(settings, os.path.join(self.assets_dir, "segments"))
+        else:
+            renderer = FilterGraphRenderer(settings)
+        
+        with operation_timer("render", kind=render_profile) as timer, \
+                trace_span("render", category="render", render_profile=render_profile):
+            # The soundtrack is mixed in-process (crossfaded bed loops, envelopes,
+            # narration) and handed to ffmpeg as a single finished input
+            mix_path = self._get_mix_path(output_path)
+            try:
+                mix_result = self.mix_audio(assembly_plan, renderer.get_plan_duration(assembly_plan), mix_path)
+                audio_path = mix_path if mix_result.get("written") else None
+                render_result = renderer.render(assembly_plan, output_path, audio_path=audio_path)
+            finally:
+                if os.path.exists(mix_path):
+                    os.remove(mix_path)
+            if not render_result["success"]:
+                timer.status = "failed"
+        render_result["render_profile"] = render_profile
+        render_result["audio_mix"] = {
+            key: mix_result.get(key)
+            for key in ("written", "clips_placed", "clips_skipped", "peak_before_limiting", "total_seconds")
+        }
+        if render_result["success"]:
+            RENDERED_VIDEO_SECONDS.inc(render_result.get("duration_seconds") or 0, render_profile=render_profile)
+        
+        return render_result
+    
+    def get_video_path(self, video_name: str, render_profile: str = "final") -> str:
+        """Output path for a video; non-final profiles get a suffix so renders coexist"""
+        
+        suffix = "" if render_profile == "final" else f"_{render_profile}"
+        return os.path.join(self.assets_dir, "videos", f"{video_name}{suffix}.mp4")
+    
     def _create_assembly_plan(self, script_data: Dict[str, Any], 
                              visual_assets: List[VisualAsset],
                              audio_assets: List[AudioAsset]) -> Dict[str, Any]:
@@ -644,35 +955,161 @@ class VideoAssembler:
             "effects": []
         }
         
+        backgrounds = [asset for asset in visual_assets if asset.asset_type == "background"]
+        character_assets = {
+            asset.metadata.get("character_name"): asset
+            for asset in visual_assets if asset.asset_type == "character"
+        }
+        
         # Plan each scene
         for i, scene in enumerate(scenes):
+            characters = script_data.get("character_list", [])
+            background = backgrounds[i % len(backgrounds)] if backgrounds else None
+            
             scene_plan = {
                 "scene_number": i + 1,
                 "duration_seconds": scene.get("duration_seconds", 30),
                 "visual_elements": scene.get("visual_elements", []),
                 "character_actions": scene.get("character_actions", []),
-                "background": f"background_{i}",
-                "characters": script_data.get("character_list", []),
-                "text_overlays": []
+                "background": background.asset_id if background else f"background_{i}",
+                "background_path": background.file_path if background else None,
+                "characters": characters,
+                "character_assets": [
+                    {"name": name, "file_path": character_assets[name].file_path}
+                    for name in characters if name in character_assets
+                ],
+                "text_overlays": scene.get("text_overlays", [])
             }
             
             assembly_plan["scenes"].append(scene_plan)
         
-        # Plan audio timeline
+        # Looping cues are filled from the shared music bed; the mixer tiles it
+        # to each cue's length around a crossfaded seam
+        music_beds = [asset for asset in audio_assets
+                      if asset.asset_type == "music" and asset.metadata.get("loop")]
+        
+        # Plan audio timeline, clipped to the video; cues written for a longer
+        # runtime than the scenes add up to would otherwise get negative lengths
+        video_duration = sum(scene_plan["duration_seconds"] for scene_plan in assembly_plan["scenes"])
         for audio_cue in audio_cues:
+            start_time = audio_cue.get("start_time", 0)
+            duration = min(audio_cue.get("duration", 30), video_duration - start_time)
+            if duration <= 0:
+                continue
+            
             audio_plan = {
                 "audio_type": audio_cue.get("type", "music"),
-                "start_time": audio_cue.get("start_time", 0),
-                "duration": audio_cue.get("duration", 30),
+                "name": audio_cue.get("name"),
+                "start_time": start_time,
+                "duration": duration,
                 "volume": audio_cue.get("volume", 0.7),
                 "fade_in": audio_cue.get("fade_in", False),
-                "fade_out": audio_cue.get("fade_out", False)
+                "fade_out": audio_cue.get("fade_out", False),
+                "loop": audio_cue.get("loop", False)
             }
             
+            if audio_plan["loop"] and music_beds:
+                audio_plan["source_path"] = music_beds[0].file_path
+                audio_plan["crossfade_seconds"] = music_beds[0].metadata.get("crossfade_seconds", 0)
+            
             assembly_plan["audio_timeline"].append(audio_plan)
         
+        # Narration runs from the start of the video over the music
+        for asset in audio_assets:
+            if asset.asset_type == "voice":
+                assembly_plan["audio_timeline"].append({
+                    "audio_type": "voice",
+                    "name": asset.asset_id,
+                    "start_time": 0,
+                    "duration": asset.duration_seconds,
+                    "volume": 1.0,
+                    "fade_in": False,
+                    "fade_out": False,
+                    "loop": False,
+                    "source_path": asset.file_path
+                })
+        
         return assembly_plan
     
+    @trace_span("mix_audio", category="render")
+    def mix_audio(self, assembly_plan: Dict[str, Any], duration_seconds: float,
+                  output_path: str) -> Dict[str, Any]:
+        """Mix the plan's audio timeline into a single WAV track
+        
+        Nothing is written when no timeline entry has a source file; the
+        renderers then use a silent track.
+        """
+        
+        from src.utils.audio_mixer import AudioMixer
+        
+        audio_timeline = assembly_plan.get("audio_timeline", [])
+        if not any(entry.get("source_path") and os.path.exists(entry["source_path"]) for entry in audio_timeline):
+            return {"output_path": output_path, "written": False, "clips_placed": [],
+                    "clips_skipped": [entry.get("name") or entry.get("audio_type") for entry in audio_timeline]}
+        
+        mixer = AudioMixer(pcm_cache=self._get_pcm_cache())
+        return mixer.mix(audio_timeline, duration_seconds, output_path)
+    
+    def _get_mix_path(self, output_path: str) -> str:
+        """Unique temporary WAV for one render's soundtrack
+        
+        Mixes live in their own directory, outside the shared temp directory
+        that cleanup empties, so a running render never loses its soundtrack.
+        """
+        
+        mix_dir = os.path.join(self.assets_dir, "mixes")
+        os.makedirs(mix_dir, exist_ok=True)
+        prefix = os.path.splitext(os.path.basename(output_path))[0]
+        handle, mix_path = tempfile.mkstemp(prefix=f"{prefix}_", suffix=".mix.wav", dir=mix_dir)
+        os.close(handle)
+        return mix_path
+    
+    def warm_audio_cache(self, file_paths: List[str]) -> Dict[str, bool]:
+        """Decode reused audio (effects, themes, music beds) into the PCM cache ahead of mixing"""
+        
+        return self._get_pcm_cache().warm([path for path in file_paths if os.path.exists(path)])
+    
+    def _get_pcm_cache(self):
+        """Get the decoded audio cache shared by every mix this assembler runs"""
+        
+        if self._pcm_cache is None:
+            from src.utils.pcm_cache import PCMCache
+            # Effects and music beds are shared across videos; narration is decoded per mix
+            self._pcm_cache = PCMCache(
+                os.path.join(self.assets_dir, "audio", "pcm_cache"),
+                reusable_dirs=[
+                    os.path.join(self.assets_dir, "audio", "effects"),
+                    os.path.join(self.assets_dir, "audio", "music", "beds")
+                ]
+            )
+        
+        return self._pcm_cache
+    
+    def _load_render_profiles(self, final_settings: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Load named render profiles; draft and preview trade quality for turnaround"""
+        
+        return {
+            "draft": {
+                **final_settings,
+                "resolution": "640x360",
+                "framerate": 15,
+                "bitrate": "600k",
+                "audio_bitrate": "96k",
+                "preset": "ultrafast",
+                "quality": "draft"
+            },
+            "preview": {
+                **final_settings,
+                "resolution": "1280x720",
+                "framerate": 24,
+                "bitrate": "2000k",
+                "audio_bitrate": "128k",
+                "preset": "veryfast",
+                "quality": "preview"
+            },
+            "final": final_settings
+        }
+    
     def _load_rendering_settings(self) -> Dict[str, Any]:
         """Load video rendering settings"""
         
@@ -683,6 +1120,11 @@ class VideoAssembler:
             "audio_bitrate": "320k",
             "format": "MP4",
             "codec": "H.264",
+            "encoder": "auto",  # fastest working encoder for the codec, from the capability registry
+            "preset": "medium",
+            "pixel_format": "yuv420p",
+            "segmented": True,
+            "render_timeout_seconds": 3600,
             "quality": "high",
             "optimization": "web"
         }
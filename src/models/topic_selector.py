@@ -12,6 +12,17 @@ from datetime import datetime, timedelta
 from enum import Enum
 
 from src.models.content_generator import ContentType, AgeGroup
+from src.services.metrics_registry import operation_timer, TOPICS_SELECTED, TOPIC_SELECTION_SCORE
+from src.services.tracing import trace_span
+from src.services.config_store import get_config
+from src.services.topic_state_store import TopicStateStore, get_topic_state_store
+from src.utils.logger import get_logger
+
+logger = get_logger("topic_selector")
+
+# Settings in the topic_selection config section that weight the component scores
+SELECTION_WEIGHT_NAMES = ["performance_weight", "freshness_weight", "diversity_weight", "educational_weight",
+                          "seasonal_weight"]
 
 @dataclass
 class TopicPerformance:
@@ -37,32 +48,79 @@ class TopicSelection:
 class TopicSelector:
     """Autonomous topic selection engine based on performance data and strategy"""
     
-    def __init__(self):
-        self.performance_database = self._initialize_performance_database()
+    def __init__(self, state_store: Optional[TopicStateStore] = None):
         self.topic_categories = self._load_topic_categories()
-        self.selection_weights = self._load_selection_weights()
-        self.diversity_tracker = self._initialize_diversity_tracker()
+        
+        # Performance data and selection history live in the shared store so every worker process
+        # selects from the same state; the attributes below are this process's copy of it
+        self._state_store = state_store or get_topic_state_store()
+        self._state_store.seed_performance([
+            self._performance_to_row(key, performance)
+            for key, performance in self._initialize_performance_database().items()
+        ])
+        self._state_version = -1
+        self._performance_database: Dict[str, TopicPerformance] = {}
+        self._diversity_tracker = self._initialize_diversity_tracker()
+        self._sync_state()
+    
+    @property
+    def performance_database(self) -> Dict[str, TopicPerformance]:
+        """Performance data per topic, as currently stored"""
+        
+        self._sync_state()
+        return self._performance_database
     
+    @property
+    def diversity_tracker(self) -> Dict[str, Any]:
+        """Recent selections and selection counts, as currently stored"""
+        
+        self._sync_state()
+        return self._diversity_tracker
+    
+    @operation_timer("topic_selection")
+    @trace_span("topic_selection", category="topic")
     def select_next_topic(self, target_age_group: Optional[AgeGroup] = None) -> TopicSelection:
         """Select the next topic for content generation"""
         
         # Get candidate topics
         candidates = self._get_candidate_topics(target_age_group)
         
-        # Calculate scores for each candidate
-        scored_candidates = []
-        for candidate in candidates:
-            score = self._calculate_topic_score(candidate)
-            scored_candidates.append((candidate, score))
-        
-        # Sort by score and apply diversity filters
-        scored_candidates.sort(key=lambda x: x[1], reverse=True)
+        # One configuration snapshot for the whole selection, so a concurrent update can't mix weights
+        config = get_config()
+        weights = self._get_selection_weights(config)
+        diversity_window = config.get("topic_selection", "diversity_window_size")
         
-        # Select top candidate with diversity consideration
-        selected_topic = self._apply_diversity_selection(scored_candidates)
-        
-        # Update diversity tracker
-        self._update_diversity_tracker(selected_topic)
+        # The store's write lock is held from reading the history to recording the pick, so
+        # concurrent selections in any worker process each see the ones before them
+        with self._state_store.transaction() as connection:
+            self._sync_state(connection)
+            
+            # Calculate scores for each candidate
+            scored_candidates = []
+            for candidate in candidates:
+                score = self._calculate_topic_score(candidate, weights, diversity_window)
+                scored_candidates.append((candidate, score))
+            
+            # Sort by score and apply diversity filters
+            scored_candidates.sort(key=lambda x: x[1], reverse=True)
+            
+            # Select top candidate with diversity consideration
+            selected_topic = self._apply_diversity_selection(scored_candidates)
+            
+            # Record the selection for diversity tracking
+            self._state_store.record_selection(connection, selected_topic.topic, selected_topic.content_type.value,
+                                               selected_topic.age_group.value, time.time())
+        
+        TOPICS_SELECTED.inc(topic=selected_topic.topic, content_type=selected_topic.content_type.value,
+                            age_group=selected_topic.age_group.value)
+        TOPIC_SELECTION_SCORE.observe(selected_topic.priority_score)
+        logger.info(f"Selected next topic: {selected_topic.topic} ({selected_topic.age_group.value})", extra={
+            "details": {
+                "topic": selected_topic.topic,
+                "content_type": selected_topic.content_type.value,
+                "priority_score": round(selected_topic.priority_score, 3)
+            }
+        })
         
         return selected_topic
     
@@ -72,36 +130,50 @@ class TopicSelector:
         
         key = f"{topic}_{content_type.value}_{age_group.value}"
         
-        if key in self.performance_database:
-            # Update existing performance data
-            perf = self.performance_database[key]
-            perf.views += performance_metrics.get('views', 0)
-            perf.watch_time_minutes += performance_metrics.get('watch_time', 0)
-            perf.engagement_rate = (perf.engagement_rate + performance_metrics.get('engagement_rate', 0)) / 2
-            perf.retention_rate = (perf.retention_rate + performance_metrics.get('retention_rate', 0)) / 2
-            perf.success_score = self._calculate_success_score(perf)
-        else:
-            # Create new performance entry
-            self.performance_database[key] = TopicPerformance(
-                topic=topic,
-                content_type=content_type,
-                age_group=age_group,
-                views=performance_metrics.get('views', 0),
-                watch_time_minutes=performance_metrics.get('watch_time', 0),
-                engagement_rate=performance_metrics.get('engagement_rate', 0),
-                retention_rate=performance_metrics.get('retention_rate', 0),
-                last_used=datetime.now(),
-                success_score=0
-            )
-            self.performance_database[key].success_score = self._calculate_success_score(
-                self.performance_database[key]
-            )
+        try:
+            with self._state_store.transaction() as connection:
+                self._sync_state(connection)
+                
+                if key in self._performance_database:
+                    # Update existing performance data
+                    perf = self._performance_database[key]
+                    perf.views += performance_metrics.get('views', 0)
+                    perf.watch_time_minutes += performance_metrics.get('watch_time', 0)
+                    perf.engagement_rate = (perf.engagement_rate + performance_metrics.get('engagement_rate', 0)) / 2
+                    perf.retention_rate = (perf.retention_rate + performance_metrics.get('retention_rate', 0)) / 2
+                    perf.success_score = self._calculate_success_score(perf)
+                else:
+                    # Create new performance entry
+                    self._performance_database[key] = TopicPerformance(
+                        topic=topic,
+                        content_type=content_type,
+                        age_group=age_group,
+                        views=performance_metrics.get('views', 0),
+                        watch_time_minutes=performance_metrics.get('watch_time', 0),
+                        engagement_rate=performance_metrics.get('engagement_rate', 0),
+                        retention_rate=performance_metrics.get('retention_rate', 0),
+                        last_used=datetime.now(),
+                        success_score=0
+                    )
+                    self._performance_database[key].success_score = self._calculate_success_score(
+                        self._performance_database[key]
+                    )
+                
+                self._state_store.save_performance(
+                    connection, self._performance_to_row(key, self._performance_database[key])
+                )
+        except Exception:
+            # The local copy may hold a change that was never stored; reload it next time
+            self._state_version = -1
+            raise
     
     def get_performance_analytics(self) -> Dict[str, Any]:
         """Get comprehensive performance analytics"""
         
+        self._sync_state()
+        
         analytics = {
-            "total_topics": len(self.performance_database),
+            "total_topics": len(self._performance_database),
             "top_performing_topics": self._get_top_performers(10),
             "content_type_performance": self._analyze_content_type_performance(),
             "age_group_performance": self._analyze_age_group_performance(),
@@ -178,16 +250,16 @@ class TopicSelector:
             ]
         }
     
-    def _load_selection_weights(self) -> Dict[str, float]:
-        """Load weighting factors for topic selection algorithm"""
+    @property
+    def selection_weights(self) -> Dict[str, float]:
+        """Weighting factors for the topic selection algorithm, from the live configuration"""
         
-        return {
-            "performance_weight": 0.4,  # Historical performance importance
-            "freshness_weight": 0.2,    # Time since last use
-            "diversity_weight": 0.2,    # Content diversity maintenance
-            "educational_weight": 0.1,  # Educational value priority
-            "seasonal_weight": 0.1      # Seasonal relevance
-        }
+        return self._get_selection_weights(get_config())
+    
+    def _get_selection_weights(self, config) -> Dict[str, float]:
+        """Weighting factors from a configuration snapshot"""
+        
+        return {name: config.get("topic_selection", name) for name in SELECTION_WEIGHT_NAMES}
     
     def _initialize_diversity_tracker(self) -> Dict[str, Any]:
         """Initialize diversity tracking for balanced content selection"""
@@ -218,7 +290,8 @@ class TopicSelector:
         
         return candidates
     
-    def _calculate_topic_score(self, candidate: Dict[str, Any]) -> float:
+    def _calculate_topic_score(self, candidate: Dict[str, Any], weights: Dict[str, float],
+                               diversity_window: int) -> float:
         """Calculate priority score for a topic candidate"""
         
         topic = candidate["topic"]
@@ -227,22 +300,22 @@ class TopicSelector:
         
         # Get performance data
         key = f"{topic}_{content_type.value}_{age_group.value}"
-        performance = self.performance_database.get(key)
+        performance = self._performance_database.get(key)
         
         # Calculate component scores
         performance_score = self._calculate_performance_score(performance)
         freshness_score = self._calculate_freshness_score(performance)
-        diversity_score = self._calculate_diversity_score(content_type, age_group)
+        diversity_score = self._calculate_diversity_score(content_type, age_group, diversity_window)
         educational_score = self._calculate_educational_score(content_type, topic)
         seasonal_score = self._calculate_seasonal_score(topic, content_type)
         
         # Weighted total score
         total_score = (
-            performance_score * self.selection_weights["performance_weight"] +
-            freshness_score * self.selection_weights["freshness_weight"] +
-            diversity_score * self.selection_weights["diversity_weight"] +
-            educational_score * self.selection_weights["educational_weight"] +
-            seasonal_score * self.selection_weights["seasonal_weight"]
+            performance_score * weights["performance_weight"] +
+            freshness_score * weights["freshness_weight"] +
+            diversity_score * weights["diversity_weight"] +
+            educational_score * weights["educational_weight"] +
+            seasonal_score * weights["seasonal_weight"]
         )
         
         return total_score
@@ -280,20 +353,21 @@ class TopicSelector:
         else:
             return 0.2
     
-    def _calculate_diversity_score(self, content_type: ContentType, age_group: AgeGroup) -> float:
+    def _calculate_diversity_score(self, content_type: ContentType, age_group: AgeGroup,
+                                   diversity_window: int = 10) -> float:
         """Calculate diversity score to maintain content balance"""
         
         # Check recent content type usage
-        recent_content_types = self.diversity_tracker["recent_content_types"][-10:]
+        recent_content_types = self._diversity_tracker["recent_content_types"][-diversity_window:]
         content_type_frequency = recent_content_types.count(content_type.value)
         
         # Check recent age group usage
-        recent_age_groups = self.diversity_tracker["recent_age_groups"][-10:]
+        recent_age_groups = self._diversity_tracker["recent_age_groups"][-diversity_window:]
         age_group_frequency = recent_age_groups.count(age_group.value)
         
         # Lower frequency = higher diversity score
-        content_diversity = max(0, 1.0 - (content_type_frequency / 10))
-        age_diversity = max(0, 1.0 - (age_group_frequency / 10))
+        content_diversity = max(0, 1.0 - (content_type_frequency / diversity_window))
+        age_diversity = max(0, 1.0 - (age_group_frequency / diversity_window))
         
         return (content_diversity + age_diversity) / 2
     
@@ -372,34 +446,68 @@ class TopicSelector:
     def _improves_diversity(self, content_type: ContentType, age_group: AgeGroup) -> bool:
         """Check if selection improves content diversity"""
         
-        recent_content_types = self.diversity_tracker["recent_content_types"][-5:]
-        recent_age_groups = self.diversity_tracker["recent_age_groups"][-5:]
+        recent_content_types = self._diversity_tracker["recent_content_types"][-5:]
+        recent_age_groups = self._diversity_tracker["recent_age_groups"][-5:]
         
         # Improves diversity if not recently used
         return (content_type.value not in recent_content_types or 
                 age_group.value not in recent_age_groups)
     
-    def _update_diversity_tracker(self, selection: TopicSelection):
-        """Update diversity tracking with new selection"""
-        
-        self.diversity_tracker["recent_content_types"].append(selection.content_type.value)
-        self.diversity_tracker["recent_age_groups"].append(selection.age_group.value)
-        self.diversity_tracker["recent_topics"].append(selection.topic)
-        
-        # Keep only recent history
-        for key in ["recent_content_types", "recent_age_groups", "recent_topics"]:
-            if len(self.diversity_tracker[key]) > 20:
-                self.diversity_tracker[key] = self.diversity_tracker[key][-20:]
+    def _sync_state(self, connection: Optional[Any] = None):
+        """Reload performance data and selection history if the store changed since the last load"""
+        
+        if self._state_store.get_version(connection) == self._state_version:
+            return
+        
+        state = self._state_store.load(connection)
+        diversity_tracker = self._initialize_diversity_tracker()
+        for selection in state["recent_selections"]:
+            diversity_tracker["recent_content_types"].append(selection["content_type"])
+            diversity_tracker["recent_age_groups"].append(selection["age_group"])
+            diversity_tracker["recent_topics"].append(selection["topic"])
+        diversity_tracker["content_type_counts"].update(state["content_type_counts"])
+        diversity_tracker["age_group_counts"].update(state["age_group_counts"])
+        
+        self._performance_database = {row["key"]: self._row_to_performance(row) for row in state["performance"]}
+        self._diversity_tracker = diversity_tracker
+        self._state_version = state["version"]
+    
+    def _performance_to_row(self, key: str, performance: TopicPerformance) -> Dict[str, Any]:
+        """Store row for a topic's performance"""
         
-        # Update counts
-        self.diversity_tracker["content_type_counts"][selection.content_type.value] += 1
-        self.diversity_tracker["age_group_counts"][selection.age_group.value] += 1
+        return {
+            "key": key,
+            "topic": performance.topic,
+            "content_type": performance.content_type.value,
+            "age_group": performance.age_group.value,
+            "views": performance.views,
+            "watch_time_minutes": performance.watch_time_minutes,
+            "engagement_rate": performance.engagement_rate,
+            "retention_rate": performance.retention_rate,
+            "last_used": performance.last_used.timestamp(),
+            "success_score": performance.success_score
+        }
+    
+    def _row_to_performance(self, row: Dict[str, Any]) -> TopicPerformance:
+        """Topic performance from a store row"""
+        
+        return TopicPerformance(
+            topic=row["topic"],
+            content_type=ContentType(row["content_type"]),
+            age_group=AgeGroup(row["age_group"]),
+            views=row["views"],
+            watch_time_minutes=row["watch_time_minutes"],
+            engagement_rate=row["engagement_rate"],
+            retention_rate=row["retention_rate"],
+            last_used=datetime.fromtimestamp(row["last_used"]),
+            success_score=row["success_score"]
+        )
     
     def _estimate_performance(self, candidate: Dict[str, Any]) -> Dict[str, float]:
         """Estimate performance metrics for a candidate"""
         
         key = f"{candidate['topic']}_{candidate['content_type'].value}_{candidate['age_group'].value}"
-        performance = self.performance_database.get(key)
+        performance = self._performance_database.get(key)
         
         if performance:
             return {
@@ -440,7 +548,7 @@ class TopicSelector:
         """Get top performing topics"""
         
         sorted_topics = sorted(
-            self.performance_database.values(),
+            self._performance_database.values(),
             key=lambda x: x.success_score,
             reverse=True
         )
@@ -463,7 +571,7 @@ class TopicSelector:
         type_performance = {}
         
         for content_type in ContentType:
-            topics = [p for p in self.performance_database.values() 
+            topics = [p for p in self._performance_database.values() 
                      if p.content_type == content_type]
             
             if topics:
@@ -480,7 +588,7 @@ class TopicSelector:
         age_performance = {}
         
         for age_group in AgeGroup:
-            topics = [p for p in self.performance_database.values() 
+            topics = [p for p in self._performance_database.values() 
                      if p.age_group == age_group]
             
             if topics:
@@ -495,14 +603,14 @@ class TopicSelector:
         """Analyze recent performance trends"""
         
         recent_cutoff = datetime.now() - timedelta(days=30)
-        recent_topics = [p for p in self.performance_database.values() 
+        recent_topics = [p for p in self._performance_database.values() 
                         if p.last_used >= recent_cutoff]
         
         if not recent_topics:
             return {"trend": "insufficient_data"}
         
         avg_recent_score = sum(t.success_score for t in recent_topics) / len(recent_topics)
-        all_avg_score = sum(t.success_score for t in self.performance_database.values()) / len(self.performance_database)
+        all_avg_score = sum(t.success_score for t in self._performance_database.values()) / len(self._performance_database)
         
         trend_direction = "improving" if avg_recent_score > all_avg_score else "declining"
         
@@ -517,8 +625,8 @@ class TopicSelector:
         """Calculate content diversity metrics"""
         
         return {
-            "content_type_distribution": self.diversity_tracker["content_type_counts"],
-            "age_group_distribution": self.diversity_tracker["age_group_counts"],
-            "recent_diversity_score": len(set(self.diversity_tracker["recent_content_types"][-10:])) / min(10, len(ContentType))
+            "content_type_distribution": self._diversity_tracker["content_type_counts"],
+            "age_group_distribution": self._diversity_tracker["age_group_counts"],
+            "recent_diversity_score": len(set(self._diversity_tracker["recent_content_types"][-10:])) / min(10, len(ContentType))
         }
 
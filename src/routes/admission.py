@@ -0,0 +1,39 @@
+"""
+Admission Control for Generation Routes
+Turns full queues and busy generation slots into 429 responses with Retry-After
+"""
+
+from functools import wraps
+from typing import Dict, Any, Optional
+from flask import jsonify
+from src.services.video_job_queue import AdmissionRejected, get_job_queue
+
+def admission_rejected_response(rejection: AdmissionRejected):
+    """429 response telling the client when to retry"""
+    
+    response = jsonify({
+        'error': str(rejection),
+        'retry_after_seconds': rejection.retry_after_seconds,
+        'queue_stats': get_job_queue().get_stats(),
+        'status': 'error'
+    })
+    response.headers['Retry-After'] = str(rejection.retry_after_seconds)
+    return response, 429
+
+def admission_controlled(label: str, priority: str = "best_effort", estimate_payload: Optional[Dict[str, Any]] = None):
+    """Run a synchronous generation route inside one of the global generation slots
+    
+    Ad-hoc routes are best-effort: they are refused while they would make a
+    scheduled video miss its publishing slot.
+    """
+    
+    def decorator(route):
+        @wraps(route)
+        def wrapper(*args, **kwargs):
+            try:
+                with get_job_queue().generation_slot(label, priority, estimate_payload):
+                    return route(*args, **kwargs)
+            except AdmissionRejected as e:
+                return admission_rejected_response(e)
+        return wrapper
+    return decorator
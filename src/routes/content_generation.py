@@ -4,16 +4,13 @@ Handles requests for generating educational video content
 """
 
 from flask import Blueprint, request, jsonify
-from src.models.content_generator import ScriptGenerator, ContentRequest, ContentType, AgeGroup
-from src.models.topic_selector import TopicSelector
+from src.models.content_generator import ContentRequest, ContentType, AgeGroup
+from src.services.metrics_registry import CONTENT_VALIDATION_SCORE, CONTENT_VALIDATIONS
+from src.services.service_registry import get_script_generator, get_topic_selector
 import json
 
 content_bp = Blueprint('content', __name__)
 
-# Initialize generators
-script_generator = ScriptGenerator()
-topic_selector = TopicSelector()
-
 @content_bp.route('/generate', methods=['POST'])
 def generate_content():
     """Generate educational content based on request parameters"""
@@ -51,7 +48,7 @@ def generate_content():
         )
         
         # Generate script
-        generated_script = script_generator.generate_script(content_request)
+        generated_script = get_script_generator().generate_script(content_request)
         
         # Convert to JSON-serializable format
         result = {
@@ -96,7 +93,7 @@ def generate_auto_content():
                 }), 400
         
         # Select topic autonomously
-        topic_selection = topic_selector.select_next_topic(target_age_group)
+        topic_selection = get_topic_selector().select_next_topic(target_age_group)
         
         # Determine duration based on age group and content type
         duration_map = {
@@ -123,7 +120,7 @@ def generate_auto_content():
         )
         
         # Generate script
-        generated_script = script_generator.generate_script(content_request)
+        generated_script = get_script_generator().generate_script(content_request)
         
         # Convert to JSON-serializable format
         result = {
@@ -162,8 +159,8 @@ def get_content_templates():
         templates = {
             'content_types': [ct.value for ct in ContentType],
             'age_groups': [ag.value for ag in AgeGroup],
-            'template_structures': script_generator.templates,
-            'character_database': script_generator.character_database
+            'template_structures': get_script_generator().templates,
+            'character_database': get_script_generator().character_database
         }
         
         return jsonify(templates), 200
@@ -204,6 +201,10 @@ def validate_content():
         if validation_results['overall_score'] < 0.8:
             validation_results['recommendations'].append('Consider revising content for better quality')
         
+        for check in ('length_appropriate', 'content_safe', 'educational_value', 'age_appropriate', 'overall_score'):
+            CONTENT_VALIDATION_SCORE.observe(validation_results[check], check=check)
+        CONTENT_VALIDATIONS.inc(result='passed' if validation_results['overall_score'] >= 0.8 else 'failed')
+
         return jsonify(validation_results), 200
         
     except Exception as e:
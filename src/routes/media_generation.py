@@ -3,16 +3,21 @@ Media Generation API Routes
 Handles AI-powered generation of visual and audio assets
 """
 
-from flask import Blueprint, request, jsonify, send_file
-from src.services.media_generation_service import MediaGenerationService
+from flask import Blueprint, request, jsonify
 from src.models.media_generator import VisualStyle, AudioStyle
+from src.routes.admission import admission_controlled
+from src.services.service_registry import get_media_service
+from src.services.file_delivery import send_download
+from src.utils.file_manager import ASSET_KINDS
+from src.utils.logger import get_logger
 from datetime import datetime
 import os
 
-media_bp = Blueprint('media', __name__)
+# Longest cleanup age accepted, in days
+MAX_CLEANUP_DAYS = 3650
 
-# Initialize media generation service
-media_service = MediaGenerationService()
+media_bp = Blueprint('media', __name__)
+logger = get_logger("media_generation")
 
 @media_bp.route('/generate/character', methods=['POST'])
 def generate_character():
@@ -44,7 +49,7 @@ def generate_character():
             }), 400
         
         # Generate character image
-        asset = media_service.generate_character_image(
+        asset = get_media_service().generate_character_image(
             character_name=character_name,
             style=style,
             age_group=age_group,
@@ -100,7 +105,7 @@ def generate_background():
             }), 400
         
         # Generate background image
-        asset = media_service.generate_background_image(
+        asset = get_media_service().generate_background_image(
             scene_description=scene_description,
             style=style,
             content_type=content_type
@@ -154,7 +159,7 @@ def generate_educational_object():
             }), 400
         
         # Generate educational object
-        asset = media_service.generate_educational_object(
+        asset = get_media_service().generate_educational_object(
             object_type=object_type,
             topic=topic,
             style=style
@@ -209,7 +214,7 @@ def generate_background_music():
             }), 400
         
         # Generate background music
-        asset = media_service.generate_background_music(
+        asset = get_media_service().generate_background_music(
             content_type=content_type,
             age_group=age_group,
             duration_minutes=float(duration_minutes),
@@ -255,7 +260,7 @@ def generate_voice_narration():
             }), 400
         
         # Generate voice narration
-        asset = media_service.generate_voice_narration(
+        asset = get_media_service().generate_voice_narration(
             script_text=script_text,
             character_name=character_name,
             age_group=age_group
@@ -282,10 +287,13 @@ def generate_voice_narration():
         }), 500
 
 @media_bp.route('/generate/complete_assets', methods=['POST'])
+@admission_controlled('complete_assets')
 def generate_complete_assets():
     """Generate all assets needed for a video"""
     
     try:
+        media_service = get_media_service()
+        
         data = request.get_json()
         
         # Required parameters
@@ -349,7 +357,7 @@ def generate_complete_assets():
                     'description': character_asset.description
                 })
             except Exception as e:
-                print(f"Failed to generate character {character_name}: {e}")
+                logger.error(f"Failed to generate character {character_name}: {e}")
         
         generated_assets['visual_assets']['characters'] = characters
         
@@ -370,7 +378,7 @@ def generate_complete_assets():
                     'description': background_asset.description
                 })
             except Exception as e:
-                print(f"Failed to generate background for scene {i+1}: {e}")
+                logger.error(f"Failed to generate background for scene {i+1}: {e}")
         
         generated_assets['visual_assets']['backgrounds'] = backgrounds
         
@@ -388,7 +396,7 @@ def generate_complete_assets():
                 'description': object_asset.description
             }]
         except Exception as e:
-            print(f"Failed to generate educational object: {e}")
+            logger.error(f"Failed to generate educational object: {e}")
             generated_assets['visual_assets']['educational_objects'] = []
         
         # Generate background music
@@ -406,7 +414,7 @@ def generate_complete_assets():
                 'description': music_asset.description
             }
         except Exception as e:
-            print(f"Failed to generate background music: {e}")
+            logger.error(f"Failed to generate background music: {e}")
             generated_assets['audio_assets']['background_music'] = None
         
         # Generate voice narration
@@ -425,7 +433,7 @@ def generate_complete_assets():
                     'description': voice_asset.description
                 }
             except Exception as e:
-                print(f"Failed to generate voice narration: {e}")
+                logger.error(f"Failed to generate voice narration: {e}")
                 generated_assets['audio_assets']['voice_narration'] = None
         
         # Calculate total assets generated
@@ -448,12 +456,51 @@ def generate_complete_assets():
             'status': 'error'
         }), 500
 
+@media_bp.route('/assets', methods=['GET'])
+def list_assets():
+    """List generated assets, filtered by kind, style or project"""
+    
+    try:
+        kind = request.args.get('kind')
+        if kind and kind not in ASSET_KINDS:
+            return jsonify({
+                'error': f'Invalid kind: {kind}',
+                'valid_kinds': ASSET_KINDS,
+                'status': 'error'
+            }), 400
+        
+        try:
+            limit = int(request.args.get('limit', 100))
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({
+                'error': 'limit and offset must be integers',
+                'status': 'error'
+            }), 400
+        
+        listing = get_media_service().list_assets(
+            kind=kind,
+            style=request.args.get('style'),
+            project_id=request.args.get('project_id'),
+            limit=limit,
+            offset=offset
+        )
+        listing['status'] = 'success'
+        
+        return jsonify(listing), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Asset listing failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @media_bp.route('/asset/<asset_id>', methods=['GET'])
 def get_asset_info(asset_id):
     """Get information about a generated asset"""
     
     try:
-        asset_info = media_service.get_asset_info(asset_id)
+        asset_info = get_media_service().get_asset_info(asset_id)
         
         if not asset_info:
             return jsonify({
@@ -474,7 +521,7 @@ def download_asset(asset_id):
     """Download a generated asset file"""
     
     try:
-        asset_info = media_service.get_asset_info(asset_id)
+        asset_info = get_media_service().get_asset_info(asset_id)
         
         if not asset_info:
             return jsonify({
@@ -489,7 +536,7 @@ def download_asset(asset_id):
                 'status': 'error'
             }), 404
         
-        return send_file(file_path, as_attachment=True)
+        return send_download(file_path, content_hash=asset_info.get('content_hash'))
         
     except Exception as e:
         return jsonify({
@@ -538,10 +585,19 @@ def cleanup_old_assets():
         data = request.get_json() or {}
         days_old = data.get('days_old', 30)
         
-        media_service.cleanup_old_assets(days_old)
+        # 0 or a negative age would match every asset
+        if isinstance(days_old, bool) or not isinstance(days_old, (int, float)) or not 0 < days_old <= MAX_CLEANUP_DAYS:
+            return jsonify({
+                'error': f'Invalid days_old: {days_old}',
+                'valid_range': [0, MAX_CLEANUP_DAYS],
+                'status': 'error'
+            }), 400
+        
+        cleanup = get_media_service().cleanup_old_assets(days_old)
         
         return jsonify({
             'message': f'Cleaned up assets older than {days_old} days',
+            'cleanup': cleanup,
             'cleanup_timestamp': datetime.now().isoformat(),
             'status': 'success'
         }), 200
@@ -3,32 +3,67 @@ Pipeline Status and Monitoring API Routes
 Handles system status, health checks, and monitoring
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime
-import psutil
+from src.services.video_job_queue import get_job_queue, JOB_STATUSES
+from src.services.metrics_registry import get_metrics_registry, histogram_summary, counter_total, gauge_family
+from src.services.service_registry import get_topic_selector, get_service_registry
+from src.services.startup_report import get_startup_report
+from src.services.prefork_server import get_serving_info
+from src.services.tracing import get_trace_recorder
+from src.services.sampling_profiler import get_sampling_profiler, ProfilerBusy
+from src.services.config_store import (
+    get_config, get_config_store, validate_config_changes, ConfigConflict, DEFAULT_CONFIG, CONFIG_HISTORY_SIZE
+)
+from src.utils.logger import get_log_ring, LOG_LEVELS
+import json
+import hmac
+import time
 import os
 
 status_bp = Blueprint('status', __name__)
 
+METRICS_RANGES = {'1h': 3600, '24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400}
+PIPELINE_OPERATIONS = ['topic_selection', 'script_generation', 'asset', 'render', 'thumbnail', 'publish']
+PROFILE_FORMATS = ['json', 'collapsed']
+MAX_PROFILE_SECONDS = 120
+
+# Config keys backed by the shared job queue: key -> (section, queue limit name)
+ADMISSION_LIMIT_SECTIONS = {
+    'max_queue_size': ('content_generation', 'max_queue_size'),
+    'generation_interval_minutes': ('content_generation', 'slot_interval_minutes'),
+    'scheduled_lead_minutes': ('content_generation', 'scheduled_lead_minutes'),
+    'max_defer_minutes': ('content_generation', 'max_defer_minutes'),
+    'max_concurrent_generations': ('system_settings', 'max_concurrent_generations'),
+    'job_lease_seconds': ('system_settings', 'job_lease_seconds'),
+    'max_job_attempts': ('system_settings', 'max_job_attempts')
+}
+
 @status_bp.route('/health', methods=['GET'])
 def health_check():
-    """Basic health check endpoint"""
+    """Basic health check endpoint; answers from the background sampler's latest reading"""
     
     try:
-        # Check system resources
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        sampler = _get_resource_sampler()
+        sample = sampler.latest() or sampler.sample()
+        sample_age_seconds = time.time() - sample['timestamp']
+        
+        cpu_percent = sample['cpu_percent']
+        memory_percent = sample['memory_percent']
+        root_disk = sample['disks'].get('/', {'percent': 0, 'free_gb': 0})
+        disk_percent = root_disk['percent']
         
         health_status = {
             'status': 'healthy',
             'timestamp': str(datetime.now()),
             'system_resources': {
                 'cpu_percent': cpu_percent,
-                'memory_percent': memory.percent,
-                'memory_available_gb': round(memory.available / (1024**3), 2),
-                'disk_percent': disk.percent,
-                'disk_free_gb': round(disk.free / (1024**3), 2)
+                'memory_percent': memory_percent,
+                'memory_available_gb': sample['memory_available_gb'],
+                'disk_percent': disk_percent,
+                'disk_free_gb': root_disk['free_gb'],
+                'sampled_at': sample['sampled_at'],
+                'sample_age_seconds': round(sample_age_seconds, 3)
             },
             'service_status': {
                 'content_generator': 'operational',
@@ -37,17 +72,22 @@ def health_check():
             }
         }
         
+        # A sample older than a few intervals means the sampler thread has died
+        sampler_stale = sample_age_seconds > sampler.interval_seconds * 3
+        
         # Determine overall health
-        if cpu_percent > 90 or memory.percent > 90 or disk.percent > 90:
+        if cpu_percent > 90 or memory_percent > 90 or disk_percent > 90 or sampler_stale:
             health_status['status'] = 'warning'
             health_status['warnings'] = []
             
             if cpu_percent > 90:
                 health_status['warnings'].append('High CPU usage')
-            if memory.percent > 90:
+            if memory_percent > 90:
                 health_status['warnings'].append('High memory usage')
-            if disk.percent > 90:
+            if disk_percent > 90:
                 health_status['warnings'].append('Low disk space')
+            if sampler_stale:
+                health_status['warnings'].append('Resource readings are stale')
         
         return jsonify(health_status), 200
         
@@ -58,38 +98,119 @@ def health_check():
             'timestamp': str(datetime.now())
         }), 500
 
+@status_bp.route('/health/history', methods=['GET'])
+def health_history():
+    """Recent resource samples, oldest first"""
+    
+    try:
+        seconds = request.args.get('seconds', type=float)
+        limit = request.args.get('limit', type=int)
+        sampler = _get_resource_sampler()
+        
+        samples = sampler.get_history(seconds, limit)
+        
+        return jsonify({
+            'samples': samples,
+            'total_samples': len(samples),
+            'interval_seconds': sampler.interval_seconds,
+            'timestamp': str(datetime.now())
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Health history retrieval failed: {str(e)}',
+            'timestamp': str(datetime.now())
+        }), 500
+
+@status_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """All pipeline metrics, merged across processes, in Prometheus text format"""
+    
+    try:
+        return Response(get_metrics_registry().render_prometheus(), mimetype='text/plain; version=0.0.4')
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Metrics export failed: {str(e)}',
+            'timestamp': str(datetime.now())
+        }), 500
+
+@status_bp.route('/startup', methods=['GET'])
+def startup_report():
+    """This process's startup timing: phases to app ready, first request, and lazily built services"""
+    
+    try:
+        report = get_startup_report().to_dict()
+        report['services'] = get_service_registry().get_status()
+        report['serving'] = get_serving_info()
+        report['status'] = 'success'
+        return jsonify(report), 200
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Startup report failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @status_bp.route('/pipeline/status', methods=['GET'])
 def pipeline_status():
     """Get detailed pipeline status and statistics"""
     
     try:
-        # This would integrate with actual pipeline monitoring in production
-        # For now, providing mock status data
+        topic_selector = get_topic_selector()
+        queue = get_job_queue()
+        stats = queue.get_stats()
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        today = queue.get_job_summary(since=midnight)
+        overall = queue.get_job_summary()
+        collected = get_metrics_registry().collect()
+        
+        topics_selected = collected.get('topics_selected_total')
+        topic_labels = topics_selected['labelnames'] if topics_selected else []
+        unique_topics = {
+            dict(zip(topic_labels, label_values))['topic']
+            for label_values, value in (topics_selected['samples'] if topics_selected else []) if value > 0
+        }
+        selection_score = histogram_summary(collected.get('topic_selection_score'))
+        diversity = topic_selector.get_performance_analytics()['diversity_metrics']
+        
+        performances = list(topic_selector.performance_database.values())
+        
+        def average(values):
+            values = list(values)
+            return sum(values) / len(values) if values else None
+        
+        if stats['running']:
+            state = 'running'
+        elif any(node['alive'] for node in stats['worker_nodes']):
+            state = 'idle'
+        else:
+            state = 'stopped'
         
         pipeline_stats = {
-            'pipeline_status': 'running',
-            'last_content_generated': str(datetime.now()),
+            'pipeline_status': state,
+            'last_content_generated': _format_timestamp(overall['last_completed_at']),
             'content_generation_stats': {
-                'total_videos_generated': 1247,
-                'videos_generated_today': 24,
-                'average_generation_time_minutes': 12.5,
-                'success_rate_percent': 98.2,
-                'queue_length': 3
+                'total_videos_generated': overall['completed'],
+                'videos_generated_today': today['completed'],
+                'average_generation_time_minutes': _round(_minutes(overall['average_run_seconds']), 2),
+                'success_rate_percent': _round(_percent(overall['success_rate']), 1),
+                'queue_length': stats['queued']
             },
             'topic_selection_stats': {
-                'total_topics_processed': 1247,
-                'unique_topics_covered': 156,
-                'average_selection_score': 0.847,
-                'diversity_score': 0.923
+                'total_topics_processed': int(counter_total(topics_selected)),
+                'unique_topics_covered': len(unique_topics),
+                'average_selection_score': _round(selection_score['average'], 3),
+                'diversity_score': _round(diversity['recent_diversity_score'], 3)
             },
             'performance_metrics': {
-                'average_views_per_video': 1850000,
-                'average_watch_time_minutes': 4.8,
-                'average_engagement_rate': 0.876,
-                'average_retention_rate': 0.823
+                'average_views_per_video': _round(average(p.views for p in performances), 0),
+                'average_watch_time_minutes': _round(average(p.watch_time_minutes for p in performances), 2),
+                'average_engagement_rate': _round(average(p.engagement_rate for p in performances), 3),
+                'average_retention_rate': _round(average(p.retention_rate for p in performances), 3)
             },
-            'system_uptime_hours': 168.5,
-            'last_error': None,
+            'system_uptime_hours': round((time.time() - _process_start_time()) / 3600, 2),
+            'last_error': overall['last_error'],
             'timestamp': str(datetime.now())
         }
         
@@ -108,35 +229,56 @@ def pipeline_metrics():
     try:
         # Time range for metrics
         time_range = request.args.get('range', '24h')  # 1h, 24h, 7d, 30d
+        if time_range not in METRICS_RANGES:
+            return jsonify({
+                'error': f'Invalid range: {time_range}',
+                'valid_ranges': list(METRICS_RANGES),
+                'status': 'error'
+            }), 400
+        range_seconds = METRICS_RANGES[time_range]
+        
+        summary = get_job_queue().get_job_summary(since=time.time() - range_seconds)
+        collected = get_metrics_registry().collect()
+        operation_seconds = collected.get('pipeline_operation_seconds')
+        validation_scores = collected.get('content_validation_score')
+        validations = collected.get('content_validations_total')
+        finished = summary['completed'] + summary['failed']
+        validated = counter_total(validations)
+        trends = get_topic_selector().get_performance_analytics()['recent_trends']
         
-        # Mock metrics data - in production this would come from monitoring systems
         metrics = {
             'time_range': time_range,
             'content_generation_metrics': {
-                'generation_rate_per_hour': 1.0,
-                'average_processing_time_minutes': 12.5,
-                'success_rate': 0.982,
-                'error_rate': 0.018,
-                'queue_wait_time_minutes': 2.3
+                'generation_rate_per_hour': round(summary['completed'] / (range_seconds / 3600), 3),
+                'average_processing_time_minutes': _round(_minutes(summary['average_run_seconds']), 2),
+                'success_rate': _round(summary['success_rate'], 3),
+                'error_rate': _round(summary['failed'] / finished, 3) if finished else None,
+                'queue_wait_time_minutes': _round(_minutes(summary['average_wait_seconds']), 2)
+            },
+            # Histograms are cumulative since each process started; ranged views belong in Prometheus
+            'operation_timings': {
+                operation: histogram_summary(operation_seconds, operation=operation)
+                for operation in PIPELINE_OPERATIONS
             },
             'quality_metrics': {
-                'content_validation_pass_rate': 0.956,
-                'average_educational_score': 0.891,
-                'average_safety_score': 0.998,
-                'average_age_appropriateness_score': 0.934
+                'content_validation_pass_rate': _round(
+                    counter_total(validations, result='passed') / validated, 3
+                ) if validated else None,
+                'average_educational_score': _round(
+                    histogram_summary(validation_scores, check='educational_value')['average'], 3
+                ),
+                'average_safety_score': _round(histogram_summary(validation_scores, check='content_safe')['average'], 3),
+                'average_age_appropriateness_score': _round(
+                    histogram_summary(validation_scores, check='age_appropriate')['average'], 3
+                )
             },
             'performance_trends': {
-                'view_growth_rate': 0.15,  # 15% growth
-                'engagement_trend': 'increasing',
-                'retention_trend': 'stable',
-                'topic_diversity_trend': 'improving'
-            },
-            'resource_utilization': {
-                'cpu_average_percent': 45.2,
-                'memory_average_percent': 62.8,
-                'storage_used_gb': 245.7,
-                'network_bandwidth_mbps': 12.4
+                'view_growth_rate': None,  # needs per-period view history, which isn't tracked yet
+                'engagement_trend': trends['trend'],
+                'retention_trend': None,
+                'topic_diversity_trend': None
             },
+            'resource_utilization': _summarize_resource_usage(_get_resource_sampler().get_history(range_seconds)),
             'generated_at': str(datetime.now())
         }
         
@@ -150,58 +292,46 @@ def pipeline_metrics():
 
 @status_bp.route('/pipeline/logs', methods=['GET'])
 def pipeline_logs():
-    """Get recent pipeline logs"""
+    """Get recent pipeline logs from the in-memory log ring"""
     
     try:
         # Log level filter
-        level = request.args.get('level', 'all')  # all, info, warning, error
-        limit = int(request.args.get('limit', 100))
-        
-        # Mock log data - in production this would come from actual log files
-        mock_logs = [
-            {
-                'timestamp': str(datetime.now()),
-                'level': 'info',
-                'component': 'content_generator',
-                'message': 'Successfully generated content for topic: Letter A (toddler)',
-                'details': {'topic': 'A', 'content_type': 'alphabet', 'duration': '5 minutes'}
-            },
-            {
-                'timestamp': str(datetime.now()),
-                'level': 'info',
-                'component': 'topic_selector',
-                'message': 'Selected next topic based on performance analysis',
-                'details': {'selected_topic': 'red', 'priority_score': 0.892}
-            },
-            {
-                'timestamp': str(datetime.now()),
-                'level': 'warning',
-                'component': 'quality_validator',
-                'message': 'Content validation score below optimal threshold',
-                'details': {'validation_score': 0.78, 'threshold': 0.85}
-            },
-            {
-                'timestamp': str(datetime.now()),
-                'level': 'info',
-                'component': 'performance_tracker',
-                'message': 'Updated performance metrics for completed video',
-                'details': {'views': 125000, 'engagement_rate': 0.89}
-            }
-        ]
+        level = request.args.get('level', 'all')  # all, debug, info, warning, error, critical
+        component = request.args.get('component')
+        try:
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            limit = 0
+        try:
+            after = int(request.args.get('after', 0))  # only entries with a higher sequence number
+        except ValueError:
+            after = -1
+        
+        if limit < 1:
+            return jsonify({'error': 'limit must be a positive integer', 'status': 'error'}), 400
+        if after < 0:
+            return jsonify({'error': 'after must be a non-negative integer', 'status': 'error'}), 400
         
-        # Filter logs by level
-        if level != 'all':
-            mock_logs = [log for log in mock_logs if log['level'] == level]
+        if level != 'all' and level not in LOG_LEVELS:
+            return jsonify({
+                'error': f'Invalid level: {level}',
+                'valid_levels': ['all'] + LOG_LEVELS,
+                'status': 'error'
+            }), 400
         
-        # Limit results
-        mock_logs = mock_logs[:limit]
+        ring = get_log_ring()
+        logs = ring.query(level=None if level == 'all' else level, component=component, limit=limit, after=after)
         
         result = {
-            'logs': mock_logs,
-            'total_logs': len(mock_logs),
+            'logs': logs,
+            'total_logs': len(logs),
+            'latest_sequence': ring.get_latest_sequence(),
+            'components': ring.get_components(),
             'filters': {
                 'level': level,
-                'limit': limit
+                'component': component,
+                'limit': limit,
+                'after': after
             },
             'generated_at': str(datetime.now())
         }
@@ -214,50 +344,175 @@ def pipeline_logs():
             'timestamp': str(datetime.now())
         }), 500
 
+@status_bp.route('/pipeline/logs/tail', methods=['GET'])
+def tail_pipeline_logs():
+    """Stream new log entries as server-sent events
+    
+    Resumes after the Last-Event-ID header (or ?after=) when a client reconnects;
+    ?seconds= ends the stream after that long.
+    """
+    
+    level = request.args.get('level', 'all')
+    component = request.args.get('component')
+    seconds = request.args.get('seconds', type=float)
+    after = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', type=int)
+    
+    if level != 'all' and level not in LOG_LEVELS:
+        return jsonify({
+            'error': f'Invalid level: {level}',
+            'valid_levels': ['all'] + LOG_LEVELS,
+            'status': 'error'
+        }), 400
+    
+    ring = get_log_ring()
+    if after is None:
+        after = ring.get_latest_sequence()
+    level_filter = None if level == 'all' else level
+    
+    def stream():
+        last_sequence = after
+        deadline = time.time() + seconds if seconds is not None else None
+        while deadline is None or time.time() < deadline:
+            wait_seconds = 15.0 if deadline is None else max(0.0, min(15.0, deadline - time.time()))
+            entries, last_sequence = ring.wait_for_entries(last_sequence, wait_seconds, level_filter, component)
+            if not entries:
+                yield ': keepalive\n\n'
+                continue
+            for entry in entries:
+                yield f"id: {entry['sequence']}\ndata: {json.dumps(entry, default=str)}\n\n"
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@status_bp.route('/traces', methods=['GET'])
+def list_traces():
+    """Recently updated traces"""
+    
+    try:
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({'error': 'limit must be a positive integer', 'status': 'error'}), 400
+        
+        traces = get_trace_recorder().list_traces(limit)
+        for trace in traces:
+            trace['updated_at'] = datetime.fromtimestamp(trace['updated_at']).isoformat()
+            trace['trace_url'] = f"/api/status/traces/{trace['trace_id']}"
+        
+        return jsonify({
+            'traces': traces,
+            'total_traces': len(traces),
+            'timestamp': str(datetime.now())
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Trace listing failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@status_bp.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """One trace in Chrome trace event format; save it and open it in Perfetto or chrome://tracing"""
+    
+    try:
+        trace = get_trace_recorder().export_chrome_trace(trace_id)
+        if trace is None:
+            return jsonify({
+                'error': f'Trace not found: {trace_id}',
+                'status': 'error'
+            }), 404
+        
+        response = jsonify(trace)
+        if request.args.get('download'):
+            response.headers['Content-Disposition'] = f'attachment; filename="trace_{trace_id}.json"'
+        return response, 200
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Trace export failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@status_bp.route('/admin/profile', methods=['POST'])
+def profile_requests():
+    """Sample request thread stacks for ?seconds= (default 10) and return a CPU profile
+    
+    Requires the PIPELINE_ADMIN_TOKEN value in an X-Admin-Token or Bearer header.
+    ?format=collapsed returns plain collapsed stacks for flamegraph.pl / speedscope;
+    ?interval_ms= sets the sampling period and ?all_threads=1 includes background threads.
+    Samples of threads blocked on locks, SQLite or sockets are only counted; ?waiting=1
+    keeps their stacks (ending in [waiting]) for a wall-clock profile.
+    """
+    
+    denied = _check_admin_token()
+    if denied is not None:
+        return denied
+    
+    seconds = request.args.get('seconds', 10, type=float)
+    interval_ms = request.args.get('interval_ms', 10, type=float)
+    output_format = request.args.get('format', 'json')
+    all_threads = request.args.get('all_threads', 'false').lower() in ('1', 'true', 'yes')
+    include_waiting = request.args.get('waiting', 'false').lower() in ('1', 'true', 'yes')
+    
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        return jsonify({
+            'error': f'Invalid seconds: {seconds}',
+            'valid_range': [0, MAX_PROFILE_SECONDS],
+            'status': 'error'
+        }), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({
+            'error': f'Invalid interval_ms: {interval_ms}',
+            'valid_range': [1, 1000],
+            'status': 'error'
+        }), 400
+    if output_format not in PROFILE_FORMATS:
+        return jsonify({
+            'error': f'Invalid format: {output_format}',
+            'valid_formats': PROFILE_FORMATS,
+            'status': 'error'
+        }), 400
+    
+    try:
+        profile = get_sampling_profiler().profile(seconds, interval_ms / 1000, all_threads, include_waiting)
+        
+        if output_format == 'collapsed':
+            return Response(profile['collapsed'] + '\n', mimetype='text/plain')
+        
+        profile['status'] = 'success'
+        return jsonify(profile), 200
+    
+    except ProfilerBusy as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 409
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Profiling failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @status_bp.route('/pipeline/config', methods=['GET'])
 def pipeline_config():
     """Get current pipeline configuration"""
     
     try:
-        config = {
-            'content_generation': {
-                'generation_interval_minutes': 60,
-                'max_queue_size': 10,
-                'default_video_duration_minutes': 5,
-                'quality_threshold': 0.85,
-                'auto_retry_enabled': True,
-                'max_retry_attempts': 3
-            },
-            'topic_selection': {
-                'performance_weight': 0.4,
-                'freshness_weight': 0.2,
-                'diversity_weight': 0.2,
-                'educational_weight': 0.1,
-                'seasonal_weight': 0.1,
-                'diversity_window_size': 10
-            },
-            'quality_assurance': {
-                'content_validation_enabled': True,
-                'safety_check_enabled': True,
-                'educational_validation_enabled': True,
-                'age_appropriateness_check_enabled': True,
-                'minimum_validation_score': 0.8
-            },
-            'performance_tracking': {
-                'metrics_collection_enabled': True,
-                'analytics_update_interval_minutes': 15,
-                'performance_history_retention_days': 365,
-                'trend_analysis_enabled': True
-            },
-            'system_settings': {
-                'max_concurrent_generations': 2,
-                'resource_monitoring_enabled': True,
-                'auto_scaling_enabled': False,
-                'backup_enabled': True,
-                'backup_interval_hours': 24
-            },
+        snapshot = get_config()
+        limits = get_job_queue().get_limits()
+        
+        config = snapshot.to_dict()
+        for name, (section, limit_name) in ADMISSION_LIMIT_SECTIONS.items():
+            config[section][name] = limits[limit_name]
+        config.update({
+            'version': snapshot.version,
+            'updated_at': _format_timestamp(snapshot.updated_at),
             'generated_at': str(datetime.now())
-        }
+        })
         
         return jsonify(config), 200
         
@@ -269,28 +524,64 @@ def pipeline_config():
 
 @status_bp.route('/pipeline/config', methods=['POST'])
 def update_pipeline_config():
-    """Update pipeline configuration"""
+    """Update pipeline configuration
+    
+    Every change is validated before any is applied. Settings publish as a new
+    configuration version that every process picks up within a few seconds;
+    admission limits go to the shared job queue. Pass "expected_version" to refuse
+    the update if someone else changed the configuration first.
+    """
     
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({
+                'error': 'Request body must be a JSON object of configuration sections',
+                'status': 'error'
+            }), 400
+        
+        expected_version = data.pop('expected_version', None)
+        
+        config_changes = {}
+        limit_updates = {}
+        for section, settings in data.items():
+            if isinstance(settings, dict):
+                settings = dict(settings)
+                for name, (limit_section, limit_name) in ADMISSION_LIMIT_SECTIONS.items():
+                    if limit_section == section and name in settings:
+                        limit_updates[limit_name] = settings.pop(name)
+            config_changes[section] = settings
         
-        # In production, this would update actual configuration
-        # For now, just validate the input and return success
+        queue = get_job_queue()
+        try:
+            validate_config_changes(config_changes)
+            queue.validate_limits(limit_updates)
+        except ValueError as e:
+            return jsonify({
+                'error': f'Invalid configuration: {str(e)}',
+                'valid_sections': list(DEFAULT_CONFIG),
+                'status': 'error'
+            }), 400
         
-        valid_sections = [
-            'content_generation', 'topic_selection', 'quality_assurance',
-            'performance_tracking', 'system_settings'
-        ]
+        config_changes = {section: settings for section, settings in config_changes.items() if settings}
+        try:
+            snapshot = get_config_store().update(config_changes, expected_version) if config_changes else get_config()
+        except ConfigConflict as e:
+            return jsonify({
+                'error': str(e),
+                'current_version': get_config().version,
+                'status': 'error'
+            }), 409
         
-        updated_sections = []
-        for section, config in data.items():
-            if section in valid_sections:
-                updated_sections.append(section)
-                # Here you would update the actual configuration
+        # Admission limits are enforced by the shared job queue, so they apply to every process at once
+        applied_limits = queue.set_limits(limit_updates) if limit_updates else {}
         
         result = {
             'message': 'Configuration updated successfully',
-            'updated_sections': updated_sections,
+            'updated_sections': list(data),
+            'version': snapshot.version,
+            'applied_settings': config_changes,
+            'applied_limits': applied_limits,
             'timestamp': str(datetime.now()),
             'status': 'success'
         }
@@ -303,6 +594,25 @@ def update_pipeline_config():
             'timestamp': str(datetime.now())
         }), 500
 
+@status_bp.route('/pipeline/config/history', methods=['GET'])
+def pipeline_config_history():
+    """Recent configuration versions and what each changed"""
+    
+    try:
+        limit = min(request.args.get('limit', 20, type=int), CONFIG_HISTORY_SIZE)
+        
+        return jsonify({
+            'current_version': get_config().version,
+            'versions': get_config_store().get_history(limit),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Configuration history failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @status_bp.route('/pipeline/restart', methods=['POST'])
 def restart_pipeline():
     """Restart pipeline components"""
@@ -330,3 +640,107 @@ def restart_pipeline():
             'timestamp': str(datetime.now())
         }), 500
 
+def _get_resource_sampler():
+    """The background resource sampler; imported on first use to keep psutil off the startup path"""
+    
+    from src.services.resource_sampler import get_resource_sampler
+    return get_resource_sampler()
+
+def _process_start_time() -> float:
+    import psutil
+    return psutil.Process().create_time()
+
+def _check_admin_token():
+    """None when the request carries the admin token, otherwise the error response to return"""
+    
+    expected = os.environ.get('PIPELINE_ADMIN_TOKEN')
+    if not expected:
+        return jsonify({
+            'error': 'Admin endpoints are disabled; set PIPELINE_ADMIN_TOKEN to enable them',
+            'status': 'error'
+        }), 403
+    
+    supplied = request.headers.get('X-Admin-Token', '')
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):]
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        return jsonify({
+            'error': 'Invalid admin token',
+            'status': 'error'
+        }), 401
+    return None
+
+def _summarize_resource_usage(samples: list) -> dict:
+    """Averages over the sampler's history; it keeps about an hour, so longer ranges cover only that"""
+    
+    if not samples:
+        return {
+            'cpu_average_percent': None,
+            'memory_average_percent': None,
+            'storage_used_gb': None,
+            'network_bandwidth_mbps': None,
+            'samples_covered_seconds': 0
+        }
+    
+    first, last = samples[0], samples[-1]
+    elapsed = last['timestamp'] - first['timestamp']
+    assets_disk = last['disks'].get(os.path.join(os.getcwd(), 'generated-assets')) or last['disks'].get('/')
+    
+    bandwidth_mbps = None
+    if elapsed > 0 and first.get('network_bytes_sent') is not None and last.get('network_bytes_sent') is not None:
+        transferred = (last['network_bytes_sent'] + last['network_bytes_recv']
+                       - first['network_bytes_sent'] - first['network_bytes_recv'])
+        bandwidth_mbps = round(transferred * 8 / elapsed / 1e6, 3)
+    
+    return {
+        'cpu_average_percent': round(sum(s['cpu_percent'] for s in samples) / len(samples), 1),
+        'memory_average_percent': round(sum(s['memory_percent'] for s in samples) / len(samples), 1),
+        'storage_used_gb': round(assets_disk['total_gb'] - assets_disk['free_gb'], 2) if assets_disk else None,
+        'network_bandwidth_mbps': bandwidth_mbps,
+        'samples_covered_seconds': round(elapsed, 1)
+    }
+
+def _collect_queue_metrics() -> dict:
+    """Job counts and generation slots, read from the shared queue at scrape time"""
+    
+    stats = get_job_queue().get_stats()
+    return {
+        'video_jobs': gauge_family('Video jobs by status', ('status',),
+                                   [((status,), stats[status]) for status in JOB_STATUSES]),
+        'generation_slots_held': gauge_family('Generation slots currently held', (), [((), stats['generation_slots'])]),
+        'worker_nodes_alive': gauge_family('Worker nodes seen within one lease', (),
+                                           [((), sum(1 for node in stats['worker_nodes'] if node['alive']))])
+    }
+
+def _collect_resource_metrics() -> dict:
+    """Latest resource sample as gauges"""
+    
+    sample = _get_resource_sampler().latest()
+    if sample is None:
+        return {}
+    return {
+        'system_cpu_percent': gauge_family('System CPU usage', (), [((), sample['cpu_percent'])]),
+        'system_memory_percent': gauge_family('System memory usage', (), [((), sample['memory_percent'])]),
+        'disk_used_percent': gauge_family('Disk usage by watched path', ('path',),
+                                          [((path,), disk['percent']) for path, disk in sample['disks'].items()]),
+        'process_resident_memory_mb': gauge_family(
+            'Resident memory of the API process and its children', ('process',),
+            [(('api',), sample['process']['rss_mb']), (('children',), sample['process']['children_rss_mb'])]
+        )
+    }
+
+def _format_timestamp(value):
+    return datetime.fromtimestamp(value).isoformat() if value else None
+
+def _minutes(seconds):
+    return seconds / 60 if seconds is not None else None
+
+def _percent(fraction):
+    return fraction * 100 if fraction is not None else None
+
+def _round(value, digits):
+    return round(value, digits) if value is not None else None
+
+get_metrics_registry().add_collector(_collect_queue_metrics)
+get_metrics_registry().add_collector(_collect_resource_metrics)
@@ -1,22 +1,25 @@
 """Publishing and Upload API Routes
 Handles automated video uploading and publishing"""
 
-from flask import Blueprint, request, jsonify, send_file
-from src.services.automated_publishing_service import AutomatedPublishingService
+from flask import Blueprint, request, jsonify
+from werkzeug.security import safe_join
+from src.services.ffmpeg_runner import get_job_runner
+from src.services.service_registry import get_publishing_service
+from src.services.file_delivery import send_download
 from datetime import datetime
 import os
 
 publishing_bp = Blueprint('publishing', __name__)
-publishing_service = AutomatedPublishingService()
 
 
 @publishing_bp.route('/thumbnail/<path:thumbnail_path>')
 def download_thumbnail(thumbnail_path):
     try:
-        full_path = os.path.join(os.getcwd(), "generated_assets", "thumbnails", thumbnail_path)
-        if not os.path.exists(full_path):
+        # safe_join refuses paths that would leave the thumbnails directory (../, absolute paths)
+        full_path = safe_join(get_publishing_service().thumbnails_dir, thumbnail_path)
+        if full_path is None or not os.path.isfile(full_path):
             return jsonify({'error': f'Thumbnail not found: {thumbnail_path}', 'status': 'error'}), 404
-        return send_file(full_path, as_attachment=True)
+        return send_download(full_path)
     except Exception as e:
         return jsonify({'error': f'Thumbnail download failed: {str(e)}', 'status': 'error'}), 500
 
@@ -29,7 +32,6 @@ def test_publishing():
         test_video_path = os.path.join(test_video_dir, "test_publishing.mp4")
 
         if not os.path.exists(test_video_path):
-            import subprocess
             cmd = [
                 'ffmpeg', '-y',
                 '-f', 'lavfi',
@@ -39,9 +41,9 @@ def test_publishing():
                 '-t', '10',
                 test_video_path
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                return jsonify({'error': f'Failed to create test video: {result.stderr}', 'status': 'error'}), 500
+            job = get_job_runner().run(cmd, duration_seconds=10, timeout_seconds=120, label="publishing test video")
+            if job.status != 'completed':
+                return jsonify({'error': f'Failed to create test video: {job.error}', 'job_id': job.job_id, 'status': 'error'}), 500
 
         test_metadata = {
             "topic": "Publishing Test",
@@ -52,8 +54,8 @@ def test_publishing():
             "test_upload": True
         }
 
-        upload_results = publishing_service.upload_video_to_all_platforms(test_video_path, test_metadata)
-        thumbnail_path = publishing_service.generate_thumbnail(test_video_path, test_metadata)
+        upload_results = get_publishing_service().upload_video_to_all_platforms(test_video_path, test_metadata)
+        thumbnail_path = get_publishing_service().generate_thumbnail(test_video_path, test_metadata)
 
         result = {
             'test_status': 'completed',
@@ -5,14 +5,13 @@ Handles autonomous topic selection and performance tracking
 
 from flask import Blueprint, request, jsonify
 from src.models.topic_selector import TopicSelector, ContentType, AgeGroup
+from src.services.service_registry import get_topic_selector
+from src.services.topic_state_store import get_topic_state_store
 from datetime import datetime
 import json
 
 topic_bp = Blueprint('topics', __name__)
 
-# Initialize topic selector
-topic_selector = TopicSelector()
-
 @topic_bp.route('/select', methods=['POST'])
 def select_topic():
     """Select next topic for content generation"""
@@ -34,7 +33,7 @@ def select_topic():
                 }), 400
         
         # Select topic
-        selection = topic_selector.select_next_topic(target_age_group)
+        selection = get_topic_selector().select_next_topic(target_age_group)
         
         # Convert to JSON-serializable format
         result = {
@@ -97,7 +96,7 @@ def update_performance():
                 }), 400
         
         # Update performance data
-        topic_selector.update_performance_data(
+        get_topic_selector().update_performance_data(
             topic=topic,
             content_type=content_type,
             age_group=age_group,
@@ -124,7 +123,7 @@ def get_analytics():
     """Get comprehensive performance analytics"""
     
     try:
-        analytics = topic_selector.get_performance_analytics()
+        analytics = get_topic_selector().get_performance_analytics()
         
         # Add timestamp
         analytics['generated_at'] = str(datetime.now())
@@ -147,9 +146,9 @@ def get_topic_categories():
             'content_types': [ct.value for ct in ContentType],
             'age_groups': [ag.value for ag in AgeGroup],
             'topic_categories': {
-                ct.value: topics for ct, topics in topic_selector.topic_categories.items()
+                ct.value: topics for ct, topics in get_topic_selector().topic_categories.items()
             },
-            'selection_weights': topic_selector.selection_weights,
+            'selection_weights': get_topic_selector().selection_weights,
             'status': 'success'
         }
         
@@ -174,7 +173,7 @@ def get_performance_history():
         # Filter performance data
         performance_data = []
         
-        for key, perf in topic_selector.performance_database.items():
+        for key, perf in get_topic_selector().performance_database.items():
             # Apply filters
             if content_type_filter and perf.content_type.value != content_type_filter:
                 continue
@@ -199,7 +198,7 @@ def get_performance_history():
         
         result = {
             'performance_history': performance_data,
-            'total_topics': len(topic_selector.performance_database),
+            'total_topics': len(get_topic_selector().performance_database),
             'filtered_count': len(performance_data),
             'filters_applied': {
                 'content_type': content_type_filter,
@@ -223,7 +222,7 @@ def get_diversity_status():
     """Get current diversity status and recommendations"""
     
     try:
-        diversity_data = topic_selector.diversity_tracker
+        diversity_data = get_topic_selector().diversity_tracker
         
         # Calculate diversity recommendations
         recommendations = []
@@ -286,20 +285,22 @@ def simulate_topic_selection():
                     'valid_age_groups': [ag.value for ag in AgeGroup]
                 }), 400
         
-        # Simulate selections
+        # Simulate selections against a copy of the state, so the picks never reach the real history
         simulated_selections = []
         
-        for i in range(num_selections):
-            selection = topic_selector.select_next_topic(target_age_group)
-            
-            simulated_selections.append({
-                'selection_number': i + 1,
-                'topic': selection.topic,
-                'content_type': selection.content_type.value,
-                'age_group': selection.age_group.value,
-                'priority_score': selection.priority_score,
-                'selection_reason': selection.selection_reason
-            })
+        with get_topic_state_store().scratch_copy() as scratch_store:
+            selector = TopicSelector(scratch_store)
+            for i in range(num_selections):
+                selection = selector.select_next_topic(target_age_group)
+                
+                simulated_selections.append({
+                    'selection_number': i + 1,
+                    'topic': selection.topic,
+                    'content_type': selection.content_type.value,
+                    'age_group': selection.age_group.value,
+                    'priority_score': selection.priority_score,
+                    'selection_reason': selection.selection_reason
+                })
         
         # Analyze simulation results
         content_type_distribution = {}
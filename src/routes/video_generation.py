@@ -3,16 +3,21 @@ Video Generation API Routes
 Handles complete video creation and assembly
 """
 
-from flask import Blueprint, request, jsonify, send_file
-from src.services.video_generation_service import VideoGenerationService
+from flask import Blueprint, request, jsonify
+from src.services.ffmpeg_capabilities import get_capability_registry
+from src.services.ffmpeg_runner import ACTIVE_STATUSES, get_job_runner
+from src.services.video_job_queue import JOB_STATUSES, AdmissionRejected, get_job_queue, get_worker_pool
+from src.services.job_scheduler import PRIORITY_CLASSES
+from src.routes.admission import admission_controlled, admission_rejected_response
+from src.services.service_registry import get_video_service, get_pipeline_runs
+from src.services.file_delivery import send_download
+from src.models.content_generator import AgeGroup
 from datetime import datetime
 import os
+import uuid
 
 video_bp = Blueprint('video', __name__)
 
-# Initialize video generation service
-video_service = VideoGenerationService()
-
 @video_bp.route('/generate', methods=['POST'])
 def generate_video():
     """Generate complete educational video"""
@@ -39,39 +44,30 @@ def generate_video():
                 'status': 'error'
             }), 400
         
-        # Generate video
-        video_project = video_service.create_educational_video(content_data)
+        render_profile = data.get('render_profile', 'final')
+        if render_profile not in get_video_service().get_render_profiles():
+            return jsonify({
+                'error': f'Invalid render_profile: {render_profile}',
+                'valid_render_profiles': list(get_video_service().get_render_profiles()),
+                'status': 'error'
+            }), 400
         
-        # Check if video was created successfully
-        video_info = video_service.get_video_info(video_project.project_id)
+        # Manual requests are best-effort unless the caller gives a priority or deadline
+        priority, deadline, error_response = _parse_schedule(data, 'best_effort')
+        if error_response:
+            return error_response
         
-        if video_info and video_info.get('exists'):
-            result = {
-                'project_id': video_project.project_id,
-                'title': video_project.title,
-                'content_type': video_project.content_type,
-                'age_group': video_project.age_group,
-                'duration_seconds': video_project.total_duration,
-                'output_path': video_project.output_path,
-                'file_info': video_info,
-                'metadata': video_project.metadata,
-                'scenes_count': len(video_project.scenes),
-                'characters_used': video_project.metadata.get('characters_used', []),
-                'visual_style': video_project.metadata.get('visual_style', 'bright_colorful'),
-                'audio_style': video_project.metadata.get('audio_style', 'upbeat_cheerful'),
-                'generation_timestamp': datetime.now().isoformat(),
-                'status': 'success'
-            }
-        else:
-            result = {
-                'project_id': video_project.project_id,
-                'title': video_project.title,
-                'error': 'Video file was not created successfully',
-                'status': 'partial_success'
-            }
+        # Queue the job; a worker process does the generation
+        job_id = get_job_queue().submit('generate', {
+            'content_data': content_data,
+            'render_profile': render_profile
+        }, priority=priority, deadline=deadline)
+        get_worker_pool().ensure_started()
         
-        return jsonify(result), 200
+        return jsonify(_accepted_job_response(job_id)), 202
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({
             'error': f'Video generation failed: {str(e)}',
@@ -85,67 +81,336 @@ def generate_autonomous_video():
     try:
         data = request.get_json() or {}
         
-        # Use autonomous topic selection if no specific content provided
-        age_group = data.get('age_group', 'preschool')
-        content_type = data.get('content_type', 'alphabet')
+        # Use autonomous topic selection; age_group narrows the candidates
+        age_group = data.get('age_group')
+        valid_age_groups = [ag.value for ag in AgeGroup]
+        if age_group and age_group not in valid_age_groups:
+            return jsonify({
+                'error': f'Invalid age_group: {age_group}',
+                'valid_age_groups': valid_age_groups,
+                'status': 'error'
+            }), 400
         
-        # Import topic selector for autonomous selection
-        from src.models.topic_selector import TopicSelector
-        topic_selector = TopicSelector()
+        render_profile = data.get('render_profile', 'final')
+        if render_profile not in get_video_service().get_render_profiles():
+            return jsonify({
+                'error': f'Invalid render_profile: {render_profile}',
+                'valid_render_profiles': list(get_video_service().get_render_profiles()),
+                'status': 'error'
+            }), 400
         
-        # Select optimal topic
-        selected_topic = topic_selector.select_optimal_topic(
-            age_group=age_group,
-            content_type=content_type
-        )
+        priority, deadline, error_response = _parse_schedule(data, 'best_effort')
+        if error_response:
+            return error_response
         
-        # Generate content using the selected topic
-        from src.models.content_generator import ContentGenerator
-        content_generator = ContentGenerator()
+        job_id = get_job_queue().submit('autonomous', {
+            'age_group': age_group,
+            'duration_minutes': data.get('duration_minutes', 3),
+            'render_profile': render_profile
+        }, priority=priority, deadline=deadline)
+        get_worker_pool().ensure_started()
         
-        generated_content = content_generator.generate_educational_content(
-            topic=selected_topic['topic'],
-            content_type=content_type,
-            age_group=age_group,
-            duration_minutes=data.get('duration_minutes', 3)
-        )
+        return jsonify(_accepted_job_response(job_id)), 202
         
-        # Create video from generated content
-        video_project = video_service.create_educational_video(generated_content)
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Autonomous video generation failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/pipeline/run', methods=['POST'])
+def run_video_pipeline():
+    """Queue a checkpointed topic-to-publish pipeline run"""
+    
+    try:
+        data = request.get_json() or {}
         
-        # Get video info
-        video_info = video_service.get_video_info(video_project.project_id)
+        content_data = data.get('content_data')
+        if content_data:
+            missing_fields = [field for field in ['topic', 'content_type', 'age_group'] if not content_data.get(field)]
+            if missing_fields:
+                return jsonify({
+                    'error': f'Missing required fields: {", ".join(missing_fields)}',
+                    'status': 'error'
+                }), 400
+        
+        age_group = data.get('age_group')
+        valid_age_groups = [ag.value for ag in AgeGroup]
+        if age_group and age_group not in valid_age_groups:
+            return jsonify({
+                'error': f'Invalid age_group: {age_group}',
+                'valid_age_groups': valid_age_groups,
+                'status': 'error'
+            }), 400
         
-        result = {
-            'project_id': video_project.project_id,
-            'title': video_project.title,
-            'selected_topic': selected_topic,
-            'generated_content': {
-                'topic': generated_content.get('topic'),
-                'content_type': generated_content.get('content_type'),
-                'script_length': len(generated_content.get('script_text', '')),
-                'scenes_count': len(generated_content.get('scene_descriptions', []))
-            },
-            'video_info': video_info,
-            'autonomous_selection': True,
-            'generation_timestamp': datetime.now().isoformat(),
-            'status': 'success' if video_info and video_info.get('exists') else 'partial_success'
-        }
+        render_profile = data.get('render_profile', 'final')
+        if render_profile not in get_video_service().get_render_profiles():
+            return jsonify({
+                'error': f'Invalid render_profile: {render_profile}',
+                'valid_render_profiles': list(get_video_service().get_render_profiles()),
+                'status': 'error'
+            }), 400
         
-        return jsonify(result), 200
+        # The hourly publishing schedule sends a deadline, which makes the run a scheduled job
+        priority, deadline, error_response = _parse_schedule(data, 'interactive')
+        if error_response:
+            return error_response
+        
+        run_id = f"run_{uuid.uuid4().hex[:16]}"
+        job_id = get_job_queue().submit('pipeline', {
+            'run_id': run_id,
+            'run_input': {
+                'content_data': content_data,
+                'age_group': age_group,
+                'duration_minutes': data.get('duration_minutes', 3),
+                'render_profile': render_profile,
+                'publish': data.get('publish', True)
+            }
+        }, priority=priority, deadline=deadline)
+        get_worker_pool().ensure_started()
+        
+        response = _accepted_job_response(job_id)
+        response['run_id'] = run_id
+        response['run_url'] = f'/api/video/pipeline/runs/{run_id}'
+        return jsonify(response), 202
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({
-            'error': f'Autonomous video generation failed: {str(e)}',
+            'error': f'Pipeline run failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/pipeline/runs', methods=['GET'])
+def list_pipeline_runs():
+    """List recent pipeline runs with per-stage status and timings"""
+    
+    try:
+        try:
+            limit = int(request.args.get('limit', 20))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({
+                'error': 'limit must be a positive integer',
+                'status': 'error'
+            }), 400
+        
+        runs = get_pipeline_runs().list_runs(limit)
+        
+        return jsonify({'runs': runs, 'total_runs': len(runs), 'status': 'success'}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Pipeline run listing failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/pipeline/runs/<run_id>', methods=['GET'])
+def get_pipeline_run(run_id):
+    """Get a pipeline run's stages, timings and outputs"""
+    
+    try:
+        run_record = get_pipeline_runs().get_run(run_id)
+        if run_record is None:
+            return jsonify({'error': f'Pipeline run not found: {run_id}', 'status': 'error'}), 404
+        
+        return jsonify({'run': run_record, 'status': 'success'}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Pipeline run retrieval failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/pipeline/runs/<run_id>/resume', methods=['POST'])
+def resume_pipeline_run(run_id):
+    """Resume a failed or abandoned pipeline run; completed stages are served from checkpoints"""
+    
+    try:
+        run_store = get_pipeline_runs()
+        run_record = run_store.get_run(run_id)
+        if run_record is None:
+            return jsonify({'error': f'Pipeline run not found: {run_id}', 'status': 'error'}), 404
+        if run_store.is_active(run_record):
+            return jsonify({'error': f'Pipeline run is still running: {run_id}', 'status': 'error'}), 409
+        
+        priority, deadline, error_response = _parse_schedule(request.get_json(silent=True) or {}, 'interactive')
+        if error_response:
+            return error_response
+        
+        job_id = get_job_queue().submit('pipeline', {'run_id': run_id, 'run_input': run_record['run_input']},
+                                  priority=priority, deadline=deadline)
+        get_worker_pool().ensure_started()
+        
+        response = _accepted_job_response(job_id)
+        response['run_id'] = run_id
+        response['run_url'] = f'/api/video/pipeline/runs/{run_id}'
+        return jsonify(response), 202
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Pipeline resume failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/jobs', methods=['GET'])
+def list_video_jobs():
+    """List video generation jobs"""
+    
+    try:
+        status = request.args.get('status')
+        
+        if status and status not in JOB_STATUSES:
+            return jsonify({
+                'error': f'Invalid status. Must be one of: {JOB_STATUSES}',
+                'status': 'error'
+            }), 400
+        
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({
+                'error': 'limit must be a positive integer',
+                'status': 'error'
+            }), 400
+        
+        jobs = get_job_queue().list_jobs(status, limit)
+        
+        return jsonify({
+            'jobs': jobs,
+            'total_jobs': len(jobs),
+            'queue_stats': get_job_queue().get_stats(),
+            'workers': get_worker_pool().get_status(),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Job listing failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/jobs/schedule', methods=['GET'])
+def get_job_schedule():
+    """Forecast when queued jobs will run and which deadlines are at risk"""
+    
+    try:
+        return jsonify({
+            'forecast': get_job_queue().get_schedule_forecast(),
+            'limits': get_job_queue().get_limits(),
+            'status': 'success'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Schedule forecast failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Get a video generation job's status and, once finished, its result"""
+    
+    try:
+        job = get_job_queue().get_job(job_id)
+        if job is None:
+            return jsonify({'error': f'Job not found: {job_id}', 'status': 'error'}), 404
+        
+        return jsonify({'job': job, 'status': 'success'}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Job retrieval failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_video_job(job_id):
+    """Cancel a video generation job that has not started"""
+    
+    try:
+        if get_job_queue().get_job(job_id) is None:
+            return jsonify({'error': f'Job not found: {job_id}', 'status': 'error'}), 404
+        
+        cancelled = get_job_queue().cancel(job_id)
+        
+        return jsonify({
+            'job_id': job_id,
+            'cancelled': cancelled,
+            'job': get_job_queue().get_job(job_id),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Job cancellation failed: {str(e)}',
             'status': 'error'
         }), 500
 
+def _accepted_job_response(job_id):
+    """Response body for a newly queued job"""
+    
+    job = get_job_queue().get_job(job_id)
+    forecast = get_job_queue().get_schedule_forecast()
+    
+    return {
+        'job_id': job_id,
+        'job_status': 'queued',
+        'status_url': f'/api/video/jobs/{job_id}',
+        'trace_id': job['trace_id'],
+        'trace_url': f"/api/status/traces/{job['trace_id']}" if job['trace_id'] else None,
+        'submitted_at': datetime.now().isoformat(),
+        'schedule': {
+            'priority': job['priority'],
+            'deadline': job['deadline'],
+            'deferred_until': job['not_before'],
+            'estimated_seconds': job['estimated_seconds'],
+            'estimated_finish': forecast['jobs'].get(job_id, {}).get('estimated_finish'),
+            'deadline_at_risk': job_id in forecast['deadlines_at_risk']
+        },
+        'status': 'accepted'
+    }
+
+def _parse_schedule(data, default_priority):
+    """Priority class and deadline (ISO 8601 or Unix time) from a request body"""
+    
+    deadline = data.get('deadline')
+    priority = data.get('priority') or ('scheduled' if deadline is not None else default_priority)
+    
+    if priority not in PRIORITY_CLASSES:
+        return None, None, (jsonify({
+            'error': f'Invalid priority: {priority}',
+            'valid_priorities': PRIORITY_CLASSES,
+            'status': 'error'
+        }), 400)
+    
+    if deadline is not None:
+        try:
+            deadline = float(deadline) if isinstance(deadline, (int, float)) else datetime.fromisoformat(deadline).timestamp()
+        except (TypeError, ValueError):
+            return None, None, (jsonify({
+                'error': f'Invalid deadline: {deadline}. Use ISO 8601 or Unix time',
+                'status': 'error'
+            }), 400)
+    elif priority == 'scheduled':
+        return None, None, (jsonify({'error': 'Scheduled jobs need a deadline', 'status': 'error'}), 400)
+    
+    return priority, deadline, None
+
 @video_bp.route('/project/<project_id>', methods=['GET'])
 def get_video_project(project_id):
     """Get information about a video project"""
     
     try:
-        video_info = video_service.get_video_info(project_id)
+        video_info = get_video_service().get_video_info(project_id)
         
         if not video_info:
             return jsonify({
@@ -161,12 +426,63 @@ def get_video_project(project_id):
             'status': 'error'
         }), 500
 
+@video_bp.route('/project/<project_id>/promote', methods=['POST'])
+def promote_video(project_id):
+    """Queue a re-render of a project with another profile (draft to final) without regenerating assets"""
+    
+    try:
+        video_service = get_video_service()
+        
+        data = request.get_json(silent=True) or {}
+        render_profile = data.get('render_profile', 'final')
+        
+        if render_profile not in video_service.get_render_profiles():
+            return jsonify({
+                'error': f'Invalid render_profile: {render_profile}',
+                'valid_render_profiles': list(video_service.get_render_profiles()),
+                'status': 'error'
+            }), 400
+        
+        video_info = video_service.get_video_info(project_id)
+        if not video_info:
+            return jsonify({
+                'error': f'Video project not found: {project_id}',
+                'status': 'error'
+            }), 404
+        
+        priority, deadline, error_response = _parse_schedule(data, 'best_effort')
+        if error_response:
+            return error_response
+        
+        # A render can take minutes, so a worker process does it like any other job
+        duration_seconds = video_info.get('duration_seconds')
+        job_id = get_job_queue().submit('promote', {
+            'project_id': project_id,
+            'render_profile': render_profile,
+            'duration_minutes': duration_seconds / 60.0 if duration_seconds else None
+        }, priority=priority, deadline=deadline)
+        get_worker_pool().ensure_started()
+        
+        response = _accepted_job_response(job_id)
+        response['project_id'] = project_id
+        response['render_profile'] = render_profile
+        response['project_url'] = f'/api/video/project/{project_id}'
+        return jsonify(response), 202
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Video promotion failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @video_bp.route('/project/<project_id>/download', methods=['GET'])
 def download_video(project_id):
     """Download a generated video file"""
     
     try:
-        video_info = video_service.get_video_info(project_id)
+        video_info = get_video_service().get_video_info(project_id)
         
         if not video_info or not video_info.get('exists'):
             return jsonify({
@@ -176,11 +492,12 @@ def download_video(project_id):
         
         file_path = video_info['file_path']
         
-        return send_file(
+        # Range requests let previews seek and interrupted downloads resume
+        return send_download(
             file_path,
-            as_attachment=True,
             download_name=f"{project_id}.mp4",
-            mimetype='video/mp4'
+            mimetype='video/mp4',
+            content_hash=video_info.get('content_hash')
         )
         
     except Exception as e:
@@ -225,7 +542,8 @@ def get_video_styles():
                     'Encouraging tone'
                 ]
             },
-            'main_characters': video_service.main_characters,
+            'main_characters': get_video_service().main_characters,
+            'render_profiles': get_video_service().get_render_profiles(),
             'status': 'success'
         }
         
@@ -243,8 +561,8 @@ def get_characters():
     
     try:
         characters_info = {
-            'main_characters': video_service.main_characters,
-            'character_count': len(video_service.main_characters),
+            'main_characters': get_video_service().main_characters,
+            'character_count': len(get_video_service().main_characters),
             'consistency_features': [
                 'Unique fictional characters',
                 'Consistent across all videos',
@@ -263,10 +581,13 @@ def get_characters():
         }), 500
 
 @video_bp.route('/test', methods=['POST'])
+@admission_controlled('video_test', estimate_payload={'render_profile': 'draft', 'duration_minutes': 2})
 def test_video_generation():
     """Test video generation with sample content"""
     
     try:
+        video_service = get_video_service()
+        
         # Sample test content
         test_content = {
             "topic": "Letter A",
@@ -289,8 +610,18 @@ def test_video_generation():
             ]
         }
         
+        # Test renders default to the draft profile for fast QA turnaround
+        data = request.get_json(silent=True) or {}
+        render_profile = data.get('render_profile', 'draft')
+        if render_profile not in video_service.get_render_profiles():
+            return jsonify({
+                'error': f'Invalid render_profile: {render_profile}',
+                'valid_render_profiles': list(video_service.get_render_profiles()),
+                'status': 'error'
+            }), 400
+        
         # Generate test video
-        video_project = video_service.create_educational_video(test_content)
+        video_project = video_service.create_educational_video(test_content, render_profile=render_profile)
         
         # Get video info
         video_info = video_service.get_video_info(video_project.project_id)
@@ -318,7 +649,7 @@ def cleanup_temp_files():
     """Clean up temporary video files"""
     
     try:
-        video_service.cleanup_temp_files()
+        get_video_service().cleanup_temp_files()
         
         return jsonify({
             'message': 'Temporary files cleaned up successfully',
@@ -332,11 +663,111 @@ def cleanup_temp_files():
             'status': 'error'
         }), 500
 
+@video_bp.route('/render-jobs', methods=['GET'])
+def list_render_jobs():
+    """List ffmpeg render jobs with their live progress"""
+    
+    try:
+        status = request.args.get('status')
+        valid_statuses = list(ACTIVE_STATUSES) + ['completed', 'failed', 'cancelled', 'timed_out']
+        if status and status not in valid_statuses:
+            return jsonify({
+                'error': f'Invalid status. Must be one of: {valid_statuses}',
+                'status': 'error'
+            }), 400
+        
+        runner = get_job_runner()
+        jobs = runner.list_jobs(status)
+        
+        return jsonify({
+            'jobs': jobs,
+            'total_jobs': len(jobs),
+            'runner': runner.get_stats(),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Render job listing failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/render-jobs/<job_id>', methods=['GET'])
+def get_render_job(job_id):
+    """Get one render job's status and progress"""
+    
+    try:
+        job = get_job_runner().get_job(job_id)
+        if job is None:
+            return jsonify({'error': f'Render job not found: {job_id}', 'status': 'error'}), 404
+        
+        return jsonify({'job': job.to_dict(), 'status': 'success'}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Render job retrieval failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/render-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_render_job(job_id):
+    """Cancel a queued or running render job"""
+    
+    try:
+        runner = get_job_runner()
+        if runner.get_job(job_id) is None:
+            return jsonify({'error': f'Render job not found: {job_id}', 'status': 'error'}), 404
+        
+        cancelled = runner.cancel(job_id)
+        # The pool thread records the final state once the process has exited;
+        # a process slow to stop is still reported, as cancelling
+        job = runner.wait(job_id, timeout=5) or runner.get_job(job_id)
+        if job is not None and job.status not in ACTIVE_STATUSES:
+            state = job.status
+        else:
+            state = 'cancelling' if cancelled else 'unknown'
+        
+        return jsonify({
+            'job_id': job_id,
+            'cancelled': cancelled,
+            'state': state,
+            'job': job.to_dict() if job is not None else None,
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Render job cancellation failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@video_bp.route('/capabilities', methods=['GET'])
+def get_ffmpeg_capabilities():
+    """Get the cached ffmpeg capabilities (encoders, filters, pixel formats, threads)"""
+    
+    try:
+        capabilities = get_capability_registry()
+        if request.args.get('refresh', 'false').lower() == 'true':
+            capabilities.probe(force=True)
+        
+        return jsonify({
+            'capabilities': capabilities.get_capabilities(),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Capability lookup failed: {str(e)}',
+            'status': 'error'
+        }), 500
+
 @video_bp.route('/health', methods=['GET'])
 def video_service_health():
     """Check video generation service health"""
     
     try:
+        video_service = get_video_service()
+        
         # Check if required directories exist
         directories_exist = all([
             os.path.exists(video_service.video_output_dir),
@@ -344,18 +775,18 @@ def video_service_health():
             os.path.exists(video_service.assets_dir)
         ])
         
-        # Check if ffmpeg is available
-        import subprocess
-        try:
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-            ffmpeg_available = True
-        except:
-            ffmpeg_available = False
+        # Answered from the startup probe; ?refresh=true re-probes the toolchain
+        capabilities = get_capability_registry()
+        if request.args.get('refresh', 'false').lower() == 'true':
+            capabilities.probe(force=True)
+        ffmpeg_summary = capabilities.get_summary()
+        ffmpeg_available = ffmpeg_summary['available']
         
         health_status = {
             'service': 'video_generation',
             'directories_exist': directories_exist,
             'ffmpeg_available': ffmpeg_available,
+            'ffmpeg': ffmpeg_summary,
             'characters_loaded': len(video_service.main_characters),
             'visual_style': video_service.visual_style.value,
             'audio_style': video_service.audio_style.value,
@@ -2,16 +2,54 @@
 import os
 from typing import Optional
 
+from src.services.ffmpeg_runner import get_job_runner
+from src.services.metrics_registry import operation_timer
+from src.services.tracing import trace_span
+from src.utils.logger import get_logger
+
+logger = get_logger("publishing")
+
 class AutomatedPublishingService:
-    def __init__(self, config_dir: Optional[str] = None):
+    def __init__(self, config_dir: Optional[str] = None, thumbnails_dir: Optional[str] = None):
         if config_dir is None:
             config_dir = os.path.join(os.getcwd(), "publishing_config")
+        if thumbnails_dir is None:
+            thumbnails_dir = os.path.join(os.getcwd(), "generated-assets", "thumbnails")
         os.makedirs(config_dir, exist_ok=True)
+        os.makedirs(thumbnails_dir, exist_ok=True)
         self.config_dir = config_dir
+        self.thumbnails_dir = thumbnails_dir
 
+    @operation_timer("publish")
+    @trace_span("publish", category="publish")
     def publish_to_youtube(self, video_path, title, description):
-        print(f"Publishing {video_path} with title: {title}")
+        logger.info(f"Publishing {video_path} with title: {title}",
+                    extra={"details": {"video_path": video_path, "title": title}})
         # Placeholder: actual publishing logic goes here
 
+    def generate_thumbnail(self, video_path, metadata=None):
+        with operation_timer("thumbnail") as timer, trace_span("thumbnail", category="publish"):
+            thumbnail_path = self._render_thumbnail(video_path, metadata)
+            if thumbnail_path is None:
+                timer.status = "failed"
+        return thumbnail_path
+
+    def _render_thumbnail(self, video_path, metadata=None):
+        # Grab a frame a third of the way in, past the intro card
+        duration = (metadata or {}).get("duration_seconds") or 3
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        thumbnail_path = os.path.join(self.thumbnails_dir, f"{video_name}.jpg")
+        cmd = [
+            'ffmpeg', '-y', '-hide_banner', '-nostdin',
+            '-ss', f'{duration / 3:.3f}', '-i', video_path,
+            '-frames:v', '1', '-vf', 'scale=1280:720:force_original_aspect_ratio=decrease', '-q:v', '2',
+            thumbnail_path
+        ]
+        job = get_job_runner().run(cmd, timeout_seconds=60, label=f"thumbnail {video_name}")
+        if job.status != "completed":
+            logger.error(f"Thumbnail generation failed: {job.error}", extra={"details": {"video_path": video_path}})
+            return None
+        return thumbnail_path
+
     def load_config(self):
         return {"status": "Config loaded from " + self.config_dir}
@@ -0,0 +1,343 @@
+"""
+Configuration Store
+Versioned pipeline configuration published as immutable snapshots and shared across processes
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Callable, Mapping
+
+from src.utils.logger import get_logger
+
+logger = get_logger("config_store")
+
+# Every configurable setting and its default; a stored version only holds what was changed,
+# so settings added here later show up with their defaults
+DEFAULT_CONFIG = {
+    "content_generation": {
+        "default_video_duration_minutes": 5,
+        "quality_threshold": 0.85,
+        "auto_retry_enabled": True,
+        "max_retry_attempts": 3
+    },
+    "topic_selection": {
+        "performance_weight": 0.4,
+        "freshness_weight": 0.2,
+        "diversity_weight": 0.2,
+        "educational_weight": 0.1,
+        "seasonal_weight": 0.1,
+        "diversity_window_size": 10
+    },
+    "quality_assurance": {
+        "content_validation_enabled": True,
+        "safety_check_enabled": True,
+        "educational_validation_enabled": True,
+        "age_appropriateness_check_enabled": True,
+        "minimum_validation_score": 0.8
+    },
+    "performance_tracking": {
+        "metrics_collection_enabled": True,
+        "analytics_update_interval_minutes": 15,
+        "performance_history_retention_days": 365,
+        "trend_analysis_enabled": True
+    },
+    "system_settings": {
+        "max_stage_workers": 4,
+        "max_tts_workers": 4,
+        "max_ffmpeg_jobs": 0,  # 0 runs one ffmpeg process per CPU
+        "resource_monitoring_enabled": True,
+        "auto_scaling_enabled": False,
+        "backup_enabled": True,
+        "backup_interval_hours": 24
+    }
+}
+
+# Allowed (minimum, maximum) for numeric settings; any other number just has to be non-negative
+SETTING_BOUNDS = {
+    "performance_weight": (0, 1),
+    "freshness_weight": (0, 1),
+    "diversity_weight": (0, 1),
+    "educational_weight": (0, 1),
+    "seasonal_weight": (0, 1),
+    "diversity_window_size": (1, 20),
+    "quality_threshold": (0, 1),
+    "minimum_validation_score": (0, 1),
+    "max_stage_workers": (1, 16),
+    "max_tts_workers": (1, 16),
+    "max_ffmpeg_jobs": (0, 32)
+}
+
+# Old versions kept for the history endpoint and rollbacks
+CONFIG_HISTORY_SIZE = 100
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """One published configuration version; never modified after it is built"""
+    
+    version: int
+    values: Mapping[str, Mapping[str, Any]]
+    updated_at: Optional[float]
+    
+    def get(self, section: str, name: str) -> Any:
+        """One setting's value"""
+        
+        return self.values[section][name]
+    
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Plain, mutable copy of every section"""
+        
+        return {section: dict(settings) for section, settings in self.values.items()}
+
+def _build_snapshot(version: int, overrides: Dict[str, Dict[str, Any]], updated_at: Optional[float]) -> ConfigSnapshot:
+    """Defaults with stored overrides applied, frozen"""
+    
+    values = {}
+    for section, defaults in DEFAULT_CONFIG.items():
+        settings = dict(defaults)
+        settings.update({
+            name: value for name, value in (overrides.get(section) or {}).items() if name in defaults
+        })
+        values[section] = MappingProxyType(settings)
+    return ConfigSnapshot(version=version, values=MappingProxyType(values), updated_at=updated_at)
+
+def validate_config_changes(changes: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Check section names, setting names and value types; raises ValueError on the first problem"""
+    
+    if not isinstance(changes, dict):
+        raise ValueError("Configuration must be an object of sections")
+    
+    for section, settings in changes.items():
+        if section not in DEFAULT_CONFIG:
+            raise ValueError(f"Unknown section: {section}")
+        if not isinstance(settings, dict):
+            raise ValueError(f"Section {section} must be an object")
+        for name, value in settings.items():
+            if name not in DEFAULT_CONFIG[section]:
+                raise ValueError(f"Unknown setting: {section}.{name}")
+            default = DEFAULT_CONFIG[section][name]
+            if isinstance(default, bool):
+                if not isinstance(value, bool):
+                    raise ValueError(f"{section}.{name} must be true or false")
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{section}.{name} must be a number")
+            if isinstance(default, int) and not isinstance(value, int):
+                raise ValueError(f"{section}.{name} must be an integer")
+            minimum, maximum = SETTING_BOUNDS.get(name, (0, None))
+            if value < minimum or (maximum is not None and value > maximum):
+                bounds = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+                raise ValueError(f"{section}.{name} must be {bounds}")
+    return changes
+
+class ConfigConflict(Exception):
+    """An update was based on a version that is no longer current"""
+
+class ConfigStore:
+    """Versioned configuration shared by every process that opens the same database
+    
+    Readers call current() and get the published snapshot with a plain attribute
+    read; no lock is taken. Updates write a new version row and swap the snapshot
+    reference in one assignment. Other processes pick the version up from a
+    background poller within poll_interval_seconds.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, poll_interval_seconds: Optional[float] = None):
+        if db_path is None:
+            db_path = os.environ.get("PIPELINE_CONFIG_DB") or os.path.join(
+                os.getcwd(), "generated-assets", "config", "pipeline_config.db"
+            )
+        self.db_path = db_path
+        self.poll_interval_seconds = poll_interval_seconds or float(os.environ.get("PIPELINE_CONFIG_POLL_SECONDS", 2.0))
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._subscribers: List[Callable[[ConfigSnapshot], None]] = []
+        self._swap_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._create_schema()
+        self._snapshot = self._load_latest() or _build_snapshot(0, {}, None)
+    
+    def current(self) -> ConfigSnapshot:
+        """The published configuration snapshot"""
+        
+        return self._snapshot
+    
+    def update(self, changes: Dict[str, Dict[str, Any]], expected_version: Optional[int] = None) -> ConfigSnapshot:
+        """Validate and publish changes as a new version, returning its snapshot
+        
+        With expected_version, the update is refused with ConfigConflict if another
+        writer published a version since.
+        """
+        
+        validate_config_changes(changes)
+        
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT version, config FROM config_versions ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+            version, overrides = (row["version"], json.loads(row["config"])) if row else (0, {})
+            if expected_version is not None and expected_version != version:
+                connection.execute("ROLLBACK")
+                raise ConfigConflict(f"Configuration is at version {version}, not {expected_version}")
+            
+            for section, settings in changes.items():
+                overrides.setdefault(section, {}).update(settings)
+            now = time.time()
+            connection.execute(
+                "INSERT INTO config_versions (version, config, changes, created_at) VALUES (?, ?, ?, ?)",
+                (version + 1, json.dumps(overrides), json.dumps(changes), now)
+            )
+            connection.execute(
+                "DELETE FROM config_versions WHERE version <= ?", (version + 1 - CONFIG_HISTORY_SIZE,)
+            )
+            connection.execute("COMMIT")
+        
+        snapshot = _build_snapshot(version + 1, overrides, now)
+        self._publish(snapshot)
+        logger.info(f"Configuration version {snapshot.version} published",
+                    extra={"details": {"version": snapshot.version, "changes": changes}})
+        return snapshot
+    
+    def refresh(self) -> bool:
+        """Load a newer stored version if there is one; returns whether the snapshot changed"""
+        
+        with self._connect() as connection:
+            row = connection.execute("SELECT MAX(version) AS version FROM config_versions").fetchone()
+        if row["version"] is None or row["version"] <= self._snapshot.version:
+            return False
+        
+        snapshot = self._load_latest()
+        if snapshot is None:
+            return False
+        return self._publish(snapshot)
+    
+    def get_history(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Recent versions and what each one changed, newest first"""
+        
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT version, changes, created_at FROM config_versions ORDER BY version DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {
+                "version": row["version"],
+                "changes": json.loads(row["changes"]),
+                "created_at": datetime.fromtimestamp(row["created_at"]).isoformat()
+            }
+            for row in rows
+        ]
+    
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]):
+        """Call back with each newly published snapshot, from the publishing thread"""
+        
+        self._subscribers.append(callback)
+    
+    def start(self) -> "ConfigStore":
+        """Start polling for versions published by other processes"""
+        
+        with self._swap_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="config-poller", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the polling thread"""
+        
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(self.poll_interval_seconds + 1)
+    
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval_seconds):
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                # A busy or briefly unreachable database; the next poll tries again
+                logger.warning(f"Configuration poll failed: {e}")
+    
+    def _publish(self, snapshot: ConfigSnapshot) -> bool:
+        """Swap in a snapshot unless a newer one is already published"""
+        
+        with self._swap_lock:
+            if snapshot.version <= self._snapshot.version:
+                return False
+            # A single reference assignment; readers see either the old or the new snapshot
+            self._snapshot = snapshot
+        
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception:
+                logger.exception("Configuration subscriber failed")
+        return True
+    
+    def _load_latest(self) -> Optional[ConfigSnapshot]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT version, config, created_at FROM config_versions ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return None
+        return _build_snapshot(row["version"], json.loads(row["config"]), row["created_at"])
+    
+    def _after_fork(self):
+        """Forked children get fresh locks and their own poller"""
+        
+        self._swap_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.start()
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode; SQLite connections are cheap"""
+        
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+    
+    def _create_schema(self):
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS config_versions (
+                    version INTEGER PRIMARY KEY,
+                    config TEXT NOT NULL,
+                    changes TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+_config_store: Optional[ConfigStore] = None
+_config_store_lock = threading.Lock()
+
+def get_config_store() -> ConfigStore:
+    """Get the process-wide configuration store, polling for updates from first use"""
+    
+    global _config_store
+    if _config_store is not None:
+        return _config_store
+    with _config_store_lock:
+        if _config_store is None:
+            _config_store = ConfigStore().start()
+            # Windows has no fork (nor register_at_fork); spawned processes start fresh anyway
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=_config_store._after_fork)
+        return _config_store
+
+def get_config() -> ConfigSnapshot:
+    """The current configuration snapshot; cheap enough to call on hot paths"""
+    
+    return get_config_store().current()
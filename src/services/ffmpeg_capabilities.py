@@ -0,0 +1,265 @@
+"""
+FFmpeg Capability Registry
+Probes the installed ffmpeg once and answers capability questions from the cache
+"""
+
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger("ffmpeg_capabilities")
+
+# Encoders tried fastest-first for each codec
+ENCODER_PREFERENCES = {
+    "H.264": ["h264_nvenc", "h264_qsv", "h264_videotoolbox", "libx264", "libopenh264"],
+    "H.265": ["hevc_nvenc", "hevc_qsv", "hevc_videotoolbox", "libx265"]
+}
+
+# Software encoders work wherever they are listed; anything else needs a device,
+# so it is only selected after a test encode succeeds
+SOFTWARE_ENCODERS = {"libx264", "libx265", "libopenh264"}
+
+# x264-style preset names translated for encoders with their own preset scales.
+# Encoders missing from this table take no preset argument at all.
+ENCODER_PRESETS = {
+    "libx264": None,
+    "libx265": None,
+    "h264_nvenc": {
+        "ultrafast": "p1", "superfast": "p1", "veryfast": "p2", "faster": "p3", "fast": "p3",
+        "medium": "p4", "slow": "p5", "slower": "p6", "veryslow": "p7"
+    },
+    "h264_qsv": {"ultrafast": "veryfast", "superfast": "veryfast"},
+    "hevc_qsv": {"ultrafast": "veryfast", "superfast": "veryfast"}
+}
+ENCODER_PRESETS["hevc_nvenc"] = ENCODER_PRESETS["h264_nvenc"]
+
+class FFmpegCapabilityRegistry:
+    """Cached view of what the local ffmpeg build can do"""
+    
+    def __init__(self, ffmpeg_path: str = "ffmpeg", probe_timeout_seconds: float = 15.0):
+        self.ffmpeg_path = ffmpeg_path
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._capabilities: Optional[Dict[str, Any]] = None
+        self._probe_lock = threading.Lock()
+    
+    def probe(self, force: bool = False) -> Dict[str, Any]:
+        """Probe ffmpeg unless a cached result exists (or force is set)"""
+        
+        with self._probe_lock:
+            if self._capabilities is not None and not force:
+                return self._capabilities
+            
+            started = time.perf_counter()
+            capabilities = self._probe_toolchain()
+            capabilities["probe_seconds"] = time.perf_counter() - started
+            capabilities["probed_at"] = datetime.now().isoformat()
+            
+            # Readers never see a half-built result
+            self._capabilities = capabilities
+            return capabilities
+    
+    def probe_async(self) -> threading.Thread:
+        """Start the initial probe in the background; readers wait on the probe lock"""
+        
+        thread = threading.Thread(target=self.probe, name="ffmpeg-probe", daemon=True)
+        thread.start()
+        return thread
+    
+    def get_capabilities(self) -> Dict[str, Any]:
+        """Cached capabilities, probing on first use"""
+        
+        return self._capabilities or self.probe()
+    
+    def is_available(self) -> bool:
+        """Whether a working ffmpeg was found"""
+        
+        return self.get_capabilities()["available"]
+    
+    def has_encoder(self, name: str) -> bool:
+        """Whether the build includes an encoder"""
+        
+        return name in self.get_capabilities()["encoders"]
+    
+    def has_filter(self, name: str) -> bool:
+        """Whether the build includes a filter"""
+        
+        return name in self.get_capabilities()["filters"]
+    
+    def select_video_encoder(self, codec: str = "H.264") -> Optional[str]:
+        """Fastest working encoder for a codec"""
+        
+        return self.get_capabilities()["selected_encoders"].get(codec)
+    
+    def get_preset_args(self, encoder: str, preset: Optional[str]) -> List[str]:
+        """Preset arguments for an encoder, translating x264 names where needed"""
+        
+        if not preset:
+            return []
+        if encoder not in ENCODER_PRESETS:
+            return []
+        
+        preset_names = ENCODER_PRESETS[encoder] or {}
+        return ['-preset', preset_names.get(preset, preset)]
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """Compact view for health checks"""
+        
+        capabilities = self.get_capabilities()
+        return {
+            "available": capabilities["available"],
+            "version": capabilities["version"],
+            "selected_encoders": capabilities["selected_encoders"],
+            "hardware_encoders": capabilities["hardware_encoders"],
+            "threads": capabilities["threads"],
+            "drawtext_available": "drawtext" in capabilities["filters"],
+            "probed_at": capabilities["probed_at"]
+        }
+    
+    def _probe_toolchain(self) -> Dict[str, Any]:
+        """Run the probe commands and parse their output"""
+        
+        capabilities = {
+            "available": False,
+            "ffmpeg_path": self.ffmpeg_path,
+            "version": None,
+            "configuration": [],
+            "encoders": {},
+            "filters": {},
+            "pixel_formats": [],
+            "hwaccels": [],
+            "hardware_encoders": [],
+            "selected_encoders": {},
+            "threads": {"pthreads": False, "cpu_count": os.cpu_count() or 1},
+            "error": None
+        }
+        
+        version_output = self._run_probe(['-version'])
+        if version_output is None:
+            capabilities["error"] = f"{self.ffmpeg_path} could not be run"
+            return capabilities
+        
+        capabilities["available"] = True
+        lines = version_output.splitlines()
+        if lines and lines[0].startswith("ffmpeg version "):
+            capabilities["version"] = lines[0].split()[2]
+        for line in lines:
+            if line.startswith("configuration:"):
+                capabilities["configuration"] = line.split()[1:]
+        capabilities["threads"]["pthreads"] = "--disable-pthreads" not in capabilities["configuration"]
+        
+        capabilities["encoders"] = self._parse_encoders(self._run_probe(['-encoders']) or "")
+        capabilities["filters"] = self._parse_filters(self._run_probe(['-filters']) or "")
+        capabilities["pixel_formats"] = self._parse_pixel_formats(self._run_probe(['-pix_fmts']) or "")
+        capabilities["hwaccels"] = (self._run_probe(['-hwaccels']) or "").splitlines()[1:]
+        capabilities["hwaccels"] = [name.strip() for name in capabilities["hwaccels"] if name.strip()]
+        
+        for codec, candidates in ENCODER_PREFERENCES.items():
+            for encoder in candidates:
+                if encoder not in capabilities["encoders"]:
+                    continue
+                if encoder not in SOFTWARE_ENCODERS:
+                    if not self._test_encode(encoder):
+                        continue
+                    capabilities["hardware_encoders"].append(encoder)
+                capabilities["selected_encoders"][codec] = encoder
+                break
+        
+        return capabilities
+    
+    def _run_probe(self, args: List[str]) -> Optional[str]:
+        """Run one ffmpeg query and return its stdout, or None on failure"""
+        
+        try:
+            result = subprocess.run(
+                [self.ffmpeg_path, '-hide_banner'] + args,
+                capture_output=True, text=True, timeout=self.probe_timeout_seconds
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"ffmpeg probe {' '.join(args)} failed: {e}")
+            return None
+        
+        return result.stdout if result.returncode == 0 else None
+    
+    def _test_encode(self, encoder: str) -> bool:
+        """Encode a few frames to confirm a device-backed encoder actually works"""
+        
+        return self._run_probe([
+            '-loglevel', 'error', '-f', 'lavfi', '-i', 'color=c=black:s=256x256:r=30:d=0.2',
+            '-c:v', encoder, '-f', 'null', '-'
+        ]) is not None
+    
+    def _parse_encoders(self, output: str) -> Dict[str, Dict[str, Any]]:
+        """Parse `ffmpeg -encoders` into name -> type and threading flags"""
+        
+        encoders = {}
+        in_table = False
+        types = {"V": "video", "A": "audio", "S": "subtitle"}
+        
+        for line in output.splitlines():
+            parts = line.split(None, 2)
+            if not in_table:
+                in_table = bool(parts) and set(parts[0]) == {"-"}
+                continue
+            if len(parts) < 2 or len(parts[0]) != 6:
+                continue
+            flags = parts[0]
+            encoders[parts[1]] = {
+                "type": types.get(flags[0], "unknown"),
+                "frame_threads": flags[1] == "F",
+                "slice_threads": flags[2] == "S",
+                "experimental": flags[3] == "X",
+                "description": parts[2] if len(parts) > 2 else ""
+            }
+        
+        return encoders
+    
+    def _parse_filters(self, output: str) -> Dict[str, Dict[str, Any]]:
+        """Parse `ffmpeg -filters` into name -> flags and pad types"""
+        
+        filters = {}
+        
+        for line in output.splitlines():
+            parts = line.split(None, 3)
+            # Filter rows look like: " TSC name  A->A  description"
+            if len(parts) < 3 or "->" not in parts[2]:
+                continue
+            flags = parts[0]
+            filters[parts[1]] = {
+                "timeline": "T" in flags,
+                "slice_threads": "S" in flags,
+                "io": parts[2]
+            }
+        
+        return filters
+    
+    def _parse_pixel_formats(self, output: str) -> List[str]:
+        """Parse `ffmpeg -pix_fmts` into a list of format names"""
+        
+        pixel_formats = []
+        in_table = False
+        
+        for line in output.splitlines():
+            parts = line.split()
+            if not in_table:
+                in_table = bool(parts) and set(parts[0]) == {"-"}
+                continue
+            if len(parts) >= 2:
+                pixel_formats.append(parts[1])
+        
+        return pixel_formats
+
+_capability_registry: Optional[FFmpegCapabilityRegistry] = None
+_capability_registry_lock = threading.Lock()
+
+def get_capability_registry() -> FFmpegCapabilityRegistry:
+    """Get the process-wide ffmpeg capability registry"""
+    
+    global _capability_registry
+    with _capability_registry_lock:
+        if _capability_registry is None:
+            _capability_registry = FFmpegCapabilityRegistry()
+        return _capability_registry
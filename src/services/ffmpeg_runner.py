@@ -0,0 +1,382 @@
+"""
+FFmpeg Job Runner
+Runs ffmpeg processes on a bounded pool with live progress, cancellation and timeouts
+"""
+
+import os
+import subprocess
+import threading
+import time
+import uuid
+import contextvars
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from src.services.tracing import trace_span
+from src.services.config_store import get_config, get_config_store
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Pool threads are capped here; the configured limit decides how many of them may run ffmpeg at once
+MAX_POOL_THREADS = 32
+
+@dataclass
+class FFmpegJob:
+    job_id: str
+    label: str
+    command: List[str]
+    duration_seconds: Optional[float]
+    timeout_seconds: Optional[float]
+    status: str = "queued"  # queued, running, completed, failed, cancelled, timed_out
+    progress: Dict[str, Any] = field(default_factory=dict)
+    return_code: Optional[int] = None
+    error: Optional[str] = None
+    submitted_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    elapsed_seconds: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable view of the job"""
+        return {
+            "job_id": self.job_id,
+            "label": self.label,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "duration_seconds": self.duration_seconds,
+            "timeout_seconds": self.timeout_seconds,
+            "return_code": self.return_code,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": self.elapsed_seconds
+        }
+
+class FFmpegJobRunner:
+    """Bounded pool of ffmpeg processes with structured progress"""
+    
+    def __init__(self, max_workers: Optional[int] = None, default_timeout_seconds: Optional[float] = None,
+                 history_size: int = 200):
+        # A fixed max_workers ignores system_settings.max_ffmpeg_jobs
+        self._fixed_max_workers = max_workers
+        self.default_timeout_seconds = default_timeout_seconds
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or MAX_POOL_THREADS, thread_name_prefix="ffmpeg-job")
+        self._jobs: "OrderedDict[str, FFmpegJob]" = OrderedDict()
+        self._processes: Dict[str, subprocess.Popen] = {}
+        self._done_events: Dict[str, threading.Event] = {}
+        # Jobs whose submitter will wait() for them; history trimming keeps them until collected
+        self._uncollected: set = set()
+        self._cancel_requested: set = set()
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._active_processes = 0
+        if max_workers is None:
+            # A raised limit should start waiting jobs straight away
+            get_config_store().subscribe(lambda snapshot: self._notify_slots())
+    
+    @property
+    def max_workers(self) -> int:
+        """How many ffmpeg processes may run at once right now"""
+        
+        if self._fixed_max_workers:
+            return self._fixed_max_workers
+        configured = get_config().get("system_settings", "max_ffmpeg_jobs")
+        return min(configured or os.cpu_count() or 1, MAX_POOL_THREADS)
+    
+    def submit(self, command: List[str], duration_seconds: Optional[float] = None,
+               timeout_seconds: Optional[float] = None, label: str = "ffmpeg", awaited: bool = False) -> str:
+        """Queue an ffmpeg command and return its job ID immediately
+        
+        With awaited=True the job stays in the history until wait() has
+        returned it finished, however many jobs are submitted meanwhile.
+        """
+        
+        return self._submit_job(command, duration_seconds, timeout_seconds, label, awaited).job_id
+    
+    def _submit_job(self, command: List[str], duration_seconds: Optional[float], timeout_seconds: Optional[float],
+                    label: str, awaited: bool) -> FFmpegJob:
+        job = FFmpegJob(
+            job_id=uuid.uuid4().hex[:16],
+            label=label,
+            command=list(command),
+            duration_seconds=duration_seconds,
+            timeout_seconds=timeout_seconds if timeout_seconds is not None else self.default_timeout_seconds
+        )
+        
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._done_events[job.job_id] = threading.Event()
+            if awaited:
+                self._uncollected.add(job.job_id)
+            self._trim_history()
+        
+        # Run in a copy of the caller's context so the job's span joins the caller's trace
+        self._executor.submit(contextvars.copy_context().run, self._run_job, job)
+        return job
+    
+    def run(self, command: List[str], duration_seconds: Optional[float] = None,
+            timeout_seconds: Optional[float] = None, label: str = "ffmpeg") -> FFmpegJob:
+        """Run an ffmpeg command on the pool and wait for it to finish"""
+        
+        job = self._submit_job(command, duration_seconds, timeout_seconds, label, awaited=True)
+        return self.wait(job.job_id)
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[FFmpegJob]:
+        """Block until a job finishes (or the wait times out) and return it; None for an unknown job"""
+        
+        with self._lock:
+            job = self._jobs.get(job_id)
+            done_event = self._done_events.get(job_id)
+        if job is None:
+            return None
+        
+        # The job object is held from here, so trimming the history can't lose it
+        if done_event.wait(timeout):
+            with self._lock:
+                self._uncollected.discard(job_id)
+        return job
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job"""
+        
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return False
+            self._cancel_requested.add(job_id)
+            process = self._processes.get(job_id)
+            # Wake a job waiting for a slot so it can finish as cancelled
+            self._slots.notify_all()
+        
+        if process is not None:
+            self._stop_process(process)
+        return True
+    
+    def get_job(self, job_id: str) -> Optional[FFmpegJob]:
+        """Look up a job by ID"""
+        
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def list_jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List known jobs, newest first, optionally filtered by status"""
+        
+        with self._lock:
+            jobs = list(self._jobs.values())
+        
+        return [job.to_dict() for job in reversed(jobs) if status is None or job.status == status]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counts of jobs by status and pool capacity"""
+        
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        
+        return {
+            "max_workers": self.max_workers,
+            "running": statuses.count("running"),
+            "queued": statuses.count("queued"),
+            "tracked_jobs": len(statuses)
+        }
+    
+    def _run_job(self, job: FFmpegJob):
+        """Execute one job on a pool thread"""
+        
+        with trace_span(f"ffmpeg {job.label}", category="ffmpeg", job_id=job.job_id) as span:
+            started = time.perf_counter()
+            self._acquire_slot(job)
+            try:
+                self._execute_job(job)
+            except Exception as e:
+                # Whatever went wrong, the job must end, or run() would wait for it forever
+                with self._lock:
+                    self._processes.pop(job.job_id, None)
+                    if job.status in ACTIVE_STATUSES:
+                        self._finish(job, "failed", started, error=f"ffmpeg job failed: {e}")
+            finally:
+                self._release_slot()
+            if span is not None:
+                span.args["status"] = job.status
+    
+    def _acquire_slot(self, job: FFmpegJob):
+        """Wait until the concurrency limit admits another process; a cancelled job doesn't wait"""
+        
+        with self._slots:
+            self._slots.wait_for(
+                lambda: self._active_processes < self.max_workers or job.job_id in self._cancel_requested
+            )
+            self._active_processes += 1
+    
+    def _release_slot(self):
+        """Free a process slot for the next waiting job"""
+        
+        with self._slots:
+            self._active_processes -= 1
+            self._slots.notify_all()
+    
+    def _notify_slots(self):
+        """Re-check waiting jobs against the current limit"""
+        
+        with self._slots:
+            self._slots.notify_all()
+    
+    def _execute_job(self, job: FFmpegJob):
+        """Run the ffmpeg process, streaming progress, and record how it ended"""
+        
+        started = time.perf_counter()
+        
+        with self._lock:
+            if job.job_id in self._cancel_requested:
+                self._finish(job, "cancelled", started, error="Cancelled before start")
+                return
+            job.status = "running"
+            job.started_at = datetime.now().isoformat()
+        
+        # Progress goes to stdout as key=value blocks; stats on stderr are disabled
+        command = [job.command[0], '-progress', 'pipe:1', '-nostats'] + job.command[1:]
+        stderr_tail: deque = deque(maxlen=50)
+        timed_out = threading.Event()
+        
+        try:
+            # errors="replace": a stray non-UTF-8 byte (a file name, a tag) mustn't kill a pipe reader
+            process = subprocess.Popen(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, text=True, errors="replace", bufsize=1
+            )
+        except OSError as e:
+            with self._lock:
+                self._finish(job, "failed", started, error=f"ffmpeg could not be started: {e}")
+            return
+        
+        with self._lock:
+            self._processes[job.job_id] = process
+            cancel_requested = job.job_id in self._cancel_requested
+        if cancel_requested:
+            self._stop_process(process)
+        
+        # Drain stderr concurrently so a chatty process can never block on a full pipe
+        stderr_thread = threading.Thread(
+            target=lambda: stderr_tail.extend(process.stderr), daemon=True
+        )
+        stderr_thread.start()
+        
+        watchdog = None
+        if job.timeout_seconds:
+            def expire():
+                timed_out.set()
+                self._stop_process(process)
+            watchdog = threading.Timer(job.timeout_seconds, expire)
+            watchdog.daemon = True
+            watchdog.start()
+        
+        try:
+            block: Dict[str, str] = {}
+            for line in process.stdout:
+                key, _, value = line.strip().partition('=')
+                if not key:
+                    continue
+                block[key] = value
+                if key == "progress":
+                    self._update_progress(job, block)
+                    block = {}
+            
+            return_code = process.wait()
+        except BaseException:
+            # Don't leave ffmpeg running (and its pipes filling) behind a failed reader
+            self._stop_process(process)
+            raise
+        finally:
+            stderr_thread.join(timeout=5)
+            if watchdog is not None:
+                watchdog.cancel()
+        
+        with self._lock:
+            self._processes.pop(job.job_id, None)
+            job.return_code = return_code
+            if job.job_id in self._cancel_requested:
+                self._finish(job, "cancelled", started, error="Cancelled while running")
+            elif timed_out.is_set():
+                self._finish(job, "timed_out", started, error=f"Timed out after {job.timeout_seconds}s")
+            elif return_code == 0:
+                self._finish(job, "completed", started)
+            else:
+                self._finish(job, "failed", started, error="".join(stderr_tail)[-2000:])
+    
+    def _update_progress(self, job: FFmpegJob, block: Dict[str, str]):
+        """Convert an ffmpeg -progress block into structured progress"""
+        
+        progress = {
+            "frame": _parse_number(block.get("frame"), int),
+            "fps": _parse_number(block.get("fps"), float),
+            "out_time": block.get("out_time"),
+            "out_time_seconds": None,
+            "speed": _parse_number(block.get("speed", "").rstrip("x"), float),
+            "total_size_bytes": _parse_number(block.get("total_size"), int),
+            "state": block.get("progress")
+        }
+        
+        # out_time_us is microseconds despite older builds naming it out_time_ms
+        out_time_us = _parse_number(block.get("out_time_us") or block.get("out_time_ms"), int)
+        if out_time_us is not None and out_time_us >= 0:
+            progress["out_time_seconds"] = out_time_us / 1_000_000
+        
+        if job.duration_seconds and progress["out_time_seconds"] is not None:
+            progress["percent"] = min(100.0, 100.0 * progress["out_time_seconds"] / job.duration_seconds)
+        
+        with self._lock:
+            job.progress = progress
+    
+    def _finish(self, job: FFmpegJob, status: str, started: float, error: Optional[str] = None):
+        """Record a job's final state (caller holds the lock)"""
+        
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.now().isoformat()
+        job.elapsed_seconds = time.perf_counter() - started
+        self._cancel_requested.discard(job.job_id)
+        self._done_events[job.job_id].set()
+    
+    def _stop_process(self, process: subprocess.Popen, grace_seconds: float = 5.0):
+        """Terminate a process, killing it if it ignores the request"""
+        
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=grace_seconds)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond history_size (caller holds the lock)"""
+        
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status not in ACTIVE_STATUSES and job_id not in self._uncollected]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+            self._done_events.pop(job_id, None)
+
+def _parse_number(value: Optional[str], number_type: type) -> Optional[Any]:
+    """Parse an ffmpeg progress value, which may be 'N/A'"""
+    
+    try:
+        return number_type(value)
+    except (TypeError, ValueError):
+        return None
+
+_job_runner: Optional[FFmpegJobRunner] = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner() -> FFmpegJobRunner:
+    """Get the process-wide ffmpeg job runner"""
+    
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = FFmpegJobRunner()
+        return _job_runner
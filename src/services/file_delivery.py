@@ -0,0 +1,123 @@
+"""
+File Delivery
+Downloads with content-hash ETags, byte ranges, 304s and optional proxy offload
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.utils.helpers import hash_file
+from src.utils.logger import get_logger
+
+logger = get_logger("file_delivery")
+
+# PIPELINE_SENDFILE_MODE: how file bodies leave the process. Unset, Python streams them; with a
+# front proxy, the response only names the file and the proxy sends the bytes (and handles Range)
+SENDFILE_MODES = ["x-accel-redirect", "x-sendfile"]
+HASH_CACHE_SIZE = 4096
+# Generated files can be replaced under the same URL (a promoted render), so caches revalidate
+DOWNLOAD_CACHE_CONTROL = "no-cache"
+
+class ContentHashCache:
+    """File content hashes, kept until the file's size or modification time changes"""
+    
+    def __init__(self, max_entries: int = HASH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, path: str, stat_result: Optional[os.stat_result] = None) -> str:
+        """sha256 of the file, hashing it only if it is new or changed"""
+        
+        stat_result = stat_result or os.stat(path)
+        version = (stat_result.st_size, stat_result.st_mtime_ns)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(path)
+                return cached[1]
+        
+        # Hashed outside the lock; two threads racing on a new file just both hash it
+        content_hash = hash_file(path)
+        with self._lock:
+            self._entries[path] = (version, content_hash)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return content_hash
+
+_content_hashes = ContentHashCache()
+
+def get_sendfile_mode() -> Optional[str]:
+    """Configured offload mode, or None when Python sends file bodies itself"""
+    
+    mode = os.environ.get("PIPELINE_SENDFILE_MODE", "").strip().lower()
+    if mode and mode not in SENDFILE_MODES:
+        logger.warning(f"Unknown PIPELINE_SENDFILE_MODE {mode!r}; sending files directly",
+                       extra={"details": {"mode": mode, "valid_modes": SENDFILE_MODES}})
+        return None
+    return mode or None
+
+def _accel_redirect_uri(path: str) -> Optional[str]:
+    """Internal proxy URI for a file under PIPELINE_ACCEL_REDIRECT_ROOT, or None outside it
+    
+    The proxy maps PIPELINE_ACCEL_REDIRECT_PREFIX onto the same directory, e.g. for nginx:
+        location /internal-assets/ { internal; alias /app/generated-assets/; }
+    """
+    
+    root = os.path.realpath(os.environ.get("PIPELINE_ACCEL_REDIRECT_ROOT") or
+                            os.path.join(os.getcwd(), "generated-assets"))
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([root, real_path]) != root:
+        return None
+    prefix = os.environ.get("PIPELINE_ACCEL_REDIRECT_PREFIX", "/internal-assets/")
+    return prefix.rstrip("/") + "/" + os.path.relpath(real_path, root).replace(os.sep, "/")
+
+def send_download(path: str, download_name: Optional[str] = None, mimetype: Optional[str] = None,
+                  as_attachment: bool = True, content_hash: Optional[str] = None):
+    """Response for a file download
+    
+    The ETag is the content hash (pass it when already known, otherwise it is
+    computed once per file version). A matching If-None-Match gets a 304;
+    Range and If-Range requests get partial content. In an offload mode the
+    body is left to the front proxy, so the worker is free as soon as the
+    headers are written.
+    """
+    
+    from flask import Response, current_app, request, send_file
+    from werkzeug.utils import quote, send_file as send_file_header_only
+    
+    stat_result = os.stat(path)
+    etag = content_hash or _content_hashes.get(path, stat_result)
+    
+    mode = get_sendfile_mode()
+    offload_uri = None
+    if mode == "x-accel-redirect":
+        offload_uri = _accel_redirect_uri(path)
+        if offload_uri is None:
+            logger.debug(f"{path} is outside the accel-redirect root; sending it directly")
+    
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif offload_uri is not None or mode == "x-sendfile":
+        # Headers only, without opening the file; the proxy supplies the body and answers ranges
+        response = send_file_header_only(
+            os.path.realpath(path), request.environ, mimetype=mimetype, as_attachment=as_attachment,
+            download_name=download_name, conditional=False, etag=etag, use_x_sendfile=True,
+            response_class=current_app.response_class
+        )
+        if offload_uri is not None:
+            del response.headers["X-Sendfile"]
+            response.headers["X-Accel-Redirect"] = quote(offload_uri, safe="/")
+        # The body is empty here; the proxy sets the real length
+        del response.headers["Content-Length"]
+    else:
+        response = send_file(path, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name,
+                             etag=etag, conditional=True, max_age=None)
+    
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = DOWNLOAD_CACHE_CONTROL
+    response.accept_ranges = "bytes"
+    return response
@@ -0,0 +1,268 @@
+"""
+Deadline-Aware Job Scheduler
+Earliest-deadline-first ordering with priority classes and duration estimates from stage history
+"""
+
+import heapq
+import statistics
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+
+PRIORITY_CLASSES = ["scheduled", "interactive", "best_effort"]
+
+# Fallback stage durations until enough history exists. Narration and render
+# scale with the video, so theirs are seconds per minute of video.
+DEFAULT_STAGE_SECONDS = {
+    "topic": 1.0,
+    "script": 1.0,
+    "characters": 20.0,
+    "backgrounds": 40.0,
+    "music": 30.0,
+    "narration": 10.0,
+    "render": 60.0,
+    "thumbnail": 2.0,
+    "publish": 15.0
+}
+DEFAULT_RENDER_SECONDS_PER_MINUTE = {
+    "draft": 5.0,
+    "preview": 20.0,
+    "final": 60.0
+}
+PER_MINUTE_STAGES = {"narration", "render"}
+ASSET_STAGES = ["characters", "backgrounds", "music", "narration"]
+
+@dataclass
+class ScheduleItem:
+    item_id: str
+    priority: str
+    deadline: Optional[float]
+    estimated_seconds: float
+    available_at: float  # earliest start: now, or a deferral / reservation time
+    order: float  # submission time, for FIFO among equals
+    
+    def sort_key(self) -> Tuple:
+        """Deadline jobs first by deadline, then interactive, then best-effort, FIFO within a class"""
+        
+        if self.deadline is not None:
+            return (0, self.deadline, self.order)
+        return (1 if self.priority != "best_effort" else 2, self.order)
+
+class DurationEstimator:
+    """Estimates job durations from recent per-stage timings"""
+    
+    def __init__(self, stage_timings: List[Dict[str, Any]]):
+        self.stage_rates = self._summarize(stage_timings)
+    
+    def estimate(self, job_type: str, payload: Dict[str, Any]) -> float:
+        """Expected wall time of a generation job along the pipeline's critical path"""
+        
+        run_input = payload.get("run_input", payload)
+        content_data = run_input.get("content_data") or {}
+        video_minutes = float(content_data.get("duration_minutes") or run_input.get("duration_minutes") or 5)
+        render_profile = run_input.get("render_profile", "final")
+        publish = job_type == "pipeline" and run_input.get("publish", True)
+        
+        # A promotion re-renders a saved plan; its assets already exist
+        if job_type == "promote":
+            return self.stage_seconds("render", video_minutes, render_profile)
+        
+        # Asset stages run concurrently, so only the slowest counts
+        seconds = self.stage_seconds("topic") + self.stage_seconds("script")
+        seconds += max(self.stage_seconds(stage, video_minutes) for stage in ASSET_STAGES)
+        seconds += self.stage_seconds("render", video_minutes, render_profile)
+        seconds += self.stage_seconds("thumbnail")
+        if publish:
+            seconds += self.stage_seconds("publish")
+        
+        return seconds
+    
+    def stage_seconds(self, stage: str, video_minutes: float = 1.0, render_profile: Optional[str] = None) -> float:
+        """Median recent duration of one stage"""
+        
+        rate = self.stage_rates.get((stage, render_profile if stage == "render" else None))
+        if rate is None:
+            if stage == "render":
+                rate = DEFAULT_RENDER_SECONDS_PER_MINUTE.get(render_profile, DEFAULT_STAGE_SECONDS["render"])
+            else:
+                rate = DEFAULT_STAGE_SECONDS.get(stage, 0.0)
+        
+        return rate * video_minutes if stage in PER_MINUTE_STAGES else rate
+    
+    def _summarize(self, stage_timings: List[Dict[str, Any]]) -> Dict[Tuple[str, Optional[str]], float]:
+        """Median duration (or per-minute rate) per stage; render is also split by profile"""
+        
+        samples: Dict[Tuple[str, Optional[str]], List[float]] = {}
+        for timing in stage_timings:
+            stage = timing["stage"]
+            seconds = timing["seconds"]
+            if stage in PER_MINUTE_STAGES:
+                seconds /= max(timing.get("video_minutes") or 1.0, 0.1)
+            profile = timing.get("render_profile") if stage == "render" else None
+            samples.setdefault((stage, profile), []).append(seconds)
+        
+        return {key: statistics.median(values) for key, values in samples.items()}
+
+def simulate_schedule(items: List[ScheduleItem], worker_free_at: List[float],
+                      now: float) -> Dict[str, Tuple[float, float]]:
+    """Non-preemptive list scheduling: each free worker takes the best available item
+    
+    Returns item_id -> (estimated start, estimated finish).
+    """
+    
+    workers = [max(free_at, now) for free_at in worker_free_at] or [now]
+    heapq.heapify(workers)
+    pending = list(items)
+    schedule = {}
+    
+    while pending:
+        free_at = heapq.heappop(workers)
+        available = [item for item in pending if item.available_at <= free_at]
+        if not available:
+            free_at = min(item.available_at for item in pending)
+            available = [item for item in pending if item.available_at <= free_at]
+        
+        item = min(available, key=ScheduleItem.sort_key)
+        pending.remove(item)
+        finish = free_at + item.estimated_seconds
+        schedule[item.item_id] = (free_at, finish)
+        heapq.heappush(workers, finish)
+    
+    return schedule
+
+def find_deadline_misses(items: List[ScheduleItem], schedule: Dict[str, Tuple[float, float]]) -> List[str]:
+    """Items with a deadline that the schedule finishes late"""
+    
+    return [
+        item.item_id for item in items
+        if item.deadline is not None and schedule[item.item_id][1] > item.deadline
+    ]
+
+class DeadlineScheduler:
+    """Decides whether work can run now without making deadline work late"""
+    
+    def __init__(self, estimator: DurationEstimator, settings: Dict[str, int],
+                 covered_deadlines: Optional[List[float]] = None, node_count: int = 1):
+        self.estimator = estimator
+        # Deadlines of scheduled jobs already running or done; their slots need no reservation
+        self.covered_deadlines = covered_deadlines or []
+        self.slot_interval_seconds = settings["slot_interval_minutes"] * 60
+        self.scheduled_lead_seconds = settings["scheduled_lead_minutes"] * 60
+        self.max_defer_seconds = settings["max_defer_minutes"] * 60
+        self.concurrency = settings["max_concurrent_generations"] * node_count
+    
+    def get_slot_reservations(self, known_items: List[ScheduleItem], now: float, slots: int = 2) -> List[ScheduleItem]:
+        """Placeholders for upcoming publishing slots that have no scheduled job yet
+        
+        A slot's job is expected to arrive scheduled_lead before the slot, so work
+        started before then must leave a worker free for it.
+        """
+        
+        scheduled_deadlines = self.covered_deadlines + [
+            item.deadline for item in known_items if item.priority == "scheduled" and item.deadline
+        ]
+        slot_estimate = self.estimator.estimate("pipeline", {"render_profile": "final"})
+        next_slot = (int(now // self.slot_interval_seconds) + 1) * self.slot_interval_seconds
+        
+        reservations = []
+        for i in range(slots):
+            slot_time = next_slot + i * self.slot_interval_seconds
+            if any(slot_time - self.slot_interval_seconds < deadline <= slot_time for deadline in scheduled_deadlines):
+                continue
+            reservations.append(ScheduleItem(
+                item_id=f"slot_{int(slot_time)}",
+                priority="scheduled",
+                deadline=float(slot_time),
+                estimated_seconds=slot_estimate,
+                available_at=max(now, slot_time - self.scheduled_lead_seconds),
+                order=slot_time
+            ))
+        
+        return reservations
+    
+    def plan(self, candidate: ScheduleItem, running_free_at: List[float], queued: List[ScheduleItem],
+             now: float) -> Dict[str, Any]:
+        """Accept, defer or reject a new job
+        
+        Only best-effort work is ever deferred or rejected; scheduled and interactive
+        jobs are always accepted, with their expected finish and deadline risk reported.
+        """
+        
+        known = queued + self.get_slot_reservations(queued + [candidate], now)
+        worker_free_at = self._worker_free_at(running_free_at)
+        schedule = simulate_schedule(known + [candidate], worker_free_at, now)
+        
+        decision = {
+            "action": "accept",
+            "not_before": None,
+            "estimated_seconds": candidate.estimated_seconds,
+            "estimated_start": schedule[candidate.item_id][0],
+            "estimated_finish": schedule[candidate.item_id][1],
+            "deadline_at_risk": candidate.item_id in find_deadline_misses([candidate], schedule),
+            "retry_after_seconds": None
+        }
+        
+        if self.can_start_now(candidate, running_free_at, queued, now):
+            return decision
+        
+        # Hold the job back until the deadline work it would delay is expected to be done
+        baseline = simulate_schedule(known, worker_free_at, now)
+        not_before = max([baseline[item.item_id][1] for item in known if item.deadline is not None] or [now])
+        if not_before - now > self.max_defer_seconds:
+            decision.update({
+                "action": "reject",
+                "retry_after_seconds": max(1, int(not_before - now))
+            })
+            return decision
+        
+        deferred = ScheduleItem(**{**candidate.__dict__, "available_at": not_before})
+        deferred_schedule = simulate_schedule(known + [deferred], worker_free_at, now)
+        decision.update({
+            "action": "defer",
+            "not_before": not_before,
+            "estimated_start": deferred_schedule[candidate.item_id][0],
+            "estimated_finish": deferred_schedule[candidate.item_id][1]
+        })
+        return decision
+    
+    def can_start_now(self, candidate: ScheduleItem, running_free_at: List[float], queued: List[ScheduleItem],
+                      now: float) -> bool:
+        """Whether a best-effort job may take a free worker without delaying deadline work"""
+        
+        if candidate.priority != "best_effort":
+            return True
+        
+        others = [item for item in queued if item.item_id != candidate.item_id]
+        known = others + self.get_slot_reservations(others, now)
+        worker_free_at = self._worker_free_at(running_free_at)
+        
+        baseline = simulate_schedule(known, worker_free_at, now)
+        # Starting now means one worker is busy until the candidate finishes
+        busy = sorted(worker_free_at)
+        busy[0] = max(busy[0], now) + candidate.estimated_seconds
+        with_candidate = simulate_schedule(known, busy, now)
+        
+        # Harmful if any deadline item ends up late, or later than it already would be
+        return not any(
+            with_candidate[item.item_id][1] > max(item.deadline, baseline[item.item_id][1]) + 1
+            for item in known if item.deadline is not None
+        )
+    
+    def forecast(self, running_free_at: List[float], queued: List[ScheduleItem], now: float) -> Dict[str, Any]:
+        """Expected schedule of the queued jobs alongside reserved publishing slots"""
+        
+        reservations = self.get_slot_reservations(queued, now)
+        items = queued + reservations
+        schedule = simulate_schedule(items, self._worker_free_at(running_free_at), now)
+        
+        return {
+            "schedule": schedule,
+            "reservations": reservations,
+            "misses": [item_id for item_id in find_deadline_misses(items, schedule)
+                       if item_id not in {item.item_id for item in reservations}]
+        }
+    
+    def _worker_free_at(self, running_free_at: List[float]) -> List[float]:
+        """Free times for every worker slot; idle workers are free immediately"""
+        
+        idle = max(0, self.concurrency - len(running_free_at))
+        return list(running_free_at) + [0.0] * idle
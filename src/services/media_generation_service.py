@@ -9,7 +9,7 @@ import hashlib
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Import the media generation models from our pipeline
 from src.models.media_generator import (
@@ -17,17 +17,22 @@ from src.models.media_generator import (
     AudioGenerator, AudioStyle, AudioAsset,
     VideoAssembler
 )
+from src.utils.media_tools import generate_image
+from src.utils.file_manager import AssetCatalog, get_asset_catalog
+from src.services.metrics_registry import operation_timer
+from src.services.tracing import trace_span
 
 class MediaGenerationService:
     """Service for generating visual and audio assets using AI tools"""
 
-    def __init__(self, assets_dir: Optional[str] = None):
+    def __init__(self, assets_dir: Optional[str] = None, asset_catalog: Optional[AssetCatalog] = None):
         if assets_dir is None:
             assets_dir = os.path.join(os.getcwd(), "generated-assets")
         self.assets_dir = assets_dir
+        self.asset_catalog = asset_catalog or get_asset_catalog()
         self.visual_generator = VisualGenerator()
-        self.audio_generator = AudioGenerator()
-        self.video_assembler = VideoAssembler()
+        self.audio_generator = AudioGenerator(assets_dir)
+        self.video_assembler = VideoAssembler(assets_dir)
         self._create_asset_directories()
 
     def _create_asset_directories(self):
@@ -46,6 +51,8 @@ class MediaGenerationService:
         for directory in directories:
             os.makedirs(directory, exist_ok=True)
 
+    @operation_timer("asset", kind="character")
+    @trace_span("asset character", category="asset")
     def generate_character_image(self, character_name: str, style: VisualStyle, age_group: str, expression: str = "happy") -> VisualAsset:
         """Generate character image using AI image generation"""
         character_info = self.visual_generator.character_library.get(character_name, {})
@@ -68,7 +75,114 @@ class MediaGenerationService:
         - Brightness: {style_info.get('brightness', 'medium')}
         """
 
-        return self.visual_generator.generate_image(
-            prompt=prompt,
-            character_name=character_name
+        asset = self.visual_generator.generate_character(character_name, style, age_group)
+        asset.metadata["expression"] = expression
+        asset.metadata["generation_prompt"] = prompt.strip()
+
+        file_name = f"{character_name.replace(' ', '_')}_{style.value}_{expression}.png"
+        return self._materialize_visual_asset(asset, "characters", file_name, "portrait")
+
+    @operation_timer("asset", kind="background")
+    @trace_span("asset background", category="asset")
+    def generate_background_image(self, scene_description: str, style: VisualStyle, content_type: str = "educational") -> VisualAsset:
+        """Generate background image using AI image generation"""
+        asset = self.visual_generator.generate_background(scene_description, style)
+        asset.metadata["content_type"] = content_type
+
+        return self._materialize_visual_asset(asset, "backgrounds", os.path.basename(asset.file_path), "landscape")
+
+    @operation_timer("asset", kind="educational_object")
+    @trace_span("asset educational_object", category="asset")
+    def generate_educational_object(self, object_type: str, topic: str, style: VisualStyle) -> VisualAsset:
+        """Generate educational object image using AI image generation"""
+        asset = self.visual_generator.generate_educational_object(object_type, topic, style)
+
+        file_name = f"{object_type}_{topic}_{style.value}.png".replace(' ', '_')
+        return self._materialize_visual_asset(asset, "objects", file_name, "square")
+
+    def _materialize_visual_asset(self, asset: VisualAsset, subdirectory: str, file_name: str, aspect_ratio: str) -> VisualAsset:
+        """Point an asset at its file under assets_dir, generating the image only if it is missing"""
+        asset.file_path = os.path.join(self.assets_dir, subdirectory, file_name)
+
+        if not os.path.exists(asset.file_path):
+            generate_image(asset.metadata.get("generation_prompt", asset.description), asset.file_path, aspect_ratio)
+
+        asset.metadata["image_available"] = os.path.exists(asset.file_path)
+        self.record_asset(asset)
+        return asset
+
+    @operation_timer("asset", kind="music")
+    @trace_span("asset music", category="asset")
+    def generate_background_music(self, content_type: str, age_group: str, duration_minutes: float, style: AudioStyle) -> AudioAsset:
+        """Get background music from the loopable music bed library"""
+        asset = self.audio_generator.generate_background_music(
+            content_type=content_type,
+            age_group=age_group,
+            duration_seconds=duration_minutes * 60,
+            style=style
+        )
+        self.record_asset(asset)
+        return asset
+
+    @operation_timer("asset", kind="narration")
+    @trace_span("asset narration", category="asset")
+    def generate_voice_narration(self, script_text: str, character_name: str, age_group: str) -> AudioAsset:
+        """Generate voice narration with sentence-level caching"""
+        asset = self.audio_generator.generate_voice_narration(
+            script_text=script_text,
+            character_name=character_name,
+            age_group=age_group
+        )
+        self.record_asset(asset)
+        return asset
+
+    def warm_audio_cache(self) -> Dict[str, bool]:
+        """Pre-decode the shared sound effects and music beds used across videos"""
+        reusable_dirs = [
+            f"{self.assets_dir}/audio/effects",
+            f"{self.assets_dir}/audio/music/beds"
+        ]
+        file_paths = [
+            os.path.join(directory, name)
+            for directory in reusable_dirs if os.path.isdir(directory)
+            for name in sorted(os.listdir(directory))
+        ]
+        return self.video_assembler.warm_audio_cache(file_paths)
+    
+    def record_asset(self, asset) -> Optional[Dict[str, Any]]:
+        """Catalog a VisualAsset or AudioAsset whose file is on disk"""
+        
+        return self.asset_catalog.record_asset(
+            asset.asset_id, asset.asset_type, asset.file_path, style=asset.style.value, metadata=asset.metadata
         )
+    
+    def get_asset_info(self, asset_id: str) -> Optional[Dict[str, Any]]:
+        """Catalog entry for an asset: kind, style, file, size, content hash and the projects using it"""
+        
+        return self.asset_catalog.get(asset_id)
+    
+    def list_assets(self, kind: Optional[str] = None, style: Optional[str] = None, project_id: Optional[str] = None,
+                    limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Cataloged assets, newest first"""
+        
+        return self.asset_catalog.list_assets(kind=kind, style=style, project_id=project_id, limit=limit, offset=offset)
+    
+    def cleanup_old_assets(self, days_old: float = 30) -> Dict[str, Any]:
+        """Delete assets no project uses that haven't been written or reused in days_old days, with their files"""
+        
+        cutoff = (datetime.now() - timedelta(days=days_old)).timestamp()
+        removed = self.asset_catalog.remove_unused_since(cutoff)
+        
+        deleted_files = 0
+        for entry in removed:
+            try:
+                os.remove(entry["file_path"])
+                deleted_files += 1
+            except FileNotFoundError:
+                pass
+        
+        return {
+            "removed_assets": len(removed),
+            "deleted_files": deleted_files,
+            "freed_bytes": sum(entry["file_size_bytes"] for entry in removed)
+        }
@@ -0,0 +1,596 @@
+"""
+Metrics Registry
+Counters, gauges and fixed-bucket histograms, aggregated across processes and exposed in Prometheus text format
+"""
+
+import os
+import json
+import math
+import atexit
+import bisect
+import socket
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from src.utils.logger import get_logger
+
+# flock is POSIX-only; Windows (start_server.ps1) locks a byte range with msvcrt instead
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+logger = get_logger("metrics")
+
+# Latency buckets in seconds, from sub-second steps up to hour-long renders
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# Counters and histograms of exited processes, folded together so their snapshot files can go
+AGGREGATE_FILE = "metrics_aggregate.json"
+
+class _Metric:
+    """Label-keyed values behind one lock; updates are a dict lookup and an add"""
+    
+    metric_type = "untyped"
+    
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: Tuple[str, ...]):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """Label values in declaration order"""
+        
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the current values"""
+        
+        with self._lock:
+            samples = [[list(key), self._copy_value(value)] for key, value in self._values.items()]
+        return {
+            "type": self.metric_type,
+            "help": self.help_text,
+            "labelnames": list(self.labelnames),
+            "samples": samples
+        }
+    
+    def _copy_value(self, value: Any) -> Any:
+        return value
+
+class Counter(_Metric):
+    metric_type = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels):
+        """Add to the counter"""
+        
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self.registry._mark_dirty()
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+    
+    def set(self, value: float, **labels):
+        """Set the gauge"""
+        
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+        self.registry._mark_dirty()
+    
+    def inc(self, amount: float = 1.0, **labels):
+        """Raise the gauge"""
+        
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self.registry._mark_dirty()
+    
+    def dec(self, amount: float = 1.0, **labels):
+        """Lower the gauge"""
+        
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+    
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels):
+        """Record one observation"""
+        
+        key = self._key(labels)
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+        self.registry._mark_dirty()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+    
+    def _copy_value(self, value: Any) -> Any:
+        return {"counts": list(value["counts"]), "sum": value["sum"], "count": value["count"]}
+
+class operation_timer(ContextDecorator):
+    """Time a pipeline operation into pipeline_operation_seconds, labelled by outcome
+    
+    Usable as a decorator or a context manager; set `.status` inside the block to
+    record an outcome other than success/error.
+    """
+    
+    def __init__(self, operation: str, kind: str = ""):
+        self.operation = operation
+        self.kind = kind
+        self.status: Optional[str] = None
+    
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self.status = None
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        status = "error" if exc_type is not None else (self.status or "success")
+        PIPELINE_OPERATION_SECONDS.observe(
+            time.perf_counter() - self._started, operation=self.operation, kind=self.kind, status=status
+        )
+        return False
+    
+    def _recreate_cm(self):
+        # Each decorated call gets its own timer, so concurrent calls don't share a start time
+        return operation_timer(self.operation, self.kind)
+
+class MetricsRegistry:
+    """Process-local metrics, periodically written to a shared directory for cross-process totals
+    
+    Each process writes its own snapshot file; scrapes merge every file. Counters and
+    histograms from exited processes stay in the totals, gauges only count while their
+    process is alive. A scrape folds the snapshots of exited processes into one
+    aggregate file and removes them, so the directory doesn't grow with every worker.
+    """
+    
+    def __init__(self, metrics_dir: Optional[str] = None, flush_interval_seconds: float = 5.0):
+        if metrics_dir is None:
+            metrics_dir = os.path.join(os.getcwd(), "generated-assets", "metrics")
+        self.metrics_dir = metrics_dir
+        self.flush_interval_seconds = flush_interval_seconds
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Dict[str, Dict[str, Any]]]] = []
+        self._lock = threading.Lock()
+        # A plain flag: setting it is atomic and far cheaper than an Event on hot paths
+        self._dirty = False
+        self._flush_thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+        self._snapshot_written = False
+    
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        """Get or create a counter"""
+        
+        return self._register(Counter, name, help_text, labelnames)
+    
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        """Get or create a gauge"""
+        
+        return self._register(Gauge, name, help_text, labelnames)
+    
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(self, name, help_text, tuple(labelnames), buckets)
+            return self._metrics[name]
+    
+    def add_collector(self, collector: Callable[[], Dict[str, Dict[str, Any]]]):
+        """Add a callback producing metrics at scrape time (e.g. queue depth); never written to disk"""
+        
+        self._collectors.append(collector)
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """This process's metrics"""
+        
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+    
+    def flush(self):
+        """Write this process's snapshot for other processes to aggregate"""
+        
+        self._dirty = False
+        path = self._snapshot_path()
+        if not self._snapshot_written:
+            # A file already at this path was left by an exited process with the same PID
+            self._fold_into_aggregate([path], require_dead=False)
+            self._snapshot_written = True
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({
+                "hostname": socket.gethostname(),
+                "pid": os.getpid(),
+                "written_at": time.time(),
+                "metrics": self.snapshot()
+            }, f)
+        os.replace(temp_path, path)
+    
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Metrics merged across every process sharing the metrics directory"""
+        
+        own_path = self._snapshot_path()
+        aggregate_path = os.path.join(self.metrics_dir, AGGREGATE_FILE)
+        sources = [(self.snapshot(), True)]
+        dead_paths = []
+        for file_name in os.listdir(self.metrics_dir):
+            path = os.path.join(self.metrics_dir, file_name)
+            if not file_name.endswith(".json") or path in (own_path, aggregate_path):
+                continue
+            data = _read_json(path)
+            if data is None:
+                continue
+            if self._writer_alive(data):
+                sources.append((data["metrics"], True))
+            else:
+                dead_paths.append(path)
+        
+        aggregate = None
+        if dead_paths:
+            try:
+                aggregate = self._fold_into_aggregate(dead_paths)
+            except OSError as e:
+                logger.warning(f"Metrics compaction failed: {e}")
+                # Count the exited processes from their own files this time
+                sources.extend((data["metrics"], False) for data in map(_read_json, dead_paths) if data is not None)
+        if aggregate is None:
+            aggregate = _read_json(aggregate_path)
+        if aggregate is not None:
+            sources.append((aggregate["metrics"], False))
+        
+        merged: Dict[str, Dict[str, Any]] = {}
+        for metrics, alive in sources:
+            for name, metric in metrics.items():
+                if metric["type"] == "gauge" and not alive:
+                    continue
+                self._merge_metric(merged, name, metric)
+        
+        for collector in self._collectors:
+            try:
+                merged.update(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        
+        return merged
+    
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric["labelnames"]
+            
+            for label_values, value in sorted(metric["samples"], key=lambda sample: sample[0]):
+                labels = list(zip(labelnames, label_values))
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + [math.inf], value["counts"]):
+                    cumulative += count
+                    bucket_labels = labels + [("le", "+Inf" if bound == math.inf else _format_value(bound))]
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def start_flushing(self):
+        """Start the background thread that writes snapshots while metrics change"""
+        
+        with self._lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            if not self._atexit_registered:
+                atexit.register(self._flush_if_dirty)
+                # A forked child inherits the registry but not the thread; it starts its own
+                if hasattr(os, "register_at_fork"):
+                    os.register_at_fork(after_in_child=self._restart_after_fork)
+                self._atexit_registered = True
+            self._flush_thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flush_thread.start()
+    
+    def _restart_after_fork(self):
+        """Start a forked child from zero under its own PID
+        
+        The parent's values are already counted in the parent's snapshot file, so
+        keeping them would count them twice.
+        """
+        
+        self._lock = threading.Lock()
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+            metric._values = {}
+        self._dirty = False
+        self._snapshot_written = False
+        self._flush_thread = None
+        self.start_flushing()
+    
+    def _flush_loop(self):
+        """Flush changed metrics every interval"""
+        
+        while True:
+            time.sleep(self.flush_interval_seconds)
+            self._flush_if_dirty()
+    
+    def _flush_if_dirty(self):
+        """Flush only when something changed since the last write"""
+        
+        if not self._dirty:
+            return
+        try:
+            self.flush()
+        except OSError as e:
+            logger.warning(f"Metrics flush failed: {e}")
+    
+    def _register(self, metric_class, name: str, help_text: str, labelnames: Tuple[str, ...]) -> _Metric:
+        """Create a metric once; later calls return the same object"""
+        
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(self, name, help_text, tuple(labelnames))
+            metric = self._metrics[name]
+        if not isinstance(metric, metric_class):
+            raise ValueError(f"{name} is already registered as a {metric.metric_type}")
+        return metric
+    
+    def _mark_dirty(self):
+        self._dirty = True
+    
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.metrics_dir, f"metrics_{socket.gethostname()}_{os.getpid()}.json")
+    
+    def _fold_into_aggregate(self, paths: List[str], require_dead: bool = True) -> Dict[str, Any]:
+        """Add the counters and histograms of exited processes' snapshots to the aggregate and remove them
+        
+        Runs under a lock file so two processes can't fold the same snapshot twice.
+        Each snapshot is re-read under the lock and skipped if its writer is alive
+        again (a new process that reused the PID and has already written its own).
+        """
+        
+        aggregate_path = os.path.join(self.metrics_dir, AGGREGATE_FILE)
+        with _exclusive_lock(os.path.join(self.metrics_dir, ".aggregate.lock")):
+            aggregate = _read_json(aggregate_path) or {"metrics": {}}
+            folded = []
+            for path in paths:
+                data = _read_json(path)
+                if data is None or (require_dead and self._writer_alive(data)):
+                    continue
+                for name, metric in data["metrics"].items():
+                    if metric["type"] != "gauge":
+                        self._merge_metric(aggregate["metrics"], name, metric)
+                folded.append(path)
+            
+            if folded:
+                aggregate["written_at"] = time.time()
+                temp_path = f"{aggregate_path}.tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(aggregate, f)
+                os.replace(temp_path, aggregate_path)
+                for path in folded:
+                    os.remove(path)
+        
+        return aggregate
+    
+    def _writer_alive(self, data: Dict[str, Any]) -> bool:
+        """Whether the process that wrote a snapshot is still running"""
+        
+        if data["hostname"] == socket.gethostname():
+            try:
+                os.kill(data["pid"], 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                return True
+            return True
+        # Processes on other hosts can't be checked; trust recent snapshots
+        return time.time() - data["written_at"] < self.flush_interval_seconds * 6
+    
+    def _merge_metric(self, merged: Dict[str, Dict[str, Any]], name: str, metric: Dict[str, Any]):
+        """Add one process's samples into the merged view"""
+        
+        target = merged.setdefault(name, {
+            "type": metric["type"],
+            "help": metric["help"],
+            "labelnames": metric["labelnames"],
+            "buckets": metric.get("buckets"),
+            "samples": []
+        })
+        if target["type"] != metric["type"] or target.get("buckets") != metric.get("buckets"):
+            return
+        
+        index = {tuple(label_values): i for i, (label_values, _) in enumerate(target["samples"])}
+        for label_values, value in metric["samples"]:
+            position = index.get(tuple(label_values))
+            if position is None:
+                index[tuple(label_values)] = len(target["samples"])
+                target["samples"].append([label_values, json.loads(json.dumps(value))])
+                continue
+            
+            current = target["samples"][position][1]
+            if metric["type"] == "histogram":
+                current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                current["sum"] += value["sum"]
+                current["count"] += value["count"]
+            else:
+                target["samples"][position][1] = current + value
+
+def histogram_summary(metric: Optional[Dict[str, Any]], **labels) -> Dict[str, Any]:
+    """Count, average and estimated percentiles of the merged samples matching some labels"""
+    
+    summary = {"count": 0, "average": None, "p50": None, "p95": None}
+    if not metric:
+        return summary
+    
+    counts = [0] * (len(metric["buckets"]) + 1)
+    total = 0.0
+    for label_values, value in metric["samples"]:
+        sample_labels = dict(zip(metric["labelnames"], label_values))
+        if any(sample_labels.get(name) != str(expected) for name, expected in labels.items()):
+            continue
+        counts = [a + b for a, b in zip(counts, value["counts"])]
+        total += value["sum"]
+    
+    count = sum(counts)
+    if count == 0:
+        return summary
+    
+    summary.update({
+        "count": count,
+        "average": total / count,
+        "p50": _estimate_quantile(metric["buckets"], counts, 0.5),
+        "p95": _estimate_quantile(metric["buckets"], counts, 0.95)
+    })
+    return summary
+
+def gauge_family(help_text: str, labelnames: Tuple[str, ...], samples: List[Tuple[Tuple[Any, ...], float]]) -> Dict[str, Any]:
+    """A gauge in merged form, for collectors that read their values at scrape time"""
+    
+    return {
+        "type": "gauge",
+        "help": help_text,
+        "labelnames": list(labelnames),
+        "buckets": None,
+        "samples": [[[str(value) for value in label_values], float(value)] for label_values, value in samples]
+    }
+
+def counter_total(metric: Optional[Dict[str, Any]], **labels) -> float:
+    """Sum of merged counter samples matching some labels"""
+    
+    if not metric:
+        return 0.0
+    return sum(
+        value for label_values, value in metric["samples"]
+        if all(dict(zip(metric["labelnames"], label_values)).get(name) == str(expected)
+               for name, expected in labels.items())
+    )
+
+def _estimate_quantile(buckets: List[float], counts: List[int], quantile: float) -> float:
+    """Linear interpolation inside the bucket holding the quantile"""
+    
+    target = quantile * sum(counts)
+    seen = 0
+    lower = 0.0
+    for bound, count in zip(buckets, counts):
+        if count and seen + count >= target:
+            return lower + (bound - lower) * (target - seen) / count
+        seen += count
+        lower = bound
+    # Past the last finite bucket; the best we can say is "above it"
+    return buckets[-1]
+
+@contextmanager
+def _exclusive_lock(lock_path: str):
+    """Hold an exclusive lock on a lock file, shared by every process using the directory"""
+    
+    with open(lock_path, "w") as lock_file:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+            return
+        
+        # LK_LOCK gives up after about ten seconds; keep waiting like flock does
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                continue
+        try:
+            yield
+        finally:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    """A snapshot file's contents, or None if it is gone or half-written"""
+    
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = [
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    ]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+_metrics_registry: Optional[MetricsRegistry] = None
+_metrics_registry_lock = threading.Lock()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry, with its flush thread running"""
+    
+    global _metrics_registry
+    with _metrics_registry_lock:
+        if _metrics_registry is None:
+            _metrics_registry = MetricsRegistry()
+        _metrics_registry.start_flushing()
+        return _metrics_registry
+
+# Metrics shared by the generation pipeline
+PIPELINE_OPERATION_SECONDS = get_metrics_registry().histogram(
+    "pipeline_operation_seconds",
+    "Duration of pipeline operations (topic selection, scripts, assets, rendering, publishing)",
+    ("operation", "kind", "status")
+)
+TOPICS_SELECTED = get_metrics_registry().counter(
+    "topics_selected_total", "Topics chosen by the topic selector", ("topic", "content_type", "age_group")
+)
+TOPIC_SELECTION_SCORE = get_metrics_registry().histogram(
+    "topic_selection_score", "Priority score of selected topics", (),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+RENDERED_VIDEO_SECONDS = get_metrics_registry().counter(
+    "rendered_video_seconds_total", "Seconds of video successfully rendered", ("render_profile",)
+)
+CONTENT_VALIDATION_SCORE = get_metrics_registry().histogram(
+    "content_validation_score", "Content validation scores by check", ("check",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+CONTENT_VALIDATIONS = get_metrics_registry().counter(
+    "content_validations_total", "Content validations by outcome", ("result",)
+)
@@ -0,0 +1,486 @@
+"""
+Pipeline Executor
+Runs the topic-to-publish stage graph with content-hash checkpoints and concurrent stages
+"""
+
+import os
+import json
+import socket
+import hashlib
+import time
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, asdict, is_dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Any, Optional, Callable
+from src.services.tracing import trace_span, current_trace_id
+from src.services.config_store import get_config
+from src.utils.logger import get_logger
+
+logger = get_logger("pipeline_executor")
+
+# A running run refreshes heartbeat_at at least this often; one silent for several intervals was abandoned
+HEARTBEAT_SECONDS = 30
+STALE_HEARTBEATS = 4
+
+@dataclass
+class PipelineStage:
+    name: str
+    func: Callable[[Dict[str, Any], Dict[str, Any]], Any]  # (run_input, dependency outputs) -> output
+    depends_on: List[str] = field(default_factory=list)
+    # Run input keys the stage reads directly; everything else reaches it through dependencies
+    input_keys: List[str] = field(default_factory=list)
+    # Non-deterministic stages (topic selection) are checkpointed per run, not by content
+    deterministic: bool = True
+
+class PipelineRunStore:
+    """Run records on disk: input, per-stage status and timings, outputs"""
+    
+    def __init__(self, pipeline_dir: Optional[str] = None):
+        if pipeline_dir is None:
+            pipeline_dir = os.path.join(os.getcwd(), "generated-assets", "pipeline")
+        self.runs_dir = os.path.join(pipeline_dir, "runs")
+        self._record_lock = threading.Lock()
+        os.makedirs(self.runs_dir, exist_ok=True)
+    
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Load a run record"""
+        
+        run_path = os.path.join(self.runs_dir, f"{run_id}.json")
+        if not os.path.exists(run_path):
+            return None
+        
+        with open(run_path, 'r') as f:
+            return json.load(f)
+    
+    def list_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs without their stage outputs"""
+        
+        run_files = sorted(
+            (entry for entry in os.scandir(self.runs_dir) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime, reverse=True
+        )[:limit]
+        
+        runs = []
+        for entry in run_files:
+            with open(entry.path, 'r') as f:
+                run_record = json.load(f)
+            run_record.pop("outputs", None)
+            runs.append(run_record)
+        
+        return runs
+    
+    def save_run(self, run_record: Dict[str, Any]):
+        """Write a run record atomically"""
+        
+        with self._record_lock:
+            run_path = os.path.join(self.runs_dir, f"{run_record['run_id']}.json")
+            temp_path = f"{run_path}.partial"
+            with open(temp_path, 'w') as f:
+                json.dump(run_record, f, indent=2, default=str)
+            os.replace(temp_path, run_path)
+    
+    def is_active(self, run_record: Dict[str, Any]) -> bool:
+        """Whether a run marked running still has a live owner
+        
+        A run whose process crashed stays "running" on disk. Its owner is
+        checked directly when it ran on this host; elsewhere the heartbeat
+        has to be recent.
+        """
+        
+        if run_record.get("status") != "running":
+            return False
+        owner = run_record.get("owner") or {}
+        if owner.get("hostname") == socket.gethostname():
+            try:
+                os.kill(int(owner.get("pid") or 0), 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+        heartbeat_at = run_record.get("heartbeat_at") or 0
+        return time.time() - heartbeat_at < HEARTBEAT_SECONDS * STALE_HEARTBEATS
+
+class PipelineExecutor:
+    """Executes a stage graph, reusing checkpointed outputs of unchanged stages"""
+    
+    def __init__(self, stages: List[PipelineStage], pipeline_dir: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        if pipeline_dir is None:
+            pipeline_dir = os.path.join(os.getcwd(), "generated-assets", "pipeline")
+        self.stages = {stage.name: stage for stage in stages}
+        self.checkpoint_dir = os.path.join(pipeline_dir, "checkpoints")
+        self.run_store = PipelineRunStore(pipeline_dir)
+        # None follows system_settings.max_stage_workers, read at the start of each run
+        self.max_workers = max_workers
+        
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self._validate_graph()
+    
+    def run(self, run_input: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Execute every stage whose dependencies are met, concurrently where possible"""
+        
+        run_id = run_id or f"run_{uuid.uuid4().hex[:16]}"
+        run_record = self.run_store.get_run(run_id) or {
+            "run_id": run_id,
+            "run_input": run_input,
+            "created_at": datetime.now().isoformat(),
+            "attempts": 0
+        }
+        run_record.update({
+            "status": "running",
+            "attempts": run_record["attempts"] + 1,
+            "trace_id": current_trace_id(),
+            "owner": {"hostname": socket.gethostname(), "pid": os.getpid()},
+            "heartbeat_at": time.time(),
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "error": None,
+            "stages": {name: {"status": "pending"} for name in self.stages}
+        })
+        self.run_store.save_run(run_record)
+        
+        started = time.perf_counter()
+        outputs: Dict[str, Any] = {}
+        digests: Dict[str, str] = {}
+        failed = False
+        
+        max_workers = self.max_workers or get_config().get("system_settings", "max_stage_workers")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-stage") as executor:
+            running = {}
+            
+            while True:
+                if not failed:
+                    for name in self._get_ready_stages(run_record):
+                        stage = self.stages[name]
+                        key = self._get_checkpoint_key(stage, run_id, run_input, digests)
+                        run_record["stages"][name] = {"status": "running", "checkpoint_key": key}
+                        # Stage threads continue this run's trace
+                        running[executor.submit(
+                            contextvars.copy_context().run, self._run_stage, stage, key, run_input, outputs
+                        )] = name
+                    run_record["heartbeat_at"] = time.time()
+                    self.run_store.save_run(run_record)
+                
+                if not running:
+                    break
+                
+                done, _ = wait(running, timeout=HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Long stages: show the run is still owned so /resume keeps refusing it
+                    run_record["heartbeat_at"] = time.time()
+                    self.run_store.save_run(run_record)
+                for future in done:
+                    name = running.pop(future)
+                    stage_result = future.result()
+                    run_record["stages"][name].update(stage_result["record"])
+                    
+                    if stage_result["record"]["status"] == "completed":
+                        outputs[name] = stage_result["output"]
+                        digests[name] = stage_result["digest"]
+                    else:
+                        failed = True
+                        run_record["error"] = f"Stage {name} failed: {stage_result['record']['error']}"
+        
+        for name, stage_record in run_record["stages"].items():
+            if stage_record["status"] == "pending":
+                stage_record["status"] = "skipped"
+        
+        run_record["status"] = "failed" if failed else "completed"
+        run_record["finished_at"] = datetime.now().isoformat()
+        run_record["total_seconds"] = time.perf_counter() - started
+        run_record["outputs"] = outputs if not failed else {}
+        self.run_store.save_run(run_record)
+        
+        return run_record
+    
+    def resume(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Re-run a previous run; completed stages come back from their checkpoints"""
+        
+        run_record = self.run_store.get_run(run_id)
+        if run_record is None:
+            return None
+        
+        return self.run(run_record["run_input"], run_id=run_id)
+    
+    def _run_stage(self, stage: PipelineStage, key: str, run_input: Dict[str, Any],
+                   outputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one stage under its own trace span"""
+        
+        with trace_span(f"stage {stage.name}", category="pipeline_stage", checkpoint_key=key) as span:
+            stage_result = self._execute_stage(stage, key, run_input, outputs)
+            if span is not None:
+                span.args["status"] = stage_result["record"]["status"]
+                span.args["cache_hit"] = stage_result["record"].get("cache_hit", False)
+        return stage_result
+    
+    def _execute_stage(self, stage: PipelineStage, key: str, run_input: Dict[str, Any],
+                       outputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Load a stage's checkpoint or execute it and write one"""
+        
+        started_at = datetime.now().isoformat()
+        started = time.perf_counter()
+        checkpoint_path = os.path.join(self.checkpoint_dir, f"{stage.name}_{key}.json")
+        
+        output = self._load_checkpoint(checkpoint_path)
+        cache_hit = output is not None
+        
+        if not cache_hit:
+            try:
+                dependency_outputs = {name: outputs[name] for name in stage.depends_on}
+                output = _to_jsonable(stage.func(run_input, dependency_outputs))
+            except Exception as e:
+                logger.exception(f"Pipeline stage {stage.name} failed: {e}", extra={"details": {"stage": stage.name}})
+                return {
+                    "record": {
+                        "status": "failed",
+                        "error": str(e),
+                        "started_at": started_at,
+                        "seconds": time.perf_counter() - started
+                    }
+                }
+            self._save_checkpoint(checkpoint_path, output)
+        
+        return {
+            "output": output,
+            "digest": _digest(output),
+            "record": {
+                "status": "completed",
+                "cache_hit": cache_hit,
+                "started_at": started_at,
+                "finished_at": datetime.now().isoformat(),
+                "seconds": time.perf_counter() - started
+            }
+        }
+    
+    def _get_ready_stages(self, run_record: Dict[str, Any]) -> List[str]:
+        """Pending stages whose dependencies have all completed"""
+        
+        stage_records = run_record["stages"]
+        return [
+            name for name, stage in self.stages.items()
+            if stage_records[name]["status"] == "pending"
+            and all(stage_records[dependency]["status"] == "completed" for dependency in stage.depends_on)
+        ]
+    
+    def _get_checkpoint_key(self, stage: PipelineStage, run_id: str, run_input: Dict[str, Any],
+                            digests: Dict[str, str]) -> str:
+        """Hash of everything a stage's output depends on"""
+        
+        key_data = {
+            "stage": stage.name,
+            "run_input": {input_key: run_input.get(input_key) for input_key in stage.input_keys},
+            "dependencies": {name: digests[name] for name in stage.depends_on}
+        }
+        if not stage.deterministic:
+            key_data["run_id"] = run_id
+        
+        return _digest(key_data)[:32]
+    
+    def _load_checkpoint(self, checkpoint_path: str) -> Optional[Any]:
+        """Read a checkpoint if it exists and the files it references are still there"""
+        
+        if not os.path.exists(checkpoint_path):
+            return None
+        
+        try:
+            with open(checkpoint_path, 'r') as f:
+                output = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {checkpoint_path}: {e}")
+            return None
+        
+        if not all(os.path.exists(path) for path in _referenced_files(output)):
+            return None
+        return output
+    
+    def _save_checkpoint(self, checkpoint_path: str, output: Any):
+        """Write a checkpoint atomically"""
+        
+        temp_path = f"{checkpoint_path}.partial"
+        with open(temp_path, 'w') as f:
+            json.dump(output, f)
+        os.replace(temp_path, checkpoint_path)
+    
+    def _validate_graph(self):
+        """Reject unknown dependencies and cycles"""
+        
+        visiting, visited = set(), set()
+        
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline stage graph has a cycle at {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+        
+        for name in self.stages:
+            visit(name)
+
+def _to_jsonable(value: Any) -> Any:
+    """Convert stage outputs (dataclasses, enums) to plain JSON data"""
+    
+    if is_dataclass(value) and not isinstance(value, type):
+        return _to_jsonable(asdict(value))
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(key): _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+def _digest(value: Any) -> str:
+    """Content hash of JSON data"""
+    
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _referenced_files(value: Any) -> List[str]:
+    """Every file_path / output_path in a stage output"""
+    
+    paths = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in ("file_path", "output_path", "thumbnail_path") and isinstance(item, str) and item:
+                paths.append(item)
+            else:
+                paths.extend(_referenced_files(item))
+    elif isinstance(value, list):
+        for item in value:
+            paths.extend(_referenced_files(item))
+    return paths
+
+def build_video_pipeline(video_service=None, publishing_service=None,
+                         pipeline_dir: Optional[str] = None) -> PipelineExecutor:
+    """The topic -> script -> assets -> render -> thumbnail -> publish graph"""
+    
+    from src.models.content_generator import ContentRequest, ContentType, AgeGroup
+    from src.models.media_generator import VisualAsset, AudioAsset, VisualStyle, AudioStyle
+    from src.services.service_registry import (
+        get_video_service, get_publishing_service, get_topic_selector, get_script_generator
+    )
+    
+    video_service = video_service or get_video_service()
+    publishing_service = publishing_service or get_publishing_service()
+    topic_selector = get_topic_selector()
+    script_generator = get_script_generator()
+    
+    def visual_asset(data: Dict[str, Any]) -> VisualAsset:
+        return VisualAsset(**{**data, "style": VisualStyle(data["style"])})
+    
+    def audio_asset(data: Dict[str, Any]) -> AudioAsset:
+        return AudioAsset(**{**data, "style": AudioStyle(data["style"])})
+    
+    def select_topic(run_input, deps):
+        content_data = run_input.get("content_data")
+        if content_data:
+            return {"topic": content_data.get("topic"), "selected": False}
+        
+        target_age_group = AgeGroup(run_input["age_group"]) if run_input.get("age_group") else None
+        selection = topic_selector.select_next_topic(target_age_group)
+        return {
+            "topic": selection.topic,
+            "content_type": selection.content_type,
+            "age_group": selection.age_group,
+            "priority_score": selection.priority_score,
+            "selection_reason": selection.selection_reason,
+            "selected": True
+        }
+    
+    def generate_script(run_input, deps):
+        topic = deps["topic"]
+        if not topic["selected"]:
+            return video_service.build_script_data(run_input["content_data"])
+        
+        script = script_generator.generate_script(ContentRequest(
+            topic=topic["topic"],
+            content_type=ContentType(topic["content_type"]),
+            age_group=AgeGroup(topic["age_group"]),
+            duration_minutes=run_input.get("duration_minutes", 3),
+            learning_objectives=[],
+            style_preferences={}
+        ))
+        return video_service.build_script_data({
+            "topic": topic["topic"],
+            "title": script.title,
+            "content_type": script.content_type,
+            "age_group": script.age_group,
+            "duration_minutes": script.duration_minutes,
+            "script_text": script.script_text,
+            "scene_descriptions": script.scene_descriptions,
+            "audio_cues": script.audio_cues,
+            "character_list": script.character_list
+        })
+    
+    def render_video(run_input, deps):
+        script_data = deps["script"]
+        render_profile = run_input.get("render_profile", "final")
+        visual_assets = [visual_asset(asset) for asset in deps["characters"] + deps["backgrounds"]]
+        audio_assets = [audio_asset(deps["music"])]
+        if deps["narration"]:
+            audio_assets.append(audio_asset(deps["narration"]))
+        
+        project = video_service.render_project(
+            video_service.get_project_id(script_data), script_data, visual_assets, audio_assets, render_profile
+        )
+        video_info = video_service.get_video_info(project.project_id)
+        render = video_info["renders"][render_profile]
+        if not render["success"]:
+            # Raising keeps the failed render out of the checkpoints so a resume retries it
+            raise RuntimeError(render["error"] or "render failed")
+        
+        return {
+            "project_id": project.project_id,
+            "title": project.title,
+            "output_path": project.output_path,
+            "duration_seconds": project.total_duration,
+            "render_profile": render_profile,
+            "render_seconds": render["render_seconds"]
+        }
+    
+    def generate_thumbnail(run_input, deps):
+        render = deps["render"]
+        thumbnail_path = publishing_service.generate_thumbnail(render["output_path"], render)
+        if thumbnail_path is None:
+            raise RuntimeError("thumbnail generation failed")
+        return {"thumbnail_path": thumbnail_path}
+    
+    def publish_video(run_input, deps):
+        render = deps["render"]
+        if not run_input.get("publish", True):
+            return {"published": False, "reason": "publishing disabled for this run"}
+        
+        publishing_service.publish_to_youtube(render["output_path"], render["title"], deps["script"].get("script_text", ""))
+        return {
+            "published": True,
+            "platform": "youtube",
+            "video_path": render["output_path"],
+            "thumbnail_path": deps["thumbnail"]["thumbnail_path"],
+            "published_at": datetime.now().isoformat()
+        }
+    
+    stages = [
+        PipelineStage("topic", select_topic, input_keys=["content_data", "age_group"], deterministic=False),
+        PipelineStage("script", generate_script, ["topic"], input_keys=["content_data", "duration_minutes"]),
+        # The four asset kinds only need the script, so they run concurrently
+        PipelineStage("characters", lambda run_input, deps: video_service.generate_character_assets(deps["script"]), ["script"]),
+        PipelineStage("backgrounds", lambda run_input, deps: video_service.generate_background_assets(deps["script"]), ["script"]),
+        PipelineStage("music", lambda run_input, deps: video_service.generate_music_asset(deps["script"]), ["script"]),
+        PipelineStage("narration", lambda run_input, deps: video_service.generate_narration_asset(deps["script"]), ["script"]),
+        PipelineStage("render", render_video, ["script", "characters", "backgrounds", "music", "narration"],
+                      input_keys=["render_profile"]),
+        PipelineStage("thumbnail", generate_thumbnail, ["render"]),
+        PipelineStage("publish", publish_video, ["script", "render", "thumbnail"], input_keys=["publish"])
+    ]
+    
+    return PipelineExecutor(stages, pipeline_dir)
@@ -0,0 +1,290 @@
+"""
+Prefork Server
+Production serving: shared read-only state loaded once, then forked into HTTP worker processes
+"""
+
+import gc
+import os
+import time
+import signal
+import socket
+import threading
+import multiprocessing
+from typing import Dict, List, Any, Optional, Callable
+
+from src.services.service_registry import get_service_registry
+from src.services.ffmpeg_capabilities import get_capability_registry
+from src.services.video_job_queue import get_worker_pool
+from src.services.sampling_profiler import get_sampling_profiler
+from src.utils.frozen import freeze
+from src.utils.logger import get_logger, get_worker_log_queue, forward_logs_to_parent
+
+logger = get_logger("prefork_server")
+
+# Services built in the master so workers inherit them instead of each building its own
+PRELOAD_SERVICES = ["topic_selector", "script_generator", "media_service", "video_service", "publishing_service",
+                    "pipeline_runs"]
+
+# Read-only libraries loaded when those services are built: (service, attribute path to the owner, catalogs).
+# They are frozen before fork, so a worker can't drift from the others by changing its copy
+SHARED_CATALOGS = [
+    ("topic_selector", "", ["topic_categories"]),
+    ("script_generator", "", ["templates", "character_database"]),
+    ("media_service", "visual_generator", ["style_templates", "character_library", "background_library"]),
+    ("media_service", "audio_generator", ["music_templates", "voice_settings", "sound_effect_library"]),
+    ("media_service", "video_assembler", ["rendering_settings", "render_profiles"]),
+    ("video_service", "", ["main_characters"])
+]
+
+LISTEN_BACKLOG = 1024
+SUPERVISE_INTERVAL_SECONDS = 0.5
+VIDEO_POOL_CHECK_SECONDS = 5.0
+# A worker that exits sooner than this after starting is restarted after a pause, not straight away
+MIN_WORKER_UPTIME_SECONDS = 5.0
+RESTART_DELAY_SECONDS = 1.0
+
+# Which process this is, for the startup report; workers fill it in after fork
+_serving_info: Dict[str, Any] = {"mode": "single"}
+
+def get_serving_info() -> Dict[str, Any]:
+    """How this process serves requests: single process, or which prefork worker it is"""
+    
+    return dict(_serving_info, pid=os.getpid())
+
+def preload_shared_state(app) -> Dict[str, Any]:
+    """Build the services, freeze their catalogs, compress static files and probe ffmpeg, ahead of forking workers"""
+    
+    started = time.perf_counter()
+    registry = get_service_registry()
+    for name in PRELOAD_SERVICES:
+        registry.get(name)
+    
+    frozen = []
+    for service_name, owner_path, catalogs in SHARED_CATALOGS:
+        owner = registry.get(service_name)
+        for attribute in filter(None, owner_path.split(".")):
+            owner = getattr(owner, attribute)
+        for catalog in catalogs:
+            setattr(owner, catalog, freeze(getattr(owner, catalog)))
+            frozen.append(f"{service_name}.{owner_path + '.' if owner_path else ''}{catalog}")
+    
+    get_capability_registry().probe()
+    
+    # Every worker then serves the same compressed variants instead of each computing its own
+    static_manifest = app.extensions.get("static_manifest")
+    static_stats = static_manifest.compress_missing() if static_manifest is not None else None
+    
+    summary = {
+        "services": PRELOAD_SERVICES,
+        "frozen_catalogs": frozen,
+        "static_files": static_stats,
+        "preload_seconds": round(time.perf_counter() - started, 3)
+    }
+    logger.info(f"Preloaded {len(PRELOAD_SERVICES)} services and froze {len(frozen)} catalogs",
+                extra={"details": summary})
+    return summary
+
+class PreforkServer:
+    """Binds the listening socket once, forks HTTP workers onto it and keeps them running
+    
+    Every worker accepts from the same socket, so the kernel spreads connections
+    across them and throughput scales with cores. Services and catalogs are built
+    in the master and inherited; gc.freeze() keeps the collector from touching
+    those objects, so their pages stay shared copy-on-write instead of being
+    copied into each worker. State that changes at runtime (configuration, topic
+    history, video jobs, run records, the asset catalog) lives in SQLite or on
+    disk, which every worker reads. The master also supervises the video worker pool, so the HTTP
+    workers only submit jobs.
+    """
+    
+    def __init__(self, app, host: str = "0.0.0.0", port: int = 5001, workers: Optional[int] = None,
+                 worker_init: Optional[Callable[[], None]] = None, drain_seconds: float = 30.0):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_init = worker_init
+        self.drain_seconds = drain_seconds
+        self._context = multiprocessing.get_context("fork")
+        self._processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * self.workers
+        self._started_at: List[float] = [0.0] * self.workers
+        self._restart_at: List[float] = [0.0] * self.workers
+        self._socket: Optional[socket.socket] = None
+        self._log_queue = None
+        self._stopping = False
+    
+    def serve(self):
+        """Run until SIGTERM or SIGINT, then stop the workers gracefully"""
+        
+        self._socket = socket.create_server((self.host, self.port), backlog=LISTEN_BACKLOG)
+        # Every worker wakes for each new connection and only one wins accept(); the others must get
+        # EAGAIN rather than block there, or they would sit in accept() unable to see shutdown()
+        self._socket.setblocking(False)
+        # A spawn-context queue, so the spawned video workers can be handed the same one
+        self._log_queue = get_worker_log_queue(multiprocessing.get_context("spawn"))
+        video_pool = get_worker_pool()
+        
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        
+        logger.info(f"Prefork server listening on {self.host}:{self.port} with {self.workers} workers",
+                    extra={"details": {"host": self.host, "port": self.port, "workers": self.workers,
+                                       "master_pid": os.getpid()}})
+        
+        last_pool_check = 0.0
+        try:
+            while not self._stopping:
+                self._supervise_workers()
+                now = time.monotonic()
+                if now - last_pool_check >= VIDEO_POOL_CHECK_SECONDS:
+                    last_pool_check = now
+                    try:
+                        video_pool.ensure_started()
+                    except Exception:
+                        logger.exception("Video worker pool check failed")
+                time.sleep(SUPERVISE_INTERVAL_SECONDS)
+        finally:
+            self._stop_workers()
+            video_pool.stop()
+            self._socket.close()
+            logger.info("Prefork server stopped")
+    
+    def _request_stop(self, signum, frame):
+        # Only sets a flag; the supervise loop notices within one interval
+        self._stopping = True
+    
+    def _supervise_workers(self):
+        """Start missing workers and replace any that exited"""
+        
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process is not None and process.is_alive():
+                continue
+            
+            if process is not None:
+                process.join()
+                uptime = now - self._started_at[index]
+                logger.warning(f"HTTP worker {index} (pid {process.pid}) exited with code {process.exitcode}",
+                               extra={"details": {"worker": index, "pid": process.pid,
+                                                  "exitcode": process.exitcode, "uptime_seconds": round(uptime, 1)}})
+                self._processes[index] = None
+                if uptime < MIN_WORKER_UPTIME_SECONDS:
+                    self._restart_at[index] = now + RESTART_DELAY_SECONDS
+            
+            if now >= self._restart_at[index]:
+                self._start_worker(index)
+    
+    def _start_worker(self, index: int):
+        # Everything allocated so far moves to the permanent generation, so collections in the
+        # worker never write to (and so never copy) the pages it shares with the master
+        gc.freeze()
+        process = self._context.Process(
+            target=_run_worker,
+            args=(self.app, self._socket, self.host, self.port, index, self.workers, self._log_queue,
+                  self.worker_init, self.drain_seconds),
+            name=f"http-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+    
+    def _stop_workers(self):
+        """Ask every worker to drain and exit, killing any that outlast the drain period"""
+        
+        running = [process for process in self._processes if process is not None and process.is_alive()]
+        for process in running:
+            process.terminate()
+        
+        deadline = time.monotonic() + self.drain_seconds + 5
+        for process in running:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"HTTP worker pid {process.pid} did not stop in time; killing it")
+                process.kill()
+                process.join()
+
+def _run_worker(app, listen_socket: socket.socket, host: str, port: int, index: int, workers: int, log_queue,
+                worker_init: Optional[Callable[[], None]], drain_seconds: float):
+    """HTTP worker process body: serve the inherited socket until the master sends SIGTERM"""
+    
+    from werkzeug.serving import make_server
+    
+    init_forked_worker(log_queue, {"mode": "prefork", "worker": index, "workers": workers})
+    
+    if worker_init is not None:
+        worker_init()
+    
+    server = make_server(host, port, app, threaded=True, fd=listen_socket.fileno())
+    
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to return, so it can't run on the serving thread itself
+        threading.Thread(target=server.shutdown, name="http-worker-shutdown", daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    # Ctrl-C reaches the whole process group; the master decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    logger.info(f"HTTP worker {index} serving", extra={"details": {"worker": index, "pid": os.getpid()}})
+    server.serve_forever()
+    listen_socket.close()
+    
+    # No new connections are accepted now; let requests in flight finish
+    profiler = get_sampling_profiler()
+    deadline = time.monotonic() + drain_seconds
+    while profiler.active_request_count() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    logger.info(f"HTTP worker {index} stopped", extra={"details": {"worker": index, "pid": os.getpid()}})
+
+def init_forked_worker(log_queue, serving_info: Dict[str, Any]):
+    """Set up an HTTP worker just forked from a master: log through the master and leave it the video pool"""
+    
+    forward_logs_to_parent(log_queue)
+    get_worker_pool().external = True
+    # A plain os.fork() (gunicorn) keeps the master's multiprocessing children on record; at exit
+    # this worker would then terminate the master's video workers as if they were its own
+    multiprocessing.process._children.clear()
+    _serving_info.update(serving_info, master_pid=os.getppid())
+
+def start_video_pool_supervisor(pool) -> threading.Thread:
+    """Keep a video worker pool running from a master process that has no supervise loop of its own
+    
+    The thread only touches the pool it is given, never get_worker_pool()'s module lock, so an
+    HTTP worker forked while it runs can't inherit that lock held.
+    """
+    
+    def supervise():
+        while True:
+            try:
+                pool.ensure_started()
+            except Exception:
+                logger.exception("Video worker pool check failed")
+            time.sleep(VIDEO_POOL_CHECK_SECONDS)
+    
+    thread = threading.Thread(target=supervise, name="video-pool-supervisor", daemon=True)
+    thread.start()
+    return thread
+
+def serve_prefork(app, host: str = "0.0.0.0", port: Optional[int] = None, workers: Optional[int] = None,
+                  worker_init: Optional[Callable[[], None]] = None):
+    """Serve the app in production mode; PORT and WEB_CONCURRENCY override the port and worker count
+    
+    Where fork isn't available (Windows), the app is served from one threaded
+    process instead.
+    """
+    
+    from werkzeug.serving import make_server
+    
+    port = port or int(os.environ.get("PORT", 5001))
+    workers = workers or (int(os.environ["WEB_CONCURRENCY"]) if os.environ.get("WEB_CONCURRENCY") else None)
+    
+    preload_shared_state(app)
+    
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("fork is not available here; serving from a single process")
+        if worker_init is not None:
+            worker_init()
+        make_server(host, port, app, threaded=True).serve_forever()
+        return
+    
+    PreforkServer(app, host, port, workers, worker_init).serve()
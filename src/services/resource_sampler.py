@@ -0,0 +1,186 @@
+"""
+Resource Sampler
+Background thread that records CPU, memory, disk and process usage into a ring buffer
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import psutil
+
+from src.utils.logger import get_logger
+
+logger = get_logger("resource_sampler")
+
+class ResourceSampler:
+    """Samples system and process resources at a fixed interval so readers never block"""
+    
+    def __init__(self, interval_seconds: float = 5.0, history_size: int = 720,
+                 disk_paths: Optional[List[str]] = None):
+        self.interval_seconds = interval_seconds
+        self.disk_paths = disk_paths or ["/", os.path.join(os.getcwd(), "generated-assets")]
+        self._history = deque(maxlen=history_size)
+        self._history_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+        self._child_processes: Dict[int, psutil.Process] = {}
+    
+    def start(self) -> "ResourceSampler":
+        """Start the sampling thread if it is not already running"""
+        
+        with self._history_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            # cpu_percent(None) measures since the previous call, so prime the counters first
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the sampling thread"""
+        
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(self.interval_seconds + 1)
+    
+    def is_running(self) -> bool:
+        """Whether the sampling thread is alive"""
+        
+        return self._thread is not None and self._thread.is_alive()
+    
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent sample, or None before the first one"""
+        
+        with self._history_lock:
+            return self._history[-1] if self._history else None
+    
+    def get_history(self, seconds: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Samples from the last `seconds`, oldest first, capped at `limit`"""
+        
+        with self._history_lock:
+            samples = list(self._history)
+        
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [sample for sample in samples if sample["timestamp"] >= cutoff]
+        if limit is not None:
+            samples = samples[-limit:] if limit > 0 else []
+        return samples
+    
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample now and add it to the history; never blocks on a CPU measurement"""
+        
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        network = psutil.net_io_counters()
+        now = time.time()
+        
+        sample = {
+            "timestamp": now,
+            "sampled_at": datetime.fromtimestamp(now).isoformat(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "load_average": list(os.getloadavg()) if hasattr(os, "getloadavg") else None,
+            "cpu_count": psutil.cpu_count(),
+            "memory_percent": memory.percent,
+            "memory_available_gb": round(memory.available / (1024**3), 2),
+            "memory_used_gb": round(memory.used / (1024**3), 2),
+            "swap_percent": swap.percent,
+            # Cumulative since boot; bandwidth is the difference between two samples
+            "network_bytes_sent": network.bytes_sent if network else None,
+            "network_bytes_recv": network.bytes_recv if network else None,
+            "disks": self._sample_disks(),
+            "process": self._sample_processes()
+        }
+        
+        with self._history_lock:
+            self._history.append(sample)
+        return sample
+    
+    def _run(self):
+        """Sampling loop"""
+        
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Resource sampling failed: {e}")
+            self._stop_event.wait(self.interval_seconds)
+    
+    def _sample_disks(self) -> Dict[str, Dict[str, float]]:
+        """Usage of each watched path's filesystem"""
+        
+        disks = {}
+        for path in self.disk_paths:
+            if not os.path.exists(path):
+                continue
+            usage = psutil.disk_usage(path)
+            disks[path] = {
+                "percent": usage.percent,
+                "free_gb": round(usage.free / (1024**3), 2),
+                "total_gb": round(usage.total / (1024**3), 2)
+            }
+        return disks
+    
+    def _sample_processes(self) -> Dict[str, Any]:
+        """This process plus its children (video workers, ffmpeg)"""
+        
+        with self._process.oneshot():
+            stats = {
+                "pid": self._process.pid,
+                "cpu_percent": self._process.cpu_percent(interval=None),
+                "rss_mb": round(self._process.memory_info().rss / (1024**2), 1),
+                "threads": self._process.num_threads(),
+                "open_files": self._count_open_files(self._process)
+            }
+        
+        # Reuse Process objects across samples so their cpu_percent covers the interval
+        children = {}
+        for child in self._process.children(recursive=True):
+            children[child.pid] = self._child_processes.get(child.pid, child)
+        self._child_processes = children
+        
+        child_stats = []
+        for child in children.values():
+            try:
+                with child.oneshot():
+                    child_stats.append({
+                        "pid": child.pid,
+                        "name": child.name(),
+                        "cpu_percent": child.cpu_percent(interval=None),
+                        "rss_mb": round(child.memory_info().rss / (1024**2), 1)
+                    })
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        
+        stats["children"] = child_stats
+        stats["children_rss_mb"] = round(sum(child["rss_mb"] for child in child_stats), 1)
+        stats["children_cpu_percent"] = round(sum(child["cpu_percent"] for child in child_stats), 1)
+        return stats
+    
+    def _count_open_files(self, process: psutil.Process) -> Optional[int]:
+        """Open file count, where the platform allows reading it"""
+        
+        try:
+            return len(process.open_files())
+        except (psutil.AccessDenied, NotImplementedError):
+            return None
+
+_resource_sampler: Optional[ResourceSampler] = None
+_resource_sampler_lock = threading.Lock()
+
+def get_resource_sampler() -> ResourceSampler:
+    """Get the process-wide resource sampler, started on first use"""
+    
+    global _resource_sampler
+    with _resource_sampler_lock:
+        if _resource_sampler is None:
+            _resource_sampler = ResourceSampler()
+        return _resource_sampler.start()
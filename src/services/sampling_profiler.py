@@ -0,0 +1,284 @@
+"""
+Sampling Profiler
+On-demand stack sampling of request threads, split into running and waiting samples, reported as collapsed stacks per endpoint
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger("sampling_profiler")
+
+# Deeper stacks are cut at the root end; the leaf frames are what matter for self time
+MAX_STACK_DEPTH = 128
+
+# A thread that used less CPU than this share of the time since its previous sample was waiting
+CPU_BUSY_FRACTION = 0.1
+
+# Leaf functions that block; used where per-thread CPU time can't be read (and for a thread's first sample)
+BLOCKING_LEAF_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("subprocess.py", "_communicate"),
+    ("subprocess.py", "_wait")
+}
+
+# Pseudo-frame that ends waiting stacks when they are kept
+WAITING_FRAME = "[waiting]"
+
+class ProfilerBusy(Exception):
+    """A profile is already running in this process"""
+
+class SamplingProfiler:
+    """Periodically snapshots the Python stacks of threads that are serving requests
+    
+    Nothing runs between profiles apart from recording which endpoint each request
+    thread is serving. While profiling, one background thread reads
+    sys._current_frames() at the sampling interval, so request threads are never
+    instrumented or paused beyond the GIL hand-off.
+    
+    Stacks alone can't tell a thread burning CPU from one blocked in a lock,
+    SQLite or a socket, so each sample also checks the thread's CPU time since
+    its previous sample. Waiting samples are counted but left out of the stacks
+    unless asked for, when they end in a [waiting] frame.
+    """
+    
+    def __init__(self):
+        self._request_threads: Dict[int, str] = {}
+        self._labels: Dict[Any, str] = {}
+        self._profile_lock = threading.Lock()
+        self._root = os.getcwd() + os.sep
+    
+    def register_request(self, endpoint: str):
+        """Mark the calling thread as serving an endpoint"""
+        
+        self._request_threads[threading.get_ident()] = endpoint
+    
+    def unregister_request(self):
+        """Mark the calling thread as idle"""
+        
+        self._request_threads.pop(threading.get_ident(), None)
+    
+    def active_request_count(self) -> int:
+        """Number of threads serving a request right now"""
+        
+        return len(self._request_threads)
+    
+    def is_running(self) -> bool:
+        """Whether a profile is in progress"""
+        
+        return self._profile_lock.locked()
+    
+    def profile(self, seconds: float, interval: float = 0.01, all_threads: bool = False,
+                include_waiting: bool = False) -> Dict[str, Any]:
+        """Sample for `seconds` and return collapsed stacks plus a per-endpoint breakdown
+        
+        Blocks the caller for the duration. With all_threads, background threads are
+        sampled too, labelled by thread name. With include_waiting, the stacks are a
+        wall-clock profile instead of an on-CPU one. Raises ProfilerBusy if a profile
+        is already running.
+        """
+        
+        if not self._profile_lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        
+        try:
+            result: Dict[str, Any] = {}
+            sampler = threading.Thread(
+                target=self._sample, name="sampling-profiler", daemon=True,
+                args=(seconds, interval, all_threads, include_waiting, threading.get_ident(), result)
+            )
+            sampler.start()
+            sampler.join()
+            return result
+        finally:
+            self._profile_lock.release()
+    
+    def _sample(self, seconds: float, interval: float, all_threads: bool, include_waiting: bool,
+                caller_ident: int, result: Dict[str, Any]):
+        stacks: Counter = Counter()
+        # Per thread: CPU seconds and wall time at its previous sample
+        cpu_clocks: Dict[int, Tuple[float, float]] = {}
+        ticks = 0
+        own_ident = threading.get_ident()
+        started = time.perf_counter()
+        started_cpu = time.thread_time()
+        deadline = started + seconds
+        next_tick = started
+        
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_tick:
+                time.sleep(next_tick - now)
+                continue
+            # Skip missed ticks rather than bursting to catch up after a long GIL wait
+            next_tick = max(next_tick + interval, now)
+            ticks += 1
+            
+            frames = sys._current_frames()
+            threads = dict(self._request_threads)
+            live_threads = threading.enumerate()
+            native_ids = {thread.ident: thread.native_id for thread in live_threads}
+            if all_threads:
+                for thread in live_threads:
+                    if thread.ident not in threads:
+                        threads[thread.ident] = f"thread {thread.name}"
+            for ident, endpoint in threads.items():
+                if ident in (own_ident, caller_ident):
+                    continue
+                frame = frames.get(ident)
+                if frame is not None:
+                    waiting = self._is_waiting(ident, native_ids.get(ident), frame, now, cpu_clocks)
+                    stacks[(endpoint, self._stack_key(frame), waiting)] += 1
+            del frames
+        
+        elapsed = time.perf_counter() - started
+        sampler_cpu = time.thread_time() - started_cpu
+        result.update(self._build_report(stacks, ticks, elapsed, sampler_cpu, interval, include_waiting))
+        logger.info("Profile finished", extra={"details": {
+            "seconds": round(elapsed, 3), "samples": ticks, "stack_samples": sum(stacks.values()),
+            "waiting_samples": result["waiting_samples"], "overhead_percent": result["overhead_percent"]
+        }})
+    
+    def _is_waiting(self, ident: int, native_id: Optional[int], frame, now: float,
+                    cpu_clocks: Dict[int, Tuple[float, float]]) -> bool:
+        """Whether a sampled thread was blocked rather than running"""
+        
+        cpu_seconds = _thread_cpu_seconds(native_id)
+        previous = cpu_clocks.get(ident)
+        if cpu_seconds is None:
+            cpu_clocks.pop(ident, None)
+        else:
+            cpu_clocks[ident] = (cpu_seconds, now)
+        if cpu_seconds is not None and previous is not None and now > previous[1]:
+            return cpu_seconds - previous[0] < (now - previous[1]) * CPU_BUSY_FRACTION
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in BLOCKING_LEAF_FUNCTIONS
+    
+    def _stack_key(self, frame) -> tuple:
+        codes = []
+        while frame is not None and len(codes) < MAX_STACK_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+    
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(self._root):
+                filename = filename[len(self._root):]
+            else:
+                filename = os.path.basename(filename)
+            # ';' separates frames in the collapsed format
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+    
+    def _build_report(self, stacks: Counter, ticks: int, elapsed: float, sampler_cpu: float,
+                      interval: float, include_waiting: bool) -> Dict[str, Any]:
+        collapsed: Counter = Counter()
+        endpoint_samples: Counter = Counter()
+        endpoint_waiting: Counter = Counter()
+        endpoint_self: Dict[str, Counter] = {}
+        endpoint_stacks: Dict[str, Counter] = {}
+        
+        for (endpoint, codes, waiting), count in stacks.items():
+            if waiting:
+                endpoint_waiting[endpoint] += count
+                if not include_waiting:
+                    continue
+            frames = [self._label(code) for code in codes] + ([WAITING_FRAME] if waiting else [])
+            stack = ";".join(frames)
+            collapsed[f"{endpoint};{stack}"] += count
+            endpoint_samples[endpoint] += count
+            endpoint_stacks.setdefault(endpoint, Counter())[stack] += count
+            if frames:
+                endpoint_self.setdefault(endpoint, Counter())[frames[-1]] += count
+        
+        total = sum(endpoint_samples.values())
+        endpoints = []
+        # Endpoints that only waited still show up, with no stacks
+        for endpoint in sorted(set(endpoint_samples) | set(endpoint_waiting),
+                               key=lambda name: (-endpoint_samples[name], -endpoint_waiting[name], name)):
+            count = endpoint_samples[endpoint]
+            endpoints.append({
+                "endpoint": endpoint,
+                "samples": count,
+                "waiting_samples": endpoint_waiting[endpoint],
+                "percent": round(count / total * 100, 1) if total else 0.0,
+                "estimated_seconds": round(count * interval, 3),
+                "top_functions": [
+                    {"function": function, "self_samples": self_count,
+                     "percent": round(self_count / count * 100, 1)}
+                    for function, self_count in endpoint_self.get(endpoint, Counter()).most_common(10)
+                ],
+                "top_stacks": [
+                    {"stack": stack, "samples": stack_count}
+                    for stack, stack_count in endpoint_stacks.get(endpoint, Counter()).most_common(5)
+                ]
+            })
+        
+        return {
+            "mode": "wall" if include_waiting else "cpu",
+            "duration_seconds": round(elapsed, 3),
+            "interval_ms": round(interval * 1000, 3),
+            "samples": ticks,
+            "stack_samples": total,
+            "waiting_samples": sum(endpoint_waiting.values()),
+            "sampler_cpu_seconds": round(sampler_cpu, 4),
+            "overhead_percent": round(sampler_cpu / elapsed * 100, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in collapsed.most_common())
+        }
+
+def _thread_cpu_seconds(native_id: Optional[int]) -> Optional[float]:
+    """CPU time a thread of this process has used, from Linux schedstat; None elsewhere or once it exited"""
+    
+    if native_id is None:
+        return None
+    try:
+        with open(f"/proc/self/task/{native_id}/schedstat") as f:
+            return int(f.read().split()[0]) / 1e9
+    except (OSError, ValueError, IndexError):
+        return None
+
+_sampling_profiler: Optional[SamplingProfiler] = None
+_sampling_profiler_lock = threading.Lock()
+
+def get_sampling_profiler() -> SamplingProfiler:
+    """Get the process-wide sampling profiler"""
+    
+    global _sampling_profiler
+    with _sampling_profiler_lock:
+        if _sampling_profiler is None:
+            _sampling_profiler = SamplingProfiler()
+        return _sampling_profiler
+
+def init_app_profiling(app):
+    """Record which endpoint each request thread is serving, for per-endpoint profiles"""
+    
+    from flask import request
+    
+    profiler = get_sampling_profiler()
+    
+    @app.before_request
+    def _register_request_thread():
+        profiler.register_request(f"{request.method} {request.url_rule.rule if request.url_rule else request.path}")
+    
+    @app.teardown_request
+    def _unregister_request_thread(exc):
+        profiler.unregister_request()
@@ -0,0 +1,166 @@
+"""
+Service Registry
+Builds each pipeline service on first use and shares one instance per process
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, TYPE_CHECKING
+
+from src.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from src.models.topic_selector import TopicSelector
+    from src.models.content_generator import ScriptGenerator
+    from src.services.media_generation_service import MediaGenerationService
+    from src.services.video_generation_service import VideoGenerationService
+    from src.services.automated_publishing_service import AutomatedPublishingService
+    from src.services.pipeline_executor import PipelineRunStore
+
+logger = get_logger("service_registry")
+
+class ServiceRegistry:
+    """Named factories whose instances are built lazily and then reused
+    
+    Factories may ask the registry for other services, so one shared
+    MediaGenerationService backs both the media routes and video generation.
+    """
+    
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._timings: Dict[str, Dict[str, Any]] = {}
+        # Reentrant so a factory can build its dependencies through get()
+        self._lock = threading.RLock()
+    
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Add a factory; replacing one drops any instance it already built"""
+        
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+    
+    def get(self, name: str) -> Any:
+        """The shared instance, building it on first use"""
+        
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+            
+            started = time.perf_counter()
+            instance = self._factories[name]()
+            seconds = time.perf_counter() - started
+            self._instances[name] = instance
+            self._timings[name] = {
+                "service": name,
+                "build_seconds": round(seconds, 4),
+                "built_at": datetime.now().isoformat(),
+                "thread": threading.current_thread().name
+            }
+        logger.info(f"Service {name} built in {seconds * 1000:.1f} ms",
+                    extra={"details": {"service": name, "build_seconds": round(seconds, 4)}})
+        return instance
+    
+    def is_built(self, name: str) -> bool:
+        """Whether a service has been constructed in this process"""
+        
+        return name in self._instances
+    
+    def get_timings(self) -> List[Dict[str, Any]]:
+        """Build time of every constructed service, in build order"""
+        
+        with self._lock:
+            return [dict(timing) for timing in self._timings.values()]
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Registered services and which of them exist yet"""
+        
+        with self._lock:
+            return {
+                "registered": sorted(self._factories),
+                "built": list(self._instances),
+                "timings": self.get_timings()
+            }
+
+def _build_topic_selector():
+    from src.models.topic_selector import TopicSelector
+    return TopicSelector()
+
+def _build_script_generator():
+    from src.models.content_generator import ScriptGenerator
+    return ScriptGenerator()
+
+def _build_media_service():
+    from src.services.media_generation_service import MediaGenerationService
+    return MediaGenerationService()
+
+def _build_video_service():
+    from src.services.video_generation_service import VideoGenerationService
+    return VideoGenerationService(media_service=get_media_service())
+
+def _build_publishing_service():
+    from src.services.automated_publishing_service import AutomatedPublishingService
+    return AutomatedPublishingService()
+
+def _build_pipeline_runs():
+    from src.services.pipeline_executor import PipelineRunStore
+    return PipelineRunStore()
+
+_service_registry: Optional[ServiceRegistry] = None
+_service_registry_lock = threading.Lock()
+
+def get_service_registry() -> ServiceRegistry:
+    """Get the process-wide service registry with the pipeline services registered"""
+    
+    global _service_registry
+    if _service_registry is not None:
+        return _service_registry
+    with _service_registry_lock:
+        if _service_registry is None:
+            registry = ServiceRegistry()
+            registry.register("topic_selector", _build_topic_selector)
+            registry.register("script_generator", _build_script_generator)
+            registry.register("media_service", _build_media_service)
+            registry.register("video_service", _build_video_service)
+            registry.register("publishing_service", _build_publishing_service)
+            registry.register("pipeline_runs", _build_pipeline_runs)
+            _service_registry = registry
+        return _service_registry
+
+def get_topic_selector() -> "TopicSelector":
+    """The process's shared topic selector"""
+    
+    return get_service_registry().get("topic_selector")
+
+def get_script_generator() -> "ScriptGenerator":
+    """The process's shared script generator"""
+    
+    return get_service_registry().get("script_generator")
+
+def get_media_service() -> "MediaGenerationService":
+    """The process's shared media generation service"""
+    
+    return get_service_registry().get("media_service")
+
+def get_video_service() -> "VideoGenerationService":
+    """The process's shared video generation service, built on the shared media service"""
+    
+    return get_service_registry().get("video_service")
+
+def get_publishing_service() -> "AutomatedPublishingService":
+    """The process's shared publishing service"""
+    
+    return get_service_registry().get("publishing_service")
+
+def get_pipeline_runs() -> "PipelineRunStore":
+    """The process's pipeline run store"""
+    
+    return get_service_registry().get("pipeline_runs")
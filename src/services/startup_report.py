@@ -0,0 +1,117 @@
+"""
+Startup Report
+Times each phase of application startup and the first request it serves
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger("startup")
+
+# Measured from when this module is first imported; main.py imports it before anything heavy
+_MODULE_LOADED = time.perf_counter()
+
+class StartupReport:
+    """Phase durations from process start to app ready, plus time to first request"""
+    
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self._phases: List[Dict[str, Any]] = []
+        self._ready_seconds: Optional[float] = None
+        self._first_request: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block of startup work"""
+        
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases.append({
+                    "phase": name,
+                    "start_ms": round((started - self.started) * 1000, 1),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+                })
+    
+    def mark_ready(self):
+        """The app is built and can take requests; logs the phase breakdown"""
+        
+        with self._lock:
+            self._ready_seconds = time.perf_counter() - self.started
+            phases = list(self._phases)
+        logger.info(f"App ready in {self._ready_seconds * 1000:.0f} ms", extra={"details": {
+            "ready_ms": round(self._ready_seconds * 1000, 1),
+            "phases": {phase["phase"]: phase["duration_ms"] for phase in phases}
+        }})
+    
+    def record_first_request(self, endpoint: str, request_started: float, status_code: int):
+        """Keep timing for the first request served; later calls are ignored"""
+        
+        with self._lock:
+            if self._first_request is not None:
+                return
+            finished = time.perf_counter()
+            self._first_request = {
+                "endpoint": endpoint,
+                "status_code": status_code,
+                "received_after_ms": round((request_started - self.started) * 1000, 1),
+                "duration_ms": round((finished - request_started) * 1000, 1),
+                "completed_after_ms": round((finished - self.started) * 1000, 1)
+            }
+            first_request = dict(self._first_request)
+        logger.info(f"First request served {first_request['completed_after_ms']:.0f} ms after start",
+                    extra={"details": first_request})
+    
+    def has_first_request(self) -> bool:
+        """Whether the first request has been recorded"""
+        
+        return self._first_request is not None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The report so far"""
+        
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "started_at": self.started_at,
+                "phases": list(self._phases),
+                "ready_ms": round(self._ready_seconds * 1000, 1) if self._ready_seconds is not None else None,
+                "first_request": dict(self._first_request) if self._first_request else None
+            }
+
+_startup_report = StartupReport(_MODULE_LOADED)
+
+def get_startup_report() -> StartupReport:
+    """This process's startup report"""
+    
+    return _startup_report
+
+def init_app_startup_report(app):
+    """Record the first request the app serves"""
+    
+    from flask import g, request
+    
+    report = get_startup_report()
+    
+    @app.before_request
+    def _note_request_start():
+        if not report.has_first_request():
+            g.startup_request_started = time.perf_counter()
+    
+    @app.after_request
+    def _record_first_request(response):
+        started = g.pop("startup_request_started", None)
+        if started is not None:
+            endpoint = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+            report.record_first_request(endpoint, started, response.status_code)
+        return response
@@ -0,0 +1,218 @@
+"""
+Static Manifest
+In-memory index of the dashboard's static files with precompressed variants and content-hash ETags
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, Optional
+
+from src.utils.logger import get_logger
+
+try:
+    import brotli
+except ImportError:
+    # gzip variants only; install Brotli for the smaller br variants
+    brotli = None
+
+logger = get_logger("static_manifest")
+
+# Files up to this size are held in memory; larger ones are streamed from disk with the same headers
+MAX_MEMORY_BYTES = 4 * 1024 * 1024
+# Smaller files aren't worth a Content-Encoding round trip
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml",
+                      "image/svg+xml", "application/wasm", "application/manifest+json")
+# Precompressed siblings written by a frontend build (app.js.br, app.js.gz), used as-is
+PRECOMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+
+# Build tools put a content hash in the file name (index-3f9a2c1d.js, main.8e4b1f0a.css); those files
+# never change under the same name, so browsers may keep them for a year without revalidating
+FINGERPRINT_PATTERN = re.compile(r"[.-](?=[A-Za-z0-9_]*\d)[A-Za-z0-9_]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+@dataclass(frozen=True)
+class StaticFile:
+    """One static file: its identity bytes (unless too large to hold) and any compressed variants"""
+    
+    path: str
+    disk_path: str
+    mimetype: str
+    size: int
+    content_hash: str
+    cache_control: str
+    compressible: bool
+    data: Optional[bytes] = None
+    variants: Dict[str, bytes] = field(default_factory=dict)
+    
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """Strong ETag for one representation; each encoding is a different byte sequence"""
+        
+        return f"{self.content_hash}-{encoding}" if encoding else self.content_hash
+
+class StaticManifest:
+    """Maps request paths to static files, built once from the static folder
+    
+    Requests look paths up in a dict, so serving never touches the filesystem
+    and unknown paths can't escape the folder. Built at startup; a new frontend
+    build needs a restart (or rebuild()) to show up.
+    """
+    
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self._files: Dict[str, StaticFile] = {}
+        self._compress_lock = threading.Lock()
+    
+    def build(self) -> "StaticManifest":
+        """Scan the static folder, hashing each file and loading the ones small enough to keep"""
+        
+        started = time.perf_counter()
+        files = {}
+        if os.path.isdir(self.static_dir):
+            for root, _, names in os.walk(self.static_dir):
+                for name in names:
+                    disk_path = os.path.join(root, name)
+                    path = os.path.relpath(disk_path, self.static_dir).replace(os.sep, "/")
+                    stem, suffix = os.path.splitext(path)
+                    if suffix in PRECOMPRESSED_SUFFIXES and os.path.exists(os.path.join(self.static_dir, stem)):
+                        continue
+                    files[path] = self._load_file(path, disk_path)
+        
+        # One assignment, so a rebuild never shows readers a half-built manifest
+        self._files = files
+        logger.info(f"Static manifest built with {len(files)} files", extra={"details": {
+            "files": len(files),
+            "bytes": sum(entry.size for entry in files.values()),
+            "build_seconds": round(time.perf_counter() - started, 3)
+        }})
+        return self
+    
+    def rebuild(self) -> "StaticManifest":
+        """Pick up a new frontend build and compress it"""
+        
+        self.build()
+        self.compress_missing()
+        return self
+    
+    def get(self, path: str) -> Optional[StaticFile]:
+        """The file for a request path, or None"""
+        
+        return self._files.get(path)
+    
+    def compress_missing(self) -> Dict[str, Any]:
+        """Compute the gzip and brotli variants that the build didn't ship"""
+        
+        with self._compress_lock:
+            started = time.perf_counter()
+            encoded = 0
+            for path, entry in list(self._files.items()):
+                if not entry.compressible or entry.data is None:
+                    continue
+                variants = dict(entry.variants)
+                if "gzip" not in variants:
+                    variants["gzip"] = gzip.compress(entry.data, compresslevel=9, mtime=0)
+                if "br" not in variants and brotli is not None:
+                    variants["br"] = brotli.compress(entry.data, quality=11)
+                # Only keep variants that actually save bytes
+                variants = {encoding: body for encoding, body in variants.items() if len(body) < entry.size}
+                if variants != entry.variants:
+                    self._files[path] = replace(entry, variants=variants)
+                    encoded += 1
+            
+            stats = self.get_stats()
+            stats["compress_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Static manifest compressed {encoded} files", extra={"details": stats})
+        return stats
+    
+    def compress_async(self) -> threading.Thread:
+        """Compress in the background; files are served uncompressed until their variants exist"""
+        
+        thread = threading.Thread(target=self.compress_missing, name="static-compress", daemon=True)
+        thread.start()
+        return thread
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """File counts and how many bytes the best variant of each file saves"""
+        
+        files = list(self._files.values())
+        compressed = [entry for entry in files if entry.variants]
+        return {
+            "files": len(files),
+            "in_memory": sum(1 for entry in files if entry.data is not None),
+            "compressed": len(compressed),
+            "bytes": sum(entry.size for entry in files),
+            "best_variant_bytes": sum(
+                min([len(body) for body in entry.variants.values()] + [entry.size]) for entry in files
+            ),
+            "brotli_available": brotli is not None
+        }
+    
+    def _load_file(self, path: str, disk_path: str) -> StaticFile:
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        size = os.path.getsize(disk_path)
+        digest = hashlib.sha256()
+        data = None
+        
+        with open(disk_path, "rb") as f:
+            if size <= MAX_MEMORY_BYTES:
+                data = f.read()
+                digest.update(data)
+            else:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        
+        variants = {}
+        for suffix, encoding in PRECOMPRESSED_SUFFIXES.items():
+            if data is not None and os.path.exists(disk_path + suffix):
+                with open(disk_path + suffix, "rb") as f:
+                    variants[encoding] = f.read()
+        
+        fingerprinted = FINGERPRINT_PATTERN.search(os.path.basename(path)) is not None
+        return StaticFile(
+            path=path,
+            disk_path=disk_path,
+            mimetype=mimetype,
+            size=size,
+            content_hash=digest.hexdigest()[:32],
+            cache_control=IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL,
+            compressible=size >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES),
+            data=data,
+            variants=variants
+        )
+
+def send_static_file(entry: StaticFile):
+    """Response for a static file: 304 on a matching If-None-Match, otherwise the best encoding accepted"""
+    
+    from flask import Response, request, send_file
+    
+    encoding = None
+    if entry.variants:
+        # Highest client preference wins; on a tie, the smaller body
+        accepted = [(request.accept_encodings[name], -len(body), name) for name, body in entry.variants.items()
+                    if request.accept_encodings[name] > 0]
+        if accepted:
+            encoding = max(accepted)[2]
+    etag = entry.etag(encoding)
+    
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif entry.data is None:
+        # Too large to hold; werkzeug streams it and handles Range for us
+        response = send_file(entry.disk_path, mimetype=entry.mimetype, etag=etag, conditional=True, max_age=None)
+    else:
+        response = Response(entry.variants[encoding] if encoding else entry.data, mimetype=entry.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = entry.cache_control
+    if entry.compressible:
+        response.vary.add("Accept-Encoding")
+    return response
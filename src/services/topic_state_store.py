@@ -0,0 +1,230 @@
+"""
+Topic State Store
+Topic performance data and selection history shared by every process on the node
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger("topic_state_store")
+
+# Selections kept for the diversity window (at most 20); older ones only live on in the running counts
+RECENT_SELECTIONS = 20
+
+# Selection columns with a running count per value
+COUNTED_COLUMNS = ("content_type", "age_group")
+
+PERFORMANCE_COLUMNS = ["key", "topic", "content_type", "age_group", "views", "watch_time_minutes",
+                       "engagement_rate", "retention_rate", "last_used", "success_score"]
+
+class TopicStateStore:
+    """SQLite-backed topic state with a version counter
+    
+    Every write bumps the version inside its transaction, so readers keep a
+    local copy and only reload it when get_version() has moved. Writers use
+    transaction(), which takes SQLite's write lock up front, so a read-score-record
+    selection in one process never interleaves with another's.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.environ.get("PIPELINE_TOPIC_DB") or os.path.join(
+                os.getcwd(), "generated-assets", "topics", "topic_state.db"
+            )
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._create_schema()
+    
+    @contextmanager
+    def transaction(self):
+        """A connection holding the write lock; commits on success, rolls back on error"""
+        
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+    
+    def seed_performance(self, rows: List[Dict[str, Any]]) -> bool:
+        """Store baseline performance rows if there are none yet; returns whether they were stored"""
+        
+        with self.transaction() as connection:
+            if connection.execute("SELECT 1 FROM topic_performance LIMIT 1").fetchone():
+                return False
+            for row in rows:
+                self._write_performance(connection, row)
+            self._bump_version(connection)
+        logger.info(f"Seeded topic performance data with {len(rows)} topics",
+                    extra={"details": {"topics": len(rows), "db_path": self.db_path}})
+        return True
+    
+    def get_version(self, connection: Optional[sqlite3.Connection] = None) -> int:
+        """Version of the stored state; changes with every write"""
+        
+        if connection is None:
+            with self._connect() as connection:
+                return self.get_version(connection)
+        return connection.execute("SELECT value FROM topic_state WHERE name = 'version'").fetchone()["value"]
+    
+    def load(self, connection: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """The whole state: version, performance rows, recent selections and selection counts"""
+        
+        if connection is None:
+            with self._connect() as connection:
+                return self.load(connection)
+        
+        performance = [dict(row) for row in connection.execute(
+            f"SELECT {', '.join(PERFORMANCE_COLUMNS)} FROM topic_performance ORDER BY key"
+        )]
+        recent = [dict(row) for row in connection.execute(
+            "SELECT topic, content_type, age_group, selected_at FROM topic_selections ORDER BY id DESC LIMIT ?",
+            (RECENT_SELECTIONS,)
+        )]
+        recent.reverse()
+        counts = {column: {} for column in COUNTED_COLUMNS}
+        for row in connection.execute("SELECT dimension, value, count FROM topic_selection_counts"):
+            counts[row["dimension"]][row["value"]] = row["count"]
+        return {
+            "version": self.get_version(connection),
+            "performance": performance,
+            "recent_selections": recent,
+            "content_type_counts": counts["content_type"],
+            "age_group_counts": counts["age_group"]
+        }
+    
+    def record_selection(self, connection: sqlite3.Connection, topic: str, content_type: str, age_group: str,
+                         selected_at: float):
+        """Add a selection to the history, inside a transaction(); only the newest RECENT_SELECTIONS are kept"""
+        
+        cursor = connection.execute(
+            "INSERT INTO topic_selections (topic, content_type, age_group, selected_at) VALUES (?, ?, ?, ?)",
+            (topic, content_type, age_group, selected_at)
+        )
+        connection.execute("DELETE FROM topic_selections WHERE id <= ?", (cursor.lastrowid - RECENT_SELECTIONS,))
+        for column, value in zip(COUNTED_COLUMNS, (content_type, age_group)):
+            connection.execute(
+                "INSERT INTO topic_selection_counts (dimension, value, count) VALUES (?, ?, 1) "
+                "ON CONFLICT(dimension, value) DO UPDATE SET count = count + 1",
+                (column, value)
+            )
+        self._bump_version(connection)
+    
+    @contextmanager
+    def scratch_copy(self):
+        """A throwaway store holding a copy of the current state, for simulations that must not be recorded"""
+        
+        scratch_dir = tempfile.mkdtemp(prefix="topic_state_")
+        scratch_path = os.path.join(scratch_dir, "topic_state.db")
+        try:
+            with self._connect() as connection:
+                scratch = sqlite3.connect(scratch_path)
+                try:
+                    connection.backup(scratch)
+                finally:
+                    scratch.close()
+            yield TopicStateStore(scratch_path)
+        finally:
+            for file_name in os.listdir(scratch_dir):
+                os.remove(os.path.join(scratch_dir, file_name))
+            os.rmdir(scratch_dir)
+    
+    def save_performance(self, connection: sqlite3.Connection, row: Dict[str, Any]):
+        """Insert or replace one topic's performance row, inside a transaction()"""
+        
+        self._write_performance(connection, row)
+        self._bump_version(connection)
+    
+    def _write_performance(self, connection: sqlite3.Connection, row: Dict[str, Any]):
+        connection.execute(
+            f"INSERT OR REPLACE INTO topic_performance ({', '.join(PERFORMANCE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in PERFORMANCE_COLUMNS)})",
+            [row[column] for column in PERFORMANCE_COLUMNS]
+        )
+    
+    def _bump_version(self, connection: sqlite3.Connection):
+        connection.execute("UPDATE topic_state SET value = value + 1 WHERE name = 'version'")
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode; SQLite connections are cheap"""
+        
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+    
+    def _create_schema(self):
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS topic_performance (
+                    key TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    age_group TEXT NOT NULL,
+                    views INTEGER NOT NULL,
+                    watch_time_minutes REAL NOT NULL,
+                    engagement_rate REAL NOT NULL,
+                    retention_rate REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    success_score REAL NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS topic_selections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    topic TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    age_group TEXT NOT NULL,
+                    selected_at REAL NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS topic_selection_counts (
+                    dimension TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (dimension, value)
+                )
+            """)
+            connection.execute("CREATE TABLE IF NOT EXISTS topic_state (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO topic_state (name, value) VALUES ('version', 0)")
+            
+            # Databases from before the running counts: count the stored history once, then trim it
+            connection.execute("BEGIN IMMEDIATE")
+            if not connection.execute("SELECT 1 FROM topic_selection_counts LIMIT 1").fetchone():
+                for column in COUNTED_COLUMNS:
+                    connection.execute(
+                        f"INSERT INTO topic_selection_counts (dimension, value, count) "
+                        f"SELECT ?, {column}, COUNT(*) FROM topic_selections GROUP BY {column}",
+                        (column,)
+                    )
+                connection.execute(
+                    "DELETE FROM topic_selections WHERE id <= (SELECT MAX(id) FROM topic_selections) - ?",
+                    (RECENT_SELECTIONS,)
+                )
+            connection.execute("COMMIT")
+
+_topic_state_store: Optional[TopicStateStore] = None
+_topic_state_store_lock = threading.Lock()
+
+def get_topic_state_store() -> TopicStateStore:
+    """Get the process-wide topic state store"""
+    
+    global _topic_state_store
+    if _topic_state_store is not None:
+        return _topic_state_store
+    with _topic_state_store_lock:
+        if _topic_state_store is None:
+            _topic_state_store = TopicStateStore()
+        return _topic_state_store
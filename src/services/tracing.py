@@ -0,0 +1,388 @@
+"""
+Run Tracing
+Nested timing spans per trace, exported in Chrome / Perfetto trace event format
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import threading
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Any, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger("tracing")
+
+TRACE_ID_HEADER = "X-Trace-Id"
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    category: str
+    start_us: int  # wall clock, so spans from different processes line up
+    duration_us: int = 0
+    pid: int = 0
+    tid: int = 0
+    thread_name: str = ""
+    args: Dict[str, Any] = field(default_factory=dict)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+# Spans finished under the current local root, written together when the root ends
+_local_spans: ContextVar[Optional[List[Span]]] = ContextVar("local_spans", default=None)
+
+class trace_span(ContextDecorator):
+    """Time a block as a child of the current span; a no-op outside a trace
+    
+    Usable as a decorator or a context manager. Extra keyword arguments are stored
+    as span args; more can be added through the returned span's `args`.
+    """
+    
+    def __init__(self, name: str, category: str = "pipeline", **args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.span: Optional[Span] = None
+    
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            self.span = None
+            return None
+        self.span = _open_span(parent.trace_id, parent.span_id, self.name, self.category, self.args)
+        self._token = _current_span.set(self.span)
+        self._started = time.perf_counter()
+        return self.span
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if self.span is None:
+            return False
+        self.span.duration_us = int((time.perf_counter() - self._started) * 1_000_000)
+        if exc_type is not None:
+            self.span.args["error"] = f"{exc_type.__name__}: {exc}"
+        _reset(_current_span, self._token, None)
+        spans = _local_spans.get()
+        if spans is not None:
+            spans.append(self.span)
+        return False
+    
+    def _recreate_cm(self):
+        # Each decorated call gets its own span
+        return trace_span(self.name, self.category, **self.args)
+
+class start_trace:
+    """Open the root span of this process's part of a trace
+    
+    Child spans collect in memory and go to the recorder in one batch when the
+    root ends. Unless `keep` is set, a trace with no child spans (a health check,
+    say) is dropped so routine traffic doesn't fill the trace directory.
+    """
+    
+    def __init__(self, trace_id: Optional[str], name: str, category: str = "request", keep: bool = False, **args):
+        self.trace_id = trace_id or new_trace_id()
+        self.name = name
+        self.category = category
+        self.keep = keep
+        self.args = args
+        self.span: Optional[Span] = None
+    
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        parent_id = parent.span_id if parent is not None and parent.trace_id == self.trace_id else None
+        self.span = _open_span(self.trace_id, parent_id, self.name, self.category, self.args)
+        self._span_token = _current_span.set(self.span)
+        self._spans_token = _local_spans.set([])
+        self._started = time.perf_counter()
+        return self.span
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.span.duration_us = int((time.perf_counter() - self._started) * 1_000_000)
+        if exc_type is not None:
+            self.span.args["error"] = f"{exc_type.__name__}: {exc}"
+        spans = _local_spans.get() or []
+        _reset(_current_span, self._span_token, None)
+        _reset(_local_spans, self._spans_token, None)
+        if spans or self.keep:
+            get_trace_recorder().record(spans + [self.span])
+        return False
+
+def new_trace_id() -> str:
+    """32 hex digits, the same shape as a W3C trace-context trace ID"""
+    
+    return uuid.uuid4().hex
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the active span, if any"""
+    
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+def trace_id_from_headers(headers) -> Optional[str]:
+    """Trace ID from an X-Trace-Id or W3C traceparent request header"""
+    
+    trace_id = headers.get(TRACE_ID_HEADER)
+    if trace_id and all(c.isalnum() or c in "-_" for c in trace_id) and len(trace_id) <= 64:
+        return trace_id
+    traceparent = headers.get("traceparent", "")
+    parts = traceparent.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32:
+        return parts[1]
+    return None
+
+class TraceRecorder:
+    """Appends finished spans to one JSON-lines file per trace from a background thread
+    
+    Several processes can add to the same trace (the API process and a video
+    worker); each batch is a single append so their lines don't interleave.
+    """
+    
+    def __init__(self, traces_dir: Optional[str] = None, max_traces: int = 500):
+        if traces_dir is None:
+            traces_dir = os.path.join(os.getcwd(), "generated-assets", "traces")
+        self.traces_dir = traces_dir
+        self.max_traces = max_traces
+        os.makedirs(self.traces_dir, exist_ok=True)
+        self._queue: "queue.SimpleQueue[List[Span]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._batches_written = 0
+    
+    def record(self, spans: List[Span]):
+        """Queue spans for writing; never touches the disk on the caller's thread"""
+        
+        self._ensure_writer()
+        self._queue.put(spans)
+    
+    def list_traces(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently updated traces"""
+        
+        entries = [entry for entry in os.scandir(self.traces_dir) if entry.name.endswith(".jsonl")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        return [
+            {
+                "trace_id": entry.name[:-len(".jsonl")],
+                "updated_at": entry.stat().st_mtime,
+                "size_bytes": entry.stat().st_size
+            }
+            for entry in entries[:limit]
+        ]
+    
+    def load_spans(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Every recorded span of a trace, or None if it is unknown"""
+        
+        path = self._trace_path(trace_id)
+        if path is None or not os.path.exists(path):
+            return None
+        spans = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue  # a batch still being written
+        return spans
+    
+    def export_chrome_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Trace in Chrome trace event format, loadable in chrome://tracing and Perfetto"""
+        
+        spans = self.load_spans(trace_id)
+        if spans is None:
+            return None
+        
+        events = []
+        named_processes = set()
+        named_threads = set()
+        for span in sorted(spans, key=lambda span: span["start_us"]):
+            if span["pid"] not in named_processes:
+                named_processes.add(span["pid"])
+                events.append({"ph": "M", "name": "process_name", "pid": span["pid"], "tid": 0,
+                               "args": {"name": f"{span['args'].get('hostname', '')} pid {span['pid']}".strip()}})
+            if (span["pid"], span["tid"]) not in named_threads:
+                named_threads.add((span["pid"], span["tid"]))
+                events.append({"ph": "M", "name": "thread_name", "pid": span["pid"], "tid": span["tid"],
+                               "args": {"name": span["thread_name"]}})
+            events.append({
+                "ph": "X",
+                "name": span["name"],
+                "cat": span["category"],
+                "ts": span["start_us"],
+                "dur": span["duration_us"],
+                "pid": span["pid"],
+                "tid": span["tid"],
+                "args": {**span["args"], "span_id": span["span_id"], "parent_id": span["parent_id"]}
+            })
+        
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "trace_id": trace_id,
+                "span_count": len(spans),
+                "critical_path": get_critical_path(spans)
+            }
+        }
+    
+    def _ensure_writer(self):
+        """Start the writer thread, again in a forked child that inherited a dead one"""
+        
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer_pid == os.getpid():
+                return
+            self._queue = queue.SimpleQueue()
+            self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+            self._writer_pid = os.getpid()
+            self._writer.start()
+    
+    def _write_loop(self):
+        """Append each batch to its trace file"""
+        
+        while True:
+            spans = self._queue.get()
+            try:
+                self._write_batch(spans)
+            except OSError as e:
+                logger.warning(f"Trace write failed: {e}")
+    
+    def _write_batch(self, spans: List[Span]):
+        hostname = socket.gethostname()
+        lines = []
+        for span in spans:
+            record = asdict(span)
+            record["args"].setdefault("hostname", hostname)
+            lines.append(json.dumps(record, default=str))
+        
+        with open(self._trace_path(spans[0].trace_id), "a") as f:
+            f.write("\n".join(lines) + "\n")
+        
+        self._batches_written += 1
+        if self._batches_written % 50 == 0:
+            self._prune()
+    
+    def _prune(self):
+        """Keep only the most recently updated traces"""
+        
+        for trace in self.list_traces(limit=10 ** 6)[self.max_traces:]:
+            try:
+                os.remove(self._trace_path(trace["trace_id"]))
+            except OSError:
+                pass
+    
+    def _trace_path(self, trace_id: str) -> Optional[str]:
+        if not trace_id or not all(c.isalnum() or c in "-_" for c in trace_id):
+            return None
+        return os.path.join(self.traces_dir, f"{trace_id}.jsonl")
+
+def get_critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Spans that determined the trace's end-to-end time, outermost first
+    
+    Among siblings, the one finishing last is what the parent waited on; before it,
+    the sibling that finished last before it started, and so on back to the
+    parent's start. The same walk repeats inside each span on the path.
+    """
+    
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {span["span_id"] for span in spans}
+    for span in spans:
+        parent_id = span["parent_id"] if span["parent_id"] in span_ids else None
+        children.setdefault(parent_id, []).append(span)
+    
+    path = []
+    
+    def walk(siblings: List[Dict[str, Any]], depth: int):
+        chain = []
+        candidates = siblings
+        while candidates:
+            span = max(candidates, key=_span_end)
+            chain.append(span)
+            # Allow a millisecond of clock skew between a dependency's end and the next start
+            candidates = [other for other in candidates
+                          if other is not span and _span_end(other) <= span["start_us"] + 1000]
+        for span in reversed(chain):
+            path.append({"name": span["name"], "category": span["category"], "depth": depth,
+                         "duration_ms": round(span["duration_us"] / 1000, 3)})
+            walk(children.get(span["span_id"], []), depth + 1)
+    
+    walk(children.get(None, []), 0)
+    return path
+
+def _span_end(span: Dict[str, Any]) -> int:
+    return span["start_us"] + span["duration_us"]
+
+def _open_span(trace_id: str, parent_id: Optional[str], name: str, category: str, args: Dict[str, Any]) -> Span:
+    thread = threading.current_thread()
+    return Span(
+        trace_id=trace_id,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent_id,
+        name=name,
+        category=category,
+        start_us=time.time_ns() // 1000,
+        pid=os.getpid(),
+        tid=threading.get_ident(),
+        thread_name=thread.name,
+        args=dict(args)
+    )
+
+def _reset(variable: ContextVar, token, fallback):
+    """Reset a context variable; a response finished in another context just clears it"""
+    
+    try:
+        variable.reset(token)
+    except ValueError:
+        variable.set(fallback)
+
+_trace_recorder: Optional[TraceRecorder] = None
+_trace_recorder_lock = threading.Lock()
+
+def get_trace_recorder() -> TraceRecorder:
+    """Get the process-wide trace recorder"""
+    
+    global _trace_recorder
+    with _trace_recorder_lock:
+        if _trace_recorder is None:
+            _trace_recorder = TraceRecorder()
+        return _trace_recorder
+
+def init_app_tracing(app):
+    """Open a root span for every request, continuing the caller's trace ID when given"""
+    
+    from flask import g, request
+    
+    @app.before_request
+    def _start_request_trace():
+        incoming_trace_id = trace_id_from_headers(request.headers)
+        trace = start_trace(
+            incoming_trace_id,
+            f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+            category="http",
+            keep=incoming_trace_id is not None,  # the caller asked for this trace
+            method=request.method,
+            path=request.path
+        )
+        trace.__enter__()
+        g.trace = trace
+    
+    @app.after_request
+    def _add_trace_header(response):
+        trace = g.get("trace")
+        if trace is not None:
+            response.headers[TRACE_ID_HEADER] = trace.trace_id
+            trace.span.args["status_code"] = response.status_code
+        return response
+    
+    @app.teardown_request
+    def _end_request_trace(exc):
+        trace = g.pop("trace", None)
+        if trace is not None:
+            trace.__exit__(type(exc) if exc else None, exc, None)
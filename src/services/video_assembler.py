@@ -0,0 +1,489 @@
+"""
+Filtergraph Video Renderer
+Compiles a VideoAssembler assembly plan into a single ffmpeg invocation
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import time
+from typing import Dict, List, Any, Optional
+
+from src.services.ffmpeg_capabilities import FFmpegCapabilityRegistry, get_capability_registry
+from src.services.ffmpeg_runner import FFmpegJobRunner, get_job_runner
+
+# Segments at the default 5000k bitrate take about 37 MB per minute, so this holds several hours
+DEFAULT_SEGMENT_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# Segments unused this long are dropped even when the cache is under its size limit
+DEFAULT_SEGMENT_MAX_AGE_SECONDS = 14 * 24 * 3600
+
+CODEC_ENCODERS = {
+    "H.264": "libx264",
+    "H.265": "libx265"
+}
+
+class FilterGraphRenderer:
+    """Renders an assembly plan's video with one ffmpeg process, muxing in the premixed soundtrack"""
+    
+    def __init__(self, rendering_settings: Dict[str, Any], ffmpeg_path: str = "ffmpeg",
+                 job_runner: Optional[FFmpegJobRunner] = None,
+                 capabilities: Optional[FFmpegCapabilityRegistry] = None):
+        self.rendering_settings = rendering_settings
+        self.ffmpeg_path = ffmpeg_path
+        self.job_runner = job_runner or get_job_runner()
+        self.capabilities = capabilities or get_capability_registry()
+        width, height = rendering_settings.get("resolution", "1920x1080").split("x")
+        self.width = int(width)
+        self.height = int(height)
+        self.framerate = rendering_settings.get("framerate", 30)
+        self.sample_rate = 44100
+    
+    def render(self, assembly_plan: Dict[str, Any], output_path: str,
+               audio_path: Optional[str] = None) -> Dict[str, Any]:
+        """Render the plan to output_path and report time per rendered minute
+        
+        audio_path is the plan's soundtrack, already mixed (VideoAssembler.mix_audio).
+        """
+        
+        duration_seconds = self.get_plan_duration(assembly_plan)
+        cmd = self.build_command(assembly_plan, output_path, audio_path=audio_path)
+        
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        started = time.perf_counter()
+        
+        job = self.job_runner.run(
+            cmd,
+            duration_seconds=duration_seconds,
+            timeout_seconds=self.rendering_settings.get("render_timeout_seconds"),
+            label=f"render {os.path.basename(output_path)}"
+        )
+        
+        render_seconds = time.perf_counter() - started
+        rendered_minutes = duration_seconds / 60.0
+        
+        return {
+            "success": job.status == "completed",
+            "output_path": output_path,
+            "duration_seconds": duration_seconds,
+            "render_seconds": render_seconds,
+            "seconds_per_rendered_minute": render_seconds / rendered_minutes if rendered_minutes else None,
+            "scene_count": len(assembly_plan.get("scenes", [])),
+            "encoder": self.get_video_encoder(),
+            "job_id": job.job_id,
+            "job_status": job.status,
+            "error": job.error
+        }
+    
+    def get_plan_duration(self, assembly_plan: Dict[str, Any]) -> float:
+        """Total video length: the sum of scene durations"""
+        
+        return float(sum(scene.get("duration_seconds", 30) for scene in assembly_plan.get("scenes", [])))
+    
+    def build_command(self, assembly_plan: Dict[str, Any], output_path: str,
+                      include_audio: bool = True, threads: Optional[int] = None,
+                      audio_path: Optional[str] = None) -> List[str]:
+        """Build the complete ffmpeg command line for a plan"""
+        
+        inputs: List[List[str]] = []
+        filters: List[str] = []
+        
+        video_label = self._build_video_graph(assembly_plan.get("scenes", []), inputs, filters)
+        if include_audio:
+            audio_map = self._add_audio_input(audio_path, inputs)
+        
+        cmd = [self.ffmpeg_path, '-y', '-hide_banner', '-nostdin']
+        for input_args in inputs:
+            cmd.extend(input_args)
+        
+        cmd.extend(['-filter_complex', ';'.join(filters)])
+        cmd.extend(['-map', f'[{video_label}]'])
+        if include_audio:
+            cmd.extend(['-map', audio_map])
+            cmd.extend(self._get_encoder_args())
+        else:
+            cmd.extend(self._get_video_encoder_args() + ['-an'])
+        if threads:
+            cmd.extend(['-threads', str(threads)])
+        cmd.extend(['-t', f'{self.get_plan_duration(assembly_plan):.3f}', output_path])
+        
+        return cmd
+    
+    def build_mux_command(self, assembly_plan: Dict[str, Any], concat_list_path: str,
+                          output_path: str, audio_path: Optional[str] = None) -> List[str]:
+        """Join pre-rendered video segments by stream copy and add the mixed audio"""
+        
+        inputs: List[List[str]] = [['-f', 'concat', '-safe', '0', '-i', concat_list_path]]
+        audio_map = self._add_audio_input(audio_path, inputs)
+        
+        cmd = [self.ffmpeg_path, '-y', '-hide_banner', '-nostdin']
+        for input_args in inputs:
+            cmd.extend(input_args)
+        
+        cmd.extend(['-map', '0:v', '-map', audio_map, '-c:v', 'copy'])
+        cmd.extend(self._get_audio_encoder_args())
+        cmd.extend(['-movflags', '+faststart'])
+        cmd.extend(['-t', f'{self.get_plan_duration(assembly_plan):.3f}', output_path])
+        
+        return cmd
+    
+    def _build_video_graph(self, scenes: List[Dict[str, Any]], inputs: List[List[str]],
+                           filters: List[str]) -> str:
+        """Compose each scene (background, characters, text) and concatenate them"""
+        
+        scene_labels = []
+        
+        for i, scene in enumerate(scenes):
+            duration = f"{float(scene.get('duration_seconds', 30)):.3f}"
+            background_path = scene.get("background_path")
+            
+            if background_path and os.path.exists(background_path):
+                index = self._add_input(inputs, self._still_image_args(background_path, duration))
+                filters.append(
+                    f"[{index}:v]scale={self.width}:{self.height}:force_original_aspect_ratio=increase,"
+                    f"crop={self.width}:{self.height},setsar=1,fps={self.framerate},format=yuv420p[bg{i}]"
+                )
+            else:
+                color = scene.get("background_color", "0x4ECDC4").replace("#", "0x")
+                index = self._add_input(inputs, [
+                    '-f', 'lavfi', '-t', duration,
+                    '-i', f"color=c={color}:s={self.width}x{self.height}:r={self.framerate}"
+                ])
+                filters.append(f"[{index}:v]setsar=1,format=yuv420p[bg{i}]")
+            
+            current = f"bg{i}"
+            
+            characters = [character for character in scene.get("character_assets", [])
+                          if character.get("file_path") and os.path.exists(character["file_path"])]
+            character_height = int(self.height * 0.6)
+            for j, character in enumerate(characters):
+                index = self._add_input(inputs, self._still_image_args(character["file_path"], duration))
+                filters.append(f"[{index}:v]scale=-2:{character_height}[c{i}_{j}]")
+                # Spread characters evenly across the lower part of the frame
+                x = f"W*{j + 1}/{len(characters) + 1}-w/2"
+                y = f"H-h-{int(self.height * 0.05)}"
+                filters.append(f"[{current}][c{i}_{j}]overlay=x={x}:y={y}:shortest=1[o{i}_{j}]")
+                current = f"o{i}_{j}"
+            
+            # Builds without libfreetype have no drawtext; render the scene without captions
+            text_overlays = scene.get("text_overlays", []) if self.capabilities.has_filter("drawtext") else []
+            for k, overlay in enumerate(text_overlays):
+                filters.append(f"[{current}]{self._drawtext_filter(overlay)}[t{i}_{k}]")
+                current = f"t{i}_{k}"
+            
+            scene_labels.append(current)
+        
+        if not scene_labels:
+            index = self._add_input(inputs, [
+                '-f', 'lavfi', '-i', f"color=c=black:s={self.width}x{self.height}:r={self.framerate}"
+            ])
+            filters.append(f"[{index}:v]format=yuv420p[vout]")
+            return "vout"
+        
+        filters.append(
+            "".join(f"[{label}]" for label in scene_labels) +
+            f"concat=n={len(scene_labels)}:v=1:a=0[vout]"
+        )
+        return "vout"
+    
+    def _add_audio_input(self, audio_path: Optional[str], inputs: List[List[str]]) -> str:
+        """Add the soundtrack and return its -map specifier
+        
+        The track arrives fully mixed (looped beds, envelopes, narration), so
+        ffmpeg only encodes it; only a plan without one gets a silent track.
+        A soundtrack that was passed but has gone missing is an error rather
+        than a reason to publish a muted video.
+        """
+        
+        if audio_path:
+            if not os.path.exists(audio_path):
+                raise FileNotFoundError(f"Soundtrack not found: {audio_path}")
+            index = self._add_input(inputs, ['-i', audio_path])
+        else:
+            index = self._add_input(inputs, ['-f', 'lavfi', '-i', f"anullsrc=r={self.sample_rate}:cl=stereo"])
+        return f"{index}:a"
+    
+    def _get_encoder_args(self) -> List[str]:
+        """Output encoding arguments from the rendering settings"""
+        
+        return self._get_video_encoder_args() + self._get_audio_encoder_args() + ['-movflags', '+faststart']
+    
+    def _get_video_encoder_args(self) -> List[str]:
+        """Video encoding arguments; identical for every segment of a render"""
+        
+        settings = self.rendering_settings
+        encoder = self.get_video_encoder()
+        
+        return [
+            '-c:v', encoder,
+            *self.capabilities.get_preset_args(encoder, settings.get("preset", "medium")),
+            '-b:v', settings.get("bitrate", "5000k"),
+            '-r', str(self.framerate),
+            '-pix_fmt', settings.get("pixel_format", "yuv420p"),
+            '-video_track_timescale', str(self.framerate * 512)
+        ]
+    
+    def get_video_encoder(self) -> str:
+        """Configured encoder, or the fastest working one for the codec when set to auto"""
+        
+        settings = self.rendering_settings
+        codec = settings.get("codec", "H.264")
+        encoder = settings.get("encoder") or "auto"
+        
+        if encoder == "auto":
+            encoder = self.capabilities.select_video_encoder(codec) or CODEC_ENCODERS.get(codec, "libx264")
+        
+        return encoder
+    
+    def _get_audio_encoder_args(self) -> List[str]:
+        """Audio encoding arguments"""
+        
+        return ['-c:a', 'aac', '-b:a', self.rendering_settings.get("audio_bitrate", "320k")]
+    
+    def _still_image_args(self, file_path: str, duration: str) -> List[str]:
+        """Input arguments that turn a still image into a clip of the given length"""
+        
+        return ['-loop', '1', '-framerate', str(self.framerate), '-t', duration, '-i', file_path]
+    
+    def _drawtext_filter(self, overlay: Dict[str, Any]) -> str:
+        """Build a drawtext filter for a text overlay"""
+        
+        positions = {
+            "top": "y=h*0.08",
+            "center": "y=(h-text_h)/2",
+            "bottom": "y=h-text_h-h*0.08"
+        }
+        position = positions.get(overlay.get("position", "bottom"), positions["bottom"])
+        font_size = int(str(overlay.get("font_size", "72")).rstrip("px"))
+        
+        return (
+            f"drawtext=expansion=none:text={self._escape_text(overlay.get('text', '').strip())}"
+            f":fontcolor={overlay.get('color', '#FFFFFF').replace('#', '0x')}"
+            f":fontsize={font_size}"
+            f":borderw=3:bordercolor=black"
+            f":x=(w-text_w)/2:{position}"
+        )
+    
+    def _escape_text(self, text: str) -> str:
+        """Escape text for a filter option value, then again for the filtergraph"""
+        
+        for character in ['\\', "'", ':']:
+            text = text.replace(character, f'\\{character}')
+        for character in ['\\', "'", '[', ']', ',', ';']:
+            text = text.replace(character, f'\\{character}')
+        return text
+    
+    def _add_input(self, inputs: List[List[str]], input_args: List[str]) -> int:
+        """Register an input and return its ffmpeg input index"""
+        
+        inputs.append(input_args)
+        return len(inputs) - 1
+
+
+class SegmentedRenderer:
+    """Renders scenes as cached segments in parallel and joins them by stream copy"""
+    
+    def __init__(self, rendering_settings: Dict[str, Any], segment_dir: str,
+                 max_workers: Optional[int] = None, ffmpeg_path: str = "ffmpeg",
+                 job_runner: Optional[FFmpegJobRunner] = None,
+                 capabilities: Optional[FFmpegCapabilityRegistry] = None,
+                 max_total_bytes: int = DEFAULT_SEGMENT_CACHE_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_SEGMENT_MAX_AGE_SECONDS):
+        self.rendering_settings = rendering_settings
+        self.segment_dir = segment_dir
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_seconds
+        self.ffmpeg_path = ffmpeg_path
+        self.renderer = FilterGraphRenderer(rendering_settings, ffmpeg_path, job_runner, capabilities)
+        self.job_runner = self.renderer.job_runner
+        # Each segment encode is its own ffmpeg process; the runner bounds how many run at once
+        self.max_workers = max_workers
+        os.makedirs(self.segment_dir, exist_ok=True)
+    
+    def get_plan_duration(self, assembly_plan: Dict[str, Any]) -> float:
+        """Total video length: the sum of scene durations"""
+        
+        return self.renderer.get_plan_duration(assembly_plan)
+    
+    def render(self, assembly_plan: Dict[str, Any], output_path: str,
+               audio_path: Optional[str] = None) -> Dict[str, Any]:
+        """Render changed scenes, reuse cached ones, then mux the final video with the mixed audio"""
+        
+        started = time.perf_counter()
+        scenes = assembly_plan.get("scenes", [])
+        duration_seconds = self.renderer.get_plan_duration(assembly_plan)
+        timeout_seconds = self.rendering_settings.get("render_timeout_seconds")
+        
+        segment_paths = [
+            os.path.join(self.segment_dir, f"{self.get_segment_key(scene)}.mp4") for scene in scenes
+        ]
+        pending = {
+            path: scene for path, scene in zip(segment_paths, scenes) if not os.path.exists(path)
+        }
+        # Reused segments count as recently used even where atime is not updated
+        for path in segment_paths:
+            if path not in pending:
+                self._touch(path)
+        
+        segment_errors = []
+        # The runner's limit can change at runtime, so it is read per render
+        runner_workers = self.job_runner.max_workers
+        workers = min(self.max_workers or runner_workers, runner_workers, len(pending))
+        if pending:
+            # Split the cores between concurrent encodes instead of oversubscribing
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            
+            job_ids = {}
+            partial_paths = {}
+            for path, scene in pending.items():
+                # Unique per encode, so concurrent renders of the same scene never share a file
+                handle, partial_path = tempfile.mkstemp(
+                    prefix=f"{os.path.splitext(os.path.basename(path))[0]}.",
+                    suffix=".partial.mp4", dir=self.segment_dir
+                )
+                os.close(handle)
+                partial_paths[path] = partial_path
+                cmd = self.renderer.build_command(
+                    {"scenes": [scene]}, partial_path, include_audio=False, threads=threads
+                )
+                job_ids[path] = self.job_runner.submit(
+                    cmd,
+                    duration_seconds=float(scene.get("duration_seconds", 30)),
+                    timeout_seconds=timeout_seconds,
+                    label=f"segment {os.path.basename(path)}",
+                    awaited=True
+                )
+            
+            for path, job_id in job_ids.items():
+                job = self.job_runner.wait(job_id)
+                partial_path = partial_paths[path]
+                if job.status == "completed":
+                    # Only complete segments ever appear under their cache name
+                    os.replace(partial_path, path)
+                else:
+                    segment_errors.append(job.error)
+                    if os.path.exists(partial_path):
+                        os.remove(partial_path)
+        segments_seconds = time.perf_counter() - started
+        
+        success = not segment_errors and bool(scenes)
+        error = segment_errors[0] if segment_errors else (None if scenes else "Assembly plan has no scenes")
+        mux_job_id = None
+        
+        if success:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', suffix='.txt', dir=self.segment_dir, delete=False) as concat_file:
+                for path in segment_paths:
+                    concat_file.write(f"file '{os.path.abspath(path)}'\n")
+                concat_list_path = concat_file.name
+            
+            try:
+                cmd = self.renderer.build_mux_command(assembly_plan, concat_list_path, output_path, audio_path)
+                job = self.job_runner.run(
+                    cmd,
+                    duration_seconds=duration_seconds,
+                    timeout_seconds=timeout_seconds,
+                    label=f"mux {os.path.basename(output_path)}"
+                )
+                mux_job_id = job.job_id
+                success = job.status == "completed"
+                error = job.error
+            finally:
+                os.remove(concat_list_path)
+        
+        segments_pruned = self.prune(self.max_total_bytes, self.max_age_seconds, keep=segment_paths)
+        render_seconds = time.perf_counter() - started
+        rendered_minutes = duration_seconds / 60.0
+        
+        return {
+            "success": success,
+            "output_path": output_path,
+            "duration_seconds": duration_seconds,
+            "render_seconds": render_seconds,
+            "segment_render_seconds": segments_seconds,
+            "seconds_per_rendered_minute": render_seconds / rendered_minutes if rendered_minutes else None,
+            "scene_count": len(scenes),
+            "segments_rendered": len(pending),
+            "segments_cached": sum(1 for path in segment_paths if path not in pending),
+            "segments_pruned": segments_pruned,
+            "workers": workers,
+            "encoder": self.renderer.get_video_encoder(),
+            "job_id": mux_job_id,
+            "error": error
+        }
+    
+    def prune(self, max_total_bytes: int, max_age_seconds: Optional[float] = None,
+              keep: Optional[List[str]] = None) -> int:
+        """Remove expired and least recently used segments (other than keep) until the cache fits in max_total_bytes"""
+        
+        keep_paths = set(keep or [])
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in os.listdir(self.segment_dir):
+            path = os.path.join(self.segment_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            last_used = max(stat.st_atime, stat.st_mtime)
+            if name.endswith(".partial.mp4"):
+                # In-flight encodes are left alone; only leftovers of a crashed render expire
+                if max_age_seconds is not None and now - last_used > max_age_seconds:
+                    removed += self._remove(path)
+                continue
+            if not name.endswith(".mp4"):
+                continue
+            if path not in keep_paths and max_age_seconds is not None and now - last_used > max_age_seconds:
+                removed += self._remove(path)
+                continue
+            entries.append((last_used, stat.st_size, path))
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= max_total_bytes:
+                break
+            if path in keep_paths:
+                continue
+            removed += self._remove(path)
+            total_bytes -= size
+        
+        return removed
+    
+    def _touch(self, path: str):
+        """Mark a cached segment as used"""
+        
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+    
+    def _remove(self, path: str) -> int:
+        """Delete one cache file, tolerating a concurrent prune"""
+        
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+    
+    def get_segment_key(self, scene: Dict[str, Any]) -> str:
+        """Hash everything that affects a segment's pixels"""
+        
+        referenced_files = [scene.get("background_path")] + [
+            character.get("file_path") for character in scene.get("character_assets", [])
+        ]
+        file_identities = []
+        for path in referenced_files:
+            if path and os.path.exists(path):
+                stat = os.stat(path)
+                file_identities.append([path, stat.st_size, stat.st_mtime_ns])
+        
+        key_data = json.dumps({
+            "scene": {key: value for key, value in scene.items() if key != "scene_number"},
+            "files": file_identities,
+            "encoder": self.renderer._get_video_encoder_args(),
+            "resolution": [self.renderer.width, self.renderer.height]
+        }, sort_keys=True, default=str)
+        
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()[:32]
@@ -13,7 +13,7 @@ from datetime import datetime
 import hashlib
 
 from src.services.media_generation_service import MediaGenerationService
-from src.models.media_generator import VisualStyle, AudioStyle
+from src.models.media_generator import VisualStyle, AudioStyle, VisualAsset, AudioAsset
 
 @dataclass
 class VideoScene:
@@ -41,11 +41,11 @@ class VideoProject:
 class VideoGenerationService:
     """Service for creating complete educational videos"""
     
-    def __init__(self, assets_dir: Optional[str] = None):
+    def __init__(self, assets_dir: Optional[str] = None, media_service: Optional[MediaGenerationService] = None):
         if assets_dir is None:
             assets_dir = os.path.join(os.getcwd(), "generated-assets")
         self.assets_dir = assets_dir
-        self.media_service = MediaGenerationService(assets_dir)
+        self.media_service = media_service or MediaGenerationService(assets_dir)
         self.video_output_dir = os.path.join(self.assets_dir, "videos")
         self.temp_dir = os.path.join(self.assets_dir, "temp")
         
@@ -81,3 +81,271 @@ class VideoGenerationService:
                 "role": "music_guide"
             }
         }
+
+    def get_render_profiles(self) -> Dict[str, Dict[str, Any]]:
+        """Available render profiles (draft, preview, final)"""
+        return self.media_service.video_assembler.render_profiles
+    
+    def create_educational_video(self, content_data: Dict[str, Any], render_profile: str = "final") -> VideoProject:
+        """Generate assets for the content and render them with a render profile"""
+        
+        if render_profile not in self.get_render_profiles():
+            raise ValueError(f"Unknown render profile: {render_profile}")
+        
+        script_data = self.build_script_data(content_data)
+        
+        visual_assets = self.generate_character_assets(script_data) + self.generate_background_assets(script_data)
+        audio_assets = [self.generate_music_asset(script_data)]
+        narration_asset = self.generate_narration_asset(script_data)
+        if narration_asset is not None:
+            audio_assets.append(narration_asset)
+        
+        return self.render_project(
+            self.get_project_id(content_data), script_data, visual_assets, audio_assets, render_profile
+        )
+    
+    def get_project_id(self, content_data: Dict[str, Any]) -> str:
+        """Stable project ID derived from the content"""
+        
+        content_hash = hashlib.sha256(json.dumps(content_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return f"project_{content_hash[:12]}"
+    
+    def generate_character_assets(self, script_data: Dict[str, Any]) -> List[VisualAsset]:
+        """Character images for every character in the script"""
+        
+        return [
+            self.media_service.generate_character_image(name, self.visual_style, script_data["age_group"])
+            for name in script_data["character_list"]
+        ]
+    
+    def generate_background_assets(self, script_data: Dict[str, Any]) -> List[VisualAsset]:
+        """One background image per scene"""
+        
+        return [
+            self.media_service.generate_background_image(
+                scene_description=scene.get("description", script_data["title"]),
+                style=self.visual_style,
+                content_type=script_data["content_type"]
+            )
+            for scene in script_data["scene_descriptions"]
+        ]
+    
+    def generate_music_asset(self, script_data: Dict[str, Any]) -> AudioAsset:
+        """Background music bed for the script"""
+        
+        return self.media_service.generate_background_music(
+            content_type=script_data["content_type"],
+            age_group=script_data["age_group"],
+            duration_minutes=script_data["duration_minutes"],
+            style=self.audio_style
+        )
+    
+    def generate_narration_asset(self, script_data: Dict[str, Any]) -> Optional[AudioAsset]:
+        """Voice narration of the script text, if there is any"""
+        
+        if not script_data.get("script_text"):
+            return None
+        
+        return self.media_service.generate_voice_narration(
+            script_text=script_data["script_text"],
+            character_name=script_data["character_list"][0],
+            age_group=script_data["age_group"]
+        )
+    
+    def render_project(self, project_id: str, script_data: Dict[str, Any], visual_assets: List[VisualAsset],
+                       audio_assets: List[AudioAsset], render_profile: str = "final") -> VideoProject:
+        """Assemble and render generated assets, then save the project record"""
+        
+        age_group = script_data["age_group"]
+        video_metadata = self.media_service.video_assembler.assemble_video(
+            script_data, visual_assets, audio_assets, render_profile=render_profile
+        )
+        
+        # The project ID comes from the content alone, so a draft and a later final
+        # render of the same content share one record and keep each other's renders
+        project_record = self._load_project_record(project_id) or {
+            "project_id": project_id,
+            "renders": {},
+            "metadata": {"created_at": datetime.now().isoformat()}
+        }
+        project_record.update({
+            "title": script_data["title"],
+            "content_type": script_data["content_type"],
+            "age_group": age_group,
+            "video_name": video_metadata["video_name"],
+            "assembly_plan": video_metadata["assembly_plan"]
+        })
+        project_record["metadata"].update({
+            "characters_used": script_data["character_list"],
+            "visual_style": self.visual_style.value,
+            "audio_style": self.audio_style.value
+        })
+        project_record["renders"][render_profile] = video_metadata["render"]
+        
+        # As with promote_video, a failed render doesn't replace a working one
+        if video_metadata["rendered"] or "output_path" not in project_record:
+            project_record["output_path"] = video_metadata["file_path"]
+            project_record["render_profile"] = render_profile
+            project_record["total_duration"] = video_metadata["duration_seconds"]
+            project_record["metadata"]["render_profile"] = render_profile
+        self._save_project_record(project_record)
+        self._catalog_render(project_id, video_metadata["file_path"], render_profile)
+        self.media_service.asset_catalog.add_project_references(
+            project_id, [asset.asset_id for asset in visual_assets + audio_assets]
+        )
+        
+        return self._build_video_project(project_record)
+    
+    def promote_video(self, project_id: str, render_profile: str = "final") -> Optional[VideoProject]:
+        """Re-render a project's saved assembly plan with another profile, reusing its assets"""
+        
+        project_record = self._load_project_record(project_id)
+        if project_record is None:
+            return None
+        
+        video_assembler = self.media_service.video_assembler
+        output_path = video_assembler.get_video_path(project_record["video_name"], render_profile)
+        
+        render_result = video_assembler.render_plan(project_record["assembly_plan"], output_path, render_profile)
+        
+        project_record["renders"][render_profile] = render_result
+        if render_result["success"]:
+            project_record["output_path"] = output_path
+            project_record["render_profile"] = render_profile
+            project_record["total_duration"] = render_result["duration_seconds"]
+            project_record["metadata"]["render_profile"] = render_profile
+        self._save_project_record(project_record)
+        self._catalog_render(project_id, output_path, render_profile)
+        
+        return self._build_video_project(project_record)
+    
+    def get_video_info(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Get information about a video project and its rendered file"""
+        
+        project_record = self._load_project_record(project_id)
+        if project_record is None:
+            return None
+        
+        file_path = project_record["output_path"]
+        exists = os.path.exists(file_path)
+        # Renders are cataloged with their content hash, so downloads never hash the video themselves
+        catalog_entry = self.media_service.asset_catalog.get(self._video_asset_id(file_path)) if exists else None
+        
+        return {
+            "project_id": project_id,
+            "title": project_record["title"],
+            "file_path": file_path,
+            "exists": exists,
+            "file_size_bytes": os.path.getsize(file_path) if exists else 0,
+            "content_hash": (catalog_entry["content_hash"] if catalog_entry and catalog_entry["exists"]
+                             and catalog_entry["file_path"] == file_path else None),
+            "duration_seconds": project_record["total_duration"],
+            "render_profile": project_record["render_profile"],
+            "renders": project_record["renders"],
+            "metadata": project_record["metadata"]
+        }
+    
+    def cleanup_temp_files(self):
+        """Remove temporary render files"""
+        
+        for name in os.listdir(self.temp_dir):
+            path = os.path.join(self.temp_dir, name)
+            if os.path.isfile(path):
+                os.remove(path)
+    
+    def build_script_data(self, content_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize content data into the script format the assembler expects"""
+        
+        script_data = dict(content_data)
+        duration_minutes = script_data.get("duration_minutes", 5)
+        
+        script_data.setdefault("title", f"Learning About {str(script_data.get('topic', 'Learning')).title()}")
+        script_data["duration_minutes"] = duration_minutes
+        script_data["character_list"] = script_data.get("character_list") or ["Luna", "Sunny"]
+        script_data["scene_descriptions"] = script_data.get("scene_descriptions") or [{
+            "description": script_data["title"],
+            "duration_seconds": duration_minutes * 60
+        }]
+        
+        if not script_data.get("audio_cues"):
+            total_seconds = sum(scene.get("duration_seconds", 30) for scene in script_data["scene_descriptions"])
+            script_data["audio_cues"] = [{
+                "type": "music",
+                "name": "learning_background",
+                "start_time": 0,
+                "duration": total_seconds,
+                "volume": 0.3,
+                "fade_in": True,
+                "fade_out": True,
+                "loop": True
+            }]
+        
+        return script_data
+    
+    def _build_video_project(self, project_record: Dict[str, Any]) -> VideoProject:
+        """Build a VideoProject from a saved project record"""
+        
+        scenes = [
+            VideoScene(
+                scene_id=f"{project_record['project_id']}_scene_{scene['scene_number']}",
+                duration_seconds=scene["duration_seconds"],
+                background_image=scene.get("background_path") or "",
+                characters=scene.get("character_assets", []),
+                educational_objects=[],
+                text_overlays=scene.get("text_overlays", []),
+                audio_narration="",
+                scene_description=scene.get("background", "")
+            )
+            for scene in project_record["assembly_plan"].get("scenes", [])
+        ]
+        music = [entry.get("source_path", "") for entry in project_record["assembly_plan"].get("audio_timeline", [])
+                 if entry.get("audio_type") == "music" and entry.get("loop")]
+        
+        return VideoProject(
+            project_id=project_record["project_id"],
+            title=project_record["title"],
+            content_type=project_record["content_type"],
+            age_group=project_record["age_group"],
+            total_duration=project_record["total_duration"],
+            scenes=scenes,
+            background_music=music[0] if music else "",
+            output_path=project_record["output_path"],
+            metadata=project_record["metadata"]
+        )
+    
+    def _catalog_render(self, project_id: str, file_path: str, render_profile: str):
+        """Catalog a rendered video file (if the render produced one) as an asset of its project"""
+        
+        video_asset_id = self._video_asset_id(file_path)
+        entry = self.media_service.asset_catalog.record_asset(
+            video_asset_id, "video", file_path, style=self.visual_style.value,
+            metadata={"render_profile": render_profile}
+        )
+        if entry is not None:
+            self.media_service.asset_catalog.add_project_references(project_id, [video_asset_id])
+    
+    def _video_asset_id(self, file_path: str) -> str:
+        return os.path.splitext(os.path.basename(file_path))[0]
+    
+    def _get_project_record_path(self, project_id: str) -> str:
+        """Location of a project's saved record"""
+        return os.path.join(self.video_output_dir, f"{os.path.basename(project_id)}.json")
+    
+    def _save_project_record(self, project_record: Dict[str, Any]):
+        """Persist a project record, including its assembly plan for later re-renders"""
+        
+        record_path = self._get_project_record_path(project_record["project_id"])
+        temp_path = f"{record_path}.partial"
+        with open(temp_path, "w") as record_file:
+            json.dump(project_record, record_file, indent=2, default=str)
+        os.replace(temp_path, record_path)
+    
+    def _load_project_record(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Load a project's saved record"""
+        
+        record_path = self._get_project_record_path(project_id)
+        if not os.path.exists(record_path):
+            return None
+        
+        with open(record_path) as record_file:
+            return json.load(record_file)
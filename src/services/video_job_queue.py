@@ -0,0 +1,1082 @@
+"""
+Video Job Queue
+Durable SQLite-backed queue for video generation jobs, processed by leased workers on one or more nodes
+"""
+
+import os
+import json
+import math
+import sqlite3
+import socket
+import time
+import uuid
+import multiprocessing
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from src.services.job_scheduler import PRIORITY_CLASSES, ScheduleItem, DurationEstimator, DeadlineScheduler
+from src.services.metrics_registry import get_metrics_registry
+from src.services.tracing import trace_span, start_trace, current_trace_id
+from src.utils.logger import get_logger, configure_logging, get_worker_log_queue
+
+logger = get_logger("video_jobs")
+
+JOB_STATUSES = ["queued", "running", "completed", "failed", "cancelled"]
+JOB_TYPES = ["generate", "autonomous", "pipeline", "promote"]
+
+# Admission limits; stored in the queue database so every process on every node enforces the
+# same values. max_concurrent_generations applies per worker node.
+# The slot settings describe the publishing schedule that best-effort work must not endanger:
+# one slot every slot_interval_minutes, its job arriving scheduled_lead_minutes ahead.
+# A claimed job is leased for job_lease_seconds and kept alive by worker heartbeats; a job whose
+# lease lapses goes back to the queue, up to max_job_attempts claims.
+DEFAULT_LIMITS = {
+    "max_concurrent_generations": 2,
+    "max_queue_size": 10,
+    "slot_interval_minutes": 60,
+    "scheduled_lead_minutes": 60,
+    "max_defer_minutes": 120,
+    "job_lease_seconds": 60,
+    "max_job_attempts": 3
+}
+
+# Recent stage timings kept per stage for duration estimates
+STAGE_TIMING_HISTORY = 50
+
+# Workers heartbeat this many times per lease, so a missed beat or two doesn't lose the job
+HEARTBEAT_FRACTION = 3
+
+class AdmissionRejected(Exception):
+    """Generation work refused because the queue or the concurrency limit is full"""
+    
+    def __init__(self, message: str, retry_after_seconds: int):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+class VideoJobQueue:
+    """Persistent job queue shared by the API process and its workers"""
+    
+    def __init__(self, db_path: Optional[str] = None, journal_mode: Optional[str] = None):
+        # VIDEO_JOB_DB points the API process and standalone worker nodes at one shared database
+        self.db_path = (db_path or os.environ.get("VIDEO_JOB_DB")
+                        or os.path.join(os.getcwd(), "generated-assets", "jobs", "video_jobs.db"))
+        # WAL needs shared memory, which network filesystems don't provide; nodes sharing the
+        # database over NFS/SMB should use DELETE
+        self.journal_mode = journal_mode or os.environ.get("VIDEO_JOB_DB_JOURNAL_MODE", "WAL")
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        # When this process last wrote each node's worker_nodes row
+        self._node_touched_at: Dict[str, float] = {}
+        self._create_schema()
+    
+    @trace_span("enqueue_job", category="queue")
+    def submit(self, job_type: str, payload: Dict[str, Any], priority: str = "interactive",
+               deadline: Optional[float] = None) -> str:
+        """Persist a new job and return its ID, or raise AdmissionRejected
+        
+        Jobs are refused when the queue is full, and best-effort jobs are deferred
+        (or refused) when running them now would make deadline work late.
+        """
+        
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if priority == "scheduled" and deadline is None:
+            raise ValueError("Scheduled jobs need a deadline")
+        
+        job_id = f"job_{uuid.uuid4().hex[:16]}"
+        now = time.time()
+        with self._connect() as connection:
+            # Count and insert under one write lock so concurrent submitters can't overfill the queue
+            connection.execute("BEGIN IMMEDIATE")
+            limits = self._read_limits(connection)
+            queued = self._count(connection, "queued")
+            if queued >= limits["max_queue_size"]:
+                retry_after_seconds = self._estimate_retry_after(connection, queued, limits)
+                connection.execute("ROLLBACK")
+                raise AdmissionRejected(
+                    f"Generation queue is full ({queued}/{limits['max_queue_size']} jobs waiting)",
+                    retry_after_seconds
+                )
+            
+            scheduler = self._build_scheduler(connection, limits)
+            candidate = ScheduleItem(
+                item_id=job_id,
+                priority=priority,
+                deadline=deadline,
+                estimated_seconds=scheduler.estimator.estimate(job_type, payload),
+                available_at=now,
+                order=now
+            )
+            running_free_at, queued_items = self._load_schedule_state(connection, now)
+            decision = scheduler.plan(candidate, running_free_at, queued_items, now)
+            if decision["action"] == "reject":
+                connection.execute("ROLLBACK")
+                raise AdmissionRejected(
+                    "Best-effort work would delay scheduled videos past their publishing slots",
+                    decision["retry_after_seconds"]
+                )
+            
+            # The worker continues the submitting request's trace
+            connection.execute(
+                "INSERT INTO video_jobs (job_id, job_type, status, payload, created_at, priority, deadline, "
+                "estimated_seconds, not_before, trace_id) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(payload), now, priority, deadline,
+                 candidate.estimated_seconds, decision["not_before"], current_trace_id())
+            )
+            connection.execute("COMMIT")
+        
+        return job_id
+    
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically lease the most urgent runnable job to a worker
+        
+        Deadline jobs go first, earliest deadline first, then interactive and then
+        best-effort jobs in submission order. A best-effort job is skipped while
+        starting it would make deadline work (or an upcoming publishing slot) late.
+        The worker must heartbeat() the job before its lease runs out.
+        """
+        
+        now = time.time()
+        hostname = worker_id.rpartition(":")[0]
+        with self._connect() as connection:
+            # Idle polls are read-only; the write lock is only taken when there is something to write
+            limits = self._read_limits(connection)
+            if not self._touch_due(hostname, now, limits) and not self._has_claim_work(connection, hostname, now, limits):
+                return None
+            
+            # IMMEDIATE takes the write lock up front so two workers can't claim the same row
+            connection.execute("BEGIN IMMEDIATE")
+            limits = self._read_limits(connection)
+            self._touch_node(connection, hostname, now, limits)
+            self._requeue_expired_leases(connection, now, limits)
+            # This node's running jobs and synchronous generation slots share its concurrency limit
+            active = self._count_node_running(connection, hostname) + self._count_slots(connection, hostname)
+            if active >= limits["max_concurrent_generations"]:
+                connection.execute("COMMIT")
+                return None
+            
+            running_free_at, queued_items = self._load_schedule_state(connection, now)
+            scheduler = self._build_scheduler(connection, limits)
+            job_id = None
+            for item in sorted(queued_items, key=ScheduleItem.sort_key):
+                if item.available_at > now:
+                    continue
+                if scheduler.can_start_now(item, running_free_at, queued_items, now):
+                    job_id = item.item_id
+                    break
+            
+            if job_id is None:
+                connection.execute("COMMIT")
+                return None
+            
+            connection.execute(
+                "UPDATE video_jobs SET status = 'running', worker_id = ?, started_at = ?, "
+                "lease_expires_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+                (worker_id, now, now + limits["job_lease_seconds"], job_id)
+            )
+            connection.execute("COMMIT")
+        
+        return self.get_job(job_id)
+    
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a worker's lease on a job; False if the lease was lost to another worker"""
+        
+        now = time.time()
+        with self._connect() as connection:
+            limits = self._read_limits(connection)
+            cursor = connection.execute(
+                "UPDATE video_jobs SET lease_expires_at = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (now + limits["job_lease_seconds"], job_id, worker_id)
+            )
+            self._touch_node(connection, worker_id.rpartition(":")[0], now, limits)
+        
+        return cursor.rowcount == 1
+    
+    def complete(self, job_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        """Record a job's result; with a worker_id, only while that worker still holds the lease"""
+        
+        return self._finish(job_id, "completed", result=result, worker_id=worker_id)
+    
+    def fail(self, job_id: str, error: str, worker_id: Optional[str] = None) -> bool:
+        """Record a job failure; with a worker_id, only while that worker still holds the lease"""
+        
+        return self._finish(job_id, "failed", error=error, worker_id=worker_id)
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that no worker has started yet"""
+        
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE video_jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+        
+        return cursor.rowcount == 1
+    
+    @contextmanager
+    def generation_slot(self, label: str, priority: str = "best_effort",
+                        estimate_payload: Optional[Dict[str, Any]] = None):
+        """Hold one concurrency slot for synchronous generation work in a request
+        
+        Synchronous work can't wait in the queue, so best-effort slots are refused
+        outright when they would make deadline work late.
+        """
+        
+        slot_id = uuid.uuid4().hex[:16]
+        now = time.time()
+        
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self._release_orphaned_slots(connection)
+            limits = self._read_limits(connection)
+            hostname = socket.gethostname()
+            active = self._count_node_running(connection, hostname) + self._count_slots(connection, hostname)
+            if active >= limits["max_concurrent_generations"]:
+                retry_after_seconds = self._estimate_retry_after(connection, 0, limits)
+                connection.execute("ROLLBACK")
+                raise AdmissionRejected(
+                    f"All {limits['max_concurrent_generations']} generation slots are busy",
+                    retry_after_seconds
+                )
+            
+            scheduler = self._build_scheduler(connection, limits)
+            estimated_seconds = scheduler.estimator.estimate("generate", estimate_payload or {})
+            slot_item = ScheduleItem(slot_id, priority, None, estimated_seconds, now, now)
+            running_free_at, queued_items = self._load_schedule_state(connection, now)
+            if not scheduler.can_start_now(slot_item, running_free_at, queued_items, now):
+                decision = scheduler.plan(slot_item, running_free_at, queued_items, now)
+                connection.execute("ROLLBACK")
+                raise AdmissionRejected(
+                    f"{label} would delay scheduled videos past their publishing slots",
+                    decision["retry_after_seconds"] or self._estimate_retry_after(connection, 0, limits)
+                )
+            
+            connection.execute(
+                "INSERT INTO generation_slots (slot_id, holder, label, acquired_at, estimated_seconds) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (slot_id, f"{hostname}:{os.getpid()}", label, now, estimated_seconds)
+            )
+            connection.execute("COMMIT")
+        
+        try:
+            yield slot_id
+        finally:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM generation_slots WHERE slot_id = ?", (slot_id,))
+    
+    def get_limits(self) -> Dict[str, int]:
+        """Current admission limits"""
+        
+        with self._connect() as connection:
+            return self._read_limits(connection)
+    
+    def set_limits(self, limits: Dict[str, Any]) -> Dict[str, int]:
+        """Change admission limits at runtime; takes effect for every process immediately"""
+        
+        self.validate_limits(limits)
+        
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO queue_settings (name, value) VALUES (?, ?)", list(limits.items())
+            )
+            return self._read_limits(connection)
+    
+    def validate_limits(self, limits: Dict[str, Any]):
+        """Raise ValueError if any limit is unknown or out of range"""
+        
+        for name, value in limits.items():
+            if name not in DEFAULT_LIMITS:
+                raise ValueError(f"Unknown limit: {name}")
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError(f"{name} must be a positive integer")
+        if limits.get("job_lease_seconds", HEARTBEAT_FRACTION) < HEARTBEAT_FRACTION:
+            raise ValueError(f"job_lease_seconds must be at least {HEARTBEAT_FRACTION}")
+    
+    def record_stage_timings(self, run_record: Dict[str, Any]):
+        """Keep the stage durations of a pipeline run for future estimates; cache hits are skipped"""
+        
+        run_input = run_record.get("run_input") or {}
+        script = (run_record.get("outputs") or {}).get("script") or {}
+        video_minutes = script.get("duration_minutes") or run_input.get("duration_minutes")
+        rows = [
+            (stage, run_input.get("render_profile", "final"), stage_record["seconds"], video_minutes, time.time())
+            for stage, stage_record in run_record.get("stages", {}).items()
+            if stage_record.get("status") == "completed" and not stage_record.get("cache_hit")
+            and stage_record.get("seconds") is not None
+        ]
+        
+        if not rows:
+            return
+        
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO stage_timings (stage, render_profile, seconds, video_minutes, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            # Only the newest STAGE_TIMING_HISTORY rows per stage and profile feed estimates; drop the rest
+            for stage, render_profile in {(row[0], row[1]) for row in rows}:
+                connection.execute(
+                    "DELETE FROM stage_timings WHERE stage = ? AND render_profile IS ? AND rowid NOT IN ("
+                    "SELECT rowid FROM stage_timings WHERE stage = ? AND render_profile IS ? "
+                    "ORDER BY recorded_at DESC LIMIT ?)",
+                    (stage, render_profile, stage, render_profile, STAGE_TIMING_HISTORY)
+                )
+            connection.execute("COMMIT")
+    
+    def get_schedule_forecast(self) -> Dict[str, Any]:
+        """Expected start and finish of every queued job, and which deadlines are at risk"""
+        
+        now = time.time()
+        with self._connect() as connection:
+            limits = self._read_limits(connection)
+            scheduler = self._build_scheduler(connection, limits)
+            running_free_at, queued_items = self._load_schedule_state(connection, now)
+        
+        forecast = scheduler.forecast(running_free_at, queued_items, now)
+        schedule = forecast["schedule"]
+        
+        def timestamp(value):
+            return datetime.fromtimestamp(value).isoformat()
+        
+        return {
+            "jobs": {
+                item.item_id: {
+                    "priority": item.priority,
+                    "estimated_seconds": item.estimated_seconds,
+                    "estimated_start": timestamp(schedule[item.item_id][0]),
+                    "estimated_finish": timestamp(schedule[item.item_id][1])
+                }
+                for item in queued_items
+            },
+            "reserved_slots": [timestamp(item.deadline) for item in forecast["reservations"]],
+            "deadlines_at_risk": forecast["misses"],
+            "generated_at": timestamp(now)
+        }
+    
+    def requeue_orphaned(self, hostname: Optional[str] = None) -> int:
+        """Put back running jobs whose worker process on this host has died
+        
+        Lease expiry recovers jobs from any node; this just skips the wait for local crashes.
+        """
+        
+        hostname = hostname or socket.gethostname()
+        requeued = 0
+        
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT job_id, worker_id FROM video_jobs WHERE status = 'running'"
+            ).fetchall()
+            for row in rows:
+                worker_host, _, worker_pid = (row["worker_id"] or "").rpartition(":")
+                if worker_host != hostname or _process_alive(int(worker_pid or 0)):
+                    continue
+                connection.execute(
+                    "UPDATE video_jobs SET status = 'queued', worker_id = NULL, lease_expires_at = NULL "
+                    "WHERE job_id = ? AND status = 'running'",
+                    (row["job_id"],)
+                )
+                requeued += 1
+        
+        return requeued
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a job by ID"""
+        
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM video_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        
+        return self._row_to_job(row) if row else None
+    
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List jobs, newest first, optionally filtered by status"""
+        
+        with self._connect() as connection:
+            if status:
+                rows = connection.execute(
+                    "SELECT * FROM video_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = connection.execute(
+                    "SELECT * FROM video_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        
+        return [self._row_to_job(row) for row in rows]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Job counts by status"""
+        
+        with self._connect() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) AS count FROM video_jobs GROUP BY status").fetchall()
+        
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["count"] for row in rows})
+        
+        with self._connect() as connection:
+            counts["generation_slots"] = self._count_slots(connection)
+            counts["limits"] = self._read_limits(connection)
+            counts["worker_nodes"] = self._list_nodes(connection, counts["limits"])
+        return counts
+    
+    def get_job_summary(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """Outcomes and timings of jobs finished since a Unix time (all time if None)"""
+        
+        since = since or 0.0
+        with self._connect() as connection:
+            totals = connection.execute("""
+                SELECT
+                    SUM(status = 'completed') AS completed,
+                    SUM(status = 'failed') AS failed,
+                    AVG(CASE WHEN status = 'completed' THEN finished_at - started_at END) AS average_run_seconds,
+                    AVG(started_at - created_at) AS average_wait_seconds,
+                    MAX(CASE WHEN status = 'completed' THEN finished_at END) AS last_completed_at
+                FROM video_jobs
+                WHERE status IN ('completed', 'failed') AND finished_at >= ?
+            """, (since,)).fetchone()
+            last_error = connection.execute(
+                "SELECT job_id, error, finished_at FROM video_jobs WHERE status = 'failed' "
+                "ORDER BY finished_at DESC LIMIT 1"
+            ).fetchone()
+        
+        completed = totals["completed"] or 0
+        failed = totals["failed"] or 0
+        return {
+            "completed": completed,
+            "failed": failed,
+            "success_rate": completed / (completed + failed) if completed + failed else None,
+            "average_run_seconds": totals["average_run_seconds"],
+            "average_wait_seconds": totals["average_wait_seconds"],
+            "last_completed_at": totals["last_completed_at"],
+            "last_error": {
+                "job_id": last_error["job_id"],
+                "error": last_error["error"],
+                "failed_at": datetime.fromtimestamp(last_error["finished_at"]).isoformat()
+            } if last_error else None
+        }
+
+    def _read_limits(self, connection: sqlite3.Connection) -> Dict[str, int]:
+        """Admission limits as stored, falling back to the defaults"""
+        
+        limits = dict(DEFAULT_LIMITS)
+        limits.update({
+            row["name"]: row["value"]
+            for row in connection.execute("SELECT name, value FROM queue_settings").fetchall()
+        })
+        return limits
+    
+    def _build_scheduler(self, connection: sqlite3.Connection, limits: Dict[str, int]) -> DeadlineScheduler:
+        """Deadline scheduler fed with the recent stage timings"""
+        
+        rows = connection.execute(
+            "SELECT stage, render_profile, seconds, video_minutes FROM ("
+            "SELECT *, ROW_NUMBER() OVER (PARTITION BY stage, render_profile ORDER BY recorded_at DESC) AS age "
+            "FROM stage_timings) WHERE age <= ?",
+            (STAGE_TIMING_HISTORY,)
+        ).fetchall()
+        
+        covered_deadlines = [
+            row["deadline"] for row in connection.execute(
+                "SELECT deadline FROM video_jobs WHERE priority = 'scheduled' AND status IN ('running', 'completed') "
+                "AND deadline > ?",
+                (time.time() - limits["slot_interval_minutes"] * 60,)
+            ).fetchall()
+        ]
+        
+        # Every live node runs up to max_concurrent_generations jobs
+        node_count = max(1, sum(1 for node in self._list_nodes(connection, limits) if node["alive"]))
+        
+        return DeadlineScheduler(DurationEstimator([dict(row) for row in rows]), limits, covered_deadlines, node_count)
+    
+    def _load_schedule_state(self, connection: sqlite3.Connection, now: float):
+        """Expected free times of busy workers and the queued jobs, as scheduler inputs"""
+        
+        running_free_at = [
+            (row["started_at"] or now) + (row["estimated_seconds"] or 0)
+            for row in connection.execute(
+                "SELECT started_at, estimated_seconds FROM video_jobs WHERE status = 'running'"
+            ).fetchall()
+        ]
+        running_free_at += [
+            row["acquired_at"] + (row["estimated_seconds"] or 0)
+            for row in connection.execute("SELECT acquired_at, estimated_seconds FROM generation_slots").fetchall()
+        ]
+        
+        queued_items = [
+            ScheduleItem(
+                item_id=row["job_id"],
+                priority=row["priority"],
+                deadline=row["deadline"],
+                estimated_seconds=row["estimated_seconds"] or 0,
+                available_at=max(row["not_before"] or now, now),
+                order=row["created_at"]
+            )
+            for row in connection.execute(
+                "SELECT job_id, priority, deadline, estimated_seconds, not_before, created_at "
+                "FROM video_jobs WHERE status = 'queued'"
+            ).fetchall()
+        ]
+        
+        return running_free_at, queued_items
+    
+    def _count(self, connection: sqlite3.Connection, status: str) -> int:
+        """Number of jobs in a status"""
+        
+        return connection.execute("SELECT COUNT(*) FROM video_jobs WHERE status = ?", (status,)).fetchone()[0]
+    
+    def _count_slots(self, connection: sqlite3.Connection, hostname: Optional[str] = None) -> int:
+        """Number of synchronous generation slots held, optionally on one host"""
+        
+        if hostname is None:
+            return connection.execute("SELECT COUNT(*) FROM generation_slots").fetchone()[0]
+        return connection.execute(
+            "SELECT COUNT(*) FROM generation_slots WHERE holder LIKE ?", (f"{hostname}:%",)
+        ).fetchone()[0]
+    
+    def _count_node_running(self, connection: sqlite3.Connection, hostname: str) -> int:
+        """Number of jobs running on one worker node"""
+        
+        return connection.execute(
+            "SELECT COUNT(*) FROM video_jobs WHERE status = 'running' AND worker_id LIKE ?", (f"{hostname}:%",)
+        ).fetchone()[0]
+    
+    def _touch_node(self, connection: sqlite3.Connection, hostname: str, now: float, limits: Dict[str, int]):
+        """Record that a worker node is alive, at most HEARTBEAT_FRACTION times per lease"""
+        
+        if not self._touch_due(hostname, now, limits):
+            return
+        connection.execute(
+            "INSERT INTO worker_nodes (hostname, last_seen) VALUES (?, ?) "
+            "ON CONFLICT(hostname) DO UPDATE SET last_seen = excluded.last_seen",
+            (hostname, now)
+        )
+        self._node_touched_at[hostname] = now
+    
+    def _touch_due(self, hostname: str, now: float, limits: Dict[str, int]) -> bool:
+        """Whether this process should refresh a node's last_seen; nodes count as alive for one lease"""
+        
+        return now - self._node_touched_at.get(hostname, 0) >= limits["job_lease_seconds"] / HEARTBEAT_FRACTION
+    
+    def _has_claim_work(self, connection: sqlite3.Connection, hostname: str, now: float,
+                        limits: Dict[str, int]) -> bool:
+        """Whether a claim could change anything: an expired lease to requeue, or a startable job and a free slot"""
+        
+        if connection.execute(
+            "SELECT 1 FROM video_jobs WHERE status = 'running' AND lease_expires_at < ? LIMIT 1", (now,)
+        ).fetchone():
+            return True
+        if not connection.execute(
+            "SELECT 1 FROM video_jobs WHERE status = 'queued' AND COALESCE(not_before, 0) <= ? LIMIT 1", (now,)
+        ).fetchone():
+            return False
+        active = self._count_node_running(connection, hostname) + self._count_slots(connection, hostname)
+        return active < limits["max_concurrent_generations"]
+    
+    def _list_nodes(self, connection: sqlite3.Connection, limits: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Known worker nodes; a node is alive if it claimed or heartbeated within one lease"""
+        
+        now = time.time()
+        return [
+            {
+                "hostname": row["hostname"],
+                "last_seen": datetime.fromtimestamp(row["last_seen"]).isoformat(),
+                "alive": now - row["last_seen"] <= limits["job_lease_seconds"],
+                "running_jobs": self._count_node_running(connection, row["hostname"])
+            }
+            for row in connection.execute("SELECT hostname, last_seen FROM worker_nodes ORDER BY hostname").fetchall()
+        ]
+    
+    def _requeue_expired_leases(self, connection: sqlite3.Connection, now: float, limits: Dict[str, int]):
+        """Return jobs whose worker stopped heartbeating to the queue, or fail them after too many attempts"""
+        
+        connection.execute(
+            "UPDATE video_jobs SET status = 'failed', finished_at = ?, "
+            "error = 'Lease expired after ' || attempts || ' attempts; giving up' "
+            "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+            (now, now, limits["max_job_attempts"])
+        )
+        connection.execute(
+            "UPDATE video_jobs SET status = 'queued', worker_id = NULL, lease_expires_at = NULL "
+            "WHERE status = 'running' AND lease_expires_at < ?",
+            (now,)
+        )
+    
+    def _release_orphaned_slots(self, connection: sqlite3.Connection):
+        """Drop slots held by processes on this host that no longer exist"""
+        
+        hostname = socket.gethostname()
+        for row in connection.execute("SELECT slot_id, holder FROM generation_slots").fetchall():
+            holder_host, _, holder_pid = row["holder"].rpartition(":")
+            if holder_host == hostname and not _process_alive(int(holder_pid or 0)):
+                connection.execute("DELETE FROM generation_slots WHERE slot_id = ?", (row["slot_id"],))
+    
+    def _estimate_retry_after(self, connection: sqlite3.Connection, queued: int, limits: Dict[str, int]) -> int:
+        """Seconds until a slot is likely free, from recent job run times"""
+        
+        average_seconds = connection.execute(
+            "SELECT AVG(finished_at - started_at) FROM ("
+            "SELECT finished_at, started_at FROM video_jobs WHERE status = 'completed' "
+            "ORDER BY finished_at DESC LIMIT 20)"
+        ).fetchone()[0] or 60.0
+        
+        estimate = average_seconds * (queued + 1) / limits["max_concurrent_generations"]
+        return max(1, min(3600, math.ceil(estimate)))
+    
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None, worker_id: Optional[str] = None) -> bool:
+        """Store a job's final state; fenced on the lease holder when a worker_id is given"""
+        
+        query = "UPDATE video_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ?"
+        params = [status, json.dumps(result) if result is not None else None, error, time.time(), job_id]
+        if worker_id is not None:
+            query += " AND worker_id = ? AND status = 'running'"
+            params.append(worker_id)
+        
+        with self._connect() as connection:
+            cursor = connection.execute(query, params)
+        
+        return cursor.rowcount == 1
+    
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """JSON-serializable view of a job row"""
+        
+        def timestamp(value):
+            return datetime.fromtimestamp(value).isoformat() if value else None
+        
+        return {
+            "job_id": row["job_id"],
+            "job_type": row["job_type"],
+            "status": row["status"],
+            "payload": json.loads(row["payload"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "worker_id": row["worker_id"],
+            "lease_expires_at": timestamp(row["lease_expires_at"]),
+            "created_at": timestamp(row["created_at"]),
+            "started_at": timestamp(row["started_at"]),
+            "finished_at": timestamp(row["finished_at"]),
+            "run_seconds": (row["finished_at"] - row["started_at"])
+                           if row["finished_at"] and row["started_at"] else None,
+            "priority": row["priority"],
+            "deadline": timestamp(row["deadline"]),
+            "not_before": timestamp(row["not_before"]),
+            "estimated_seconds": row["estimated_seconds"],
+            "trace_id": row["trace_id"]
+        }
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode; SQLite connections are cheap"""
+        
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+    
+    def _create_schema(self):
+        """Create the tables, adding columns that older databases lack"""
+        
+        with self._connect() as connection:
+            # WAL lets status reads proceed while a worker holds the write lock (local disks only)
+            connection.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS video_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_video_jobs_status ON video_jobs (status, created_at)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS queue_settings (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS generation_slots (
+                    slot_id TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    label TEXT,
+                    acquired_at REAL NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS stage_timings (
+                    stage TEXT NOT NULL,
+                    render_profile TEXT,
+                    seconds REAL NOT NULL,
+                    video_minutes REAL,
+                    recorded_at REAL NOT NULL
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_stage_timings_stage ON stage_timings (stage, recorded_at)"
+            )
+            
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS worker_nodes (hostname TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+            )
+            
+            self._add_missing_columns(connection, "video_jobs", {
+                "priority": "TEXT NOT NULL DEFAULT 'interactive'",
+                "deadline": "REAL",
+                "estimated_seconds": "REAL",
+                "not_before": "REAL",
+                "lease_expires_at": "REAL",
+                "trace_id": "TEXT"
+            })
+            self._add_missing_columns(connection, "generation_slots", {"estimated_seconds": "REAL"})
+    
+    def _add_missing_columns(self, connection: sqlite3.Connection, table: str, columns: Dict[str, str]):
+        """Add columns introduced after a database was created"""
+        
+        existing = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})").fetchall()}
+        for name, definition in columns.items():
+            if name not in existing:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+class VideoJobProcessor:
+    """Runs claimed jobs; built once per worker process"""
+    
+    def __init__(self, queue: VideoJobQueue, assets_dir: Optional[str] = None):
+        from src.services.video_generation_service import VideoGenerationService
+        from src.services.service_registry import get_video_service
+        self.queue = queue
+        # The default assets directory shares the process-wide service
+        self.video_service = VideoGenerationService(assets_dir) if assets_dir else get_video_service()
+        self._topic_selector = None
+        self._script_generator = None
+        self._pipeline = None
+    
+    def process(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one job and return its result"""
+        
+        payload = job["payload"]
+        
+        with start_trace(job.get("trace_id"), f"video_job {job['job_type']}", category="job", keep=True,
+                         job_id=job["job_id"], attempt=job["attempts"]):
+            if job["job_type"] == "autonomous":
+                return self._run_autonomous(payload)
+            if job["job_type"] == "pipeline":
+                return self._run_pipeline(payload)
+            if job["job_type"] == "promote":
+                return self._run_promote(payload["project_id"], payload.get("render_profile", "final"))
+            
+            return self._run_generate(payload["content_data"], payload.get("render_profile", "final"))
+    
+    def _run_generate(self, content_data: Dict[str, Any], render_profile: str) -> Dict[str, Any]:
+        """Generate a video from caller-supplied content"""
+        
+        video_project = self.video_service.create_educational_video(content_data, render_profile=render_profile)
+        video_info = self.video_service.get_video_info(video_project.project_id)
+        
+        return {
+            "project_id": video_project.project_id,
+            "title": video_project.title,
+            "content_type": video_project.content_type,
+            "age_group": video_project.age_group,
+            "duration_seconds": video_project.total_duration,
+            "output_path": video_project.output_path,
+            "file_info": video_info,
+            "scenes_count": len(video_project.scenes),
+            "render_profile": render_profile,
+            "video_created": bool(video_info and video_info.get("exists"))
+        }
+    
+    def _run_promote(self, project_id: str, render_profile: str) -> Dict[str, Any]:
+        """Re-render an existing project's assembly plan with another profile"""
+        
+        video_project = self.video_service.promote_video(project_id, render_profile)
+        if video_project is None:
+            raise ValueError(f"Video project not found: {project_id}")
+        
+        video_info = self.video_service.get_video_info(project_id)
+        render_result = video_info["renders"].get(render_profile, {})
+        
+        return {
+            "project_id": project_id,
+            "render_profile": render_profile,
+            "promoted": video_info["render_profile"] == render_profile,
+            "render": render_result,
+            "video_info": video_info,
+            "output_path": video_project.output_path
+        }
+    
+    def _run_autonomous(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Select a topic, write its script, then generate the video"""
+        
+        from src.models.content_generator import ContentRequest, AgeGroup
+        from src.services.service_registry import get_topic_selector, get_script_generator
+        
+        if self._topic_selector is None:
+            self._topic_selector = get_topic_selector()
+            self._script_generator = get_script_generator()
+        
+        target_age_group = AgeGroup(payload["age_group"]) if payload.get("age_group") else None
+        topic_selection = self._topic_selector.select_next_topic(target_age_group)
+        
+        generated_script = self._script_generator.generate_script(ContentRequest(
+            topic=topic_selection.topic,
+            content_type=topic_selection.content_type,
+            age_group=topic_selection.age_group,
+            duration_minutes=payload.get("duration_minutes", 3),
+            learning_objectives=[],
+            style_preferences={}
+        ))
+        
+        content_data = {
+            "topic": topic_selection.topic,
+            "title": generated_script.title,
+            "content_type": generated_script.content_type.value,
+            "age_group": generated_script.age_group.value,
+            "duration_minutes": generated_script.duration_minutes,
+            "script_text": generated_script.script_text,
+            "scene_descriptions": generated_script.scene_descriptions,
+            "audio_cues": generated_script.audio_cues,
+            "character_list": generated_script.character_list
+        }
+        
+        result = self._run_generate(content_data, payload.get("render_profile", "final"))
+        result["selected_topic"] = {
+            "topic": topic_selection.topic,
+            "content_type": topic_selection.content_type.value,
+            "age_group": topic_selection.age_group.value,
+            "priority_score": topic_selection.priority_score,
+            "selection_reason": topic_selection.selection_reason
+        }
+        result["autonomous_selection"] = True
+        return result
+    
+    def _run_pipeline(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run (or resume) the checkpointed topic-to-publish pipeline"""
+        
+        from src.services.pipeline_executor import build_video_pipeline
+        
+        if self._pipeline is None:
+            self._pipeline = build_video_pipeline(self.video_service)
+        
+        run_record = self._pipeline.run(payload["run_input"], run_id=payload.get("run_id"))
+        self.queue.record_stage_timings(run_record)
+        if run_record["status"] != "completed":
+            raise RuntimeError(run_record["error"])
+        
+        return {
+            "run_id": run_record["run_id"],
+            "total_seconds": run_record["total_seconds"],
+            "stages": run_record["stages"],
+            "outputs": run_record["outputs"]
+        }
+
+def run_worker(db_path: Optional[str] = None, assets_dir: Optional[str] = None,
+               poll_interval_seconds: float = 1.0, stop_event: Optional[Any] = None,
+               log_queue: Optional[Any] = None):
+    """Worker process loop: claim, process and record jobs until stopped"""
+    
+    # Log through the parent's handlers so worker records reach its log ring and file
+    configure_logging(worker_queue=log_queue)
+    queue = VideoJobQueue(db_path)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    parent_pid = os.getppid()
+    processor = None
+    
+    while not (stop_event is not None and stop_event.is_set()):
+        # Exit with the API process rather than lingering as an orphan
+        if stop_event is not None and os.getppid() != parent_pid:
+            break
+        
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(poll_interval_seconds)
+            continue
+        
+        # Keep the lease alive while the job runs; if this process dies, the lease lapses
+        # and another worker (on any node) picks the job up
+        job_done = threading.Event()
+        lease_seconds = queue.get_limits()["job_lease_seconds"]
+        heartbeat_thread = threading.Thread(
+            target=_heartbeat_loop,
+            args=(queue, job["job_id"], worker_id, lease_seconds / HEARTBEAT_FRACTION, job_done),
+            name="video-job-heartbeat",
+            daemon=True
+        )
+        heartbeat_thread.start()
+        
+        try:
+            if processor is None:
+                processor = VideoJobProcessor(queue, assets_dir)
+            recorded = queue.complete(job["job_id"], processor.process(job), worker_id=worker_id)
+            logger.info(f"Video job {job['job_id']} completed",
+                        extra={"details": {"job_id": job["job_id"], "job_type": job["job_type"]}})
+        except Exception as e:
+            logger.exception(f"Video job {job['job_id']} failed: {e}",
+                             extra={"details": {"job_id": job["job_id"], "job_type": job["job_type"]}})
+            recorded = queue.fail(job["job_id"], str(e), worker_id=worker_id)
+        finally:
+            job_done.set()
+            # Publish this job's stage timings to the API process's scrape right away
+            try:
+                get_metrics_registry().flush()
+            except OSError as e:
+                logger.warning(f"Metrics flush failed: {e}")
+        
+        if not recorded:
+            logger.warning(f"Video job {job['job_id']} lease was lost; result discarded",
+                           extra={"details": {"job_id": job["job_id"]}})
+
+def _heartbeat_loop(queue: VideoJobQueue, job_id: str, worker_id: str, interval_seconds: float,
+                    job_done: threading.Event):
+    """Extend a job's lease until the job finishes or the lease is lost"""
+    
+    while not job_done.wait(interval_seconds):
+        try:
+            if not queue.heartbeat(job_id, worker_id):
+                logger.warning(f"Video job {job_id} lease lost to another worker", extra={"details": {"job_id": job_id}})
+                return
+        except sqlite3.Error as e:
+            # A busy or briefly unreachable database; the lease has slack for a missed beat
+            logger.warning(f"Video job {job_id} heartbeat failed: {e}", extra={"details": {"job_id": job_id}})
+
+class VideoWorkerPool:
+    """Starts and supervises local worker processes for a queue"""
+    
+    def __init__(self, queue: VideoJobQueue, num_workers: Optional[int] = None, assets_dir: Optional[str] = None):
+        self.queue = queue
+        self.num_workers = num_workers
+        self.assets_dir = assets_dir
+        # Set when another process (the prefork master) supervises the workers; this one only submits jobs
+        self.external = False
+        # Spawned workers start from a clean interpreter instead of a fork of the threaded API process
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes: List[multiprocessing.process.BaseProcess] = []
+        self._lock = threading.Lock()
+    
+    def ensure_started(self):
+        """Start workers if they are not running, replacing any that died"""
+        
+        if self.external:
+            return
+        
+        # Without a fixed size the pool grows to the concurrency limit; claims enforce the limit
+        # itself, so workers beyond a lowered limit just stay idle
+        num_workers = self.num_workers or self.queue.get_limits()["max_concurrent_generations"]
+        
+        with self._lock:
+            # A master that reaps every child (gunicorn) can collect a worker's exit before
+            # is_alive() does, so the PID is checked too
+            alive = [process for process in self._processes
+                     if process.is_alive() and _process_alive(process.pid)]
+            if len(alive) >= num_workers:
+                return
+            
+            self.queue.requeue_orphaned()
+            for _ in range(num_workers - len(alive)):
+                process = self._context.Process(
+                    target=run_worker,
+                    kwargs={
+                        "db_path": self.queue.db_path,
+                        "assets_dir": self.assets_dir,
+                        "stop_event": self._stop_event,
+                        "log_queue": get_worker_log_queue(self._context)
+                    },
+                    name="video-worker",
+                    daemon=True
+                )
+                process.start()
+                alive.append(process)
+            self._processes = alive
+    
+    def run_forever(self, check_interval_seconds: float = 5.0):
+        """Supervise the workers until interrupted; used by standalone worker nodes"""
+        
+        try:
+            while True:
+                self.ensure_started()
+                time.sleep(check_interval_seconds)
+        except KeyboardInterrupt:
+            self.stop()
+    
+    def stop(self, timeout: float = 10.0):
+        """Ask workers to finish their current job and exit"""
+        
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Worker process status"""
+        
+        if self.external:
+            return {
+                "num_workers": self.num_workers or self.queue.get_limits()["max_concurrent_generations"],
+                "supervised_by": "prefork master",
+                "alive_workers": None,
+                "worker_pids": []
+            }
+        return {
+            "num_workers": self.num_workers or self.queue.get_limits()["max_concurrent_generations"],
+            "alive_workers": sum(1 for process in self._processes if process.is_alive()),
+            "worker_pids": [process.pid for process in self._processes if process.is_alive()]
+        }
+
+def _process_alive(pid: int) -> bool:
+    """Whether a local process ID is still running"""
+    
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+_job_queue: Optional[VideoJobQueue] = None
+_worker_pool: Optional[VideoWorkerPool] = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> VideoJobQueue:
+    """Get the process-wide video job queue"""
+    
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = VideoJobQueue()
+        return _job_queue
+
+def get_worker_pool() -> VideoWorkerPool:
+    """Get the local worker pool for the process-wide queue"""
+    
+    global _worker_pool
+    queue = get_job_queue()
+    with _job_queue_lock:
+        if _worker_pool is None:
+            num_workers = int(os.environ["VIDEO_WORKERS"]) if os.environ.get("VIDEO_WORKERS") else None
+            _worker_pool = VideoWorkerPool(queue, num_workers=num_workers)
+        return _worker_pool
+
+if __name__ == "__main__":
+    # Standalone worker node, e.g. another machine with the queue database on a shared filesystem:
+    #   VIDEO_JOB_DB=/mnt/shared/video_jobs.db VIDEO_JOB_DB_JOURNAL_MODE=DELETE VIDEO_WORKERS=4 \
+    #   python -m src.services.video_job_queue
+    # Only the queue is shared this way. Rendered videos, project records and pipeline runs and
+    # checkpoints go to generated-assets under the worker's working directory, so start the node
+    # from a directory whose generated-assets is the same shared mount the API process uses if
+    # the API is to serve what the node produces.
+    num_workers = int(os.environ["VIDEO_WORKERS"]) if os.environ.get("VIDEO_WORKERS") else None
+    configure_logging(log_file=f"worker_node_{socket.gethostname()}.log")
+    VideoWorkerPool(VideoJobQueue(), num_workers=num_workers).run_forever()
@@ -0,0 +1,243 @@
+"""
+In-process Audio Mixer
+Mixes a VideoAssembler audio timeline into a single track using NumPy
+"""
+
+import os
+import subprocess
+import time
+import wave
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger("audio_mixer")
+
+DEFAULT_FADE_SECONDS = 1.5
+
+def decode_audio(file_path: str, sample_rate: int, channels: int) -> Optional[np.ndarray]:
+    """Decode an audio file to a float32 (frames, channels) array"""
+    
+    if file_path.lower().endswith(".wav"):
+        samples = _decode_wav(file_path)
+        if samples is not None:
+            pcm, source_rate = samples
+            return _conform(pcm, source_rate, sample_rate, channels)
+    
+    # Anything else is decoded by ffmpeg straight into a pipe, never to disk
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', file_path,
+        '-f', 'f32le',
+        '-ac', str(channels),
+        '-ar', str(sample_rate),
+        'pipe:1'
+    ]
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+    except OSError as e:
+        logger.warning(f"Audio decode failed for {file_path}: {e}")
+        return None
+    
+    if result.returncode != 0:
+        logger.warning(f"Audio decode failed for {file_path}: {result.stderr.decode(errors='replace')}")
+        return None
+    
+    return np.frombuffer(result.stdout, dtype='<f4').reshape(-1, channels)
+
+def _decode_wav(file_path: str) -> Optional[tuple]:
+    """Read integer PCM WAV data without spawning a decoder"""
+    
+    try:
+        with wave.open(file_path, 'rb') as wav_file:
+            params = wav_file.getparams()
+            raw = wav_file.readframes(params.nframes)
+    except (OSError, EOFError, wave.Error):
+        return None
+    
+    dtypes = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+    if params.sampwidth not in dtypes:
+        return None
+    
+    pcm = np.frombuffer(raw, dtype=dtypes[params.sampwidth]).astype(np.float32)
+    if params.sampwidth == 1:
+        pcm = (pcm - 128.0) / 128.0
+    else:
+        pcm /= float(2 ** (8 * params.sampwidth - 1))
+    
+    return pcm.reshape(-1, params.nchannels), params.framerate
+
+def _conform(pcm: np.ndarray, source_rate: int, sample_rate: int, channels: int) -> np.ndarray:
+    """Match channel count and sample rate of decoded PCM"""
+    
+    if pcm.shape[1] != channels:
+        mono = pcm.mean(axis=1, keepdims=True)
+        pcm = np.repeat(mono, channels, axis=1)
+    
+    if source_rate != sample_rate and len(pcm):
+        target_frames = int(round(len(pcm) * sample_rate / source_rate))
+        source_positions = np.arange(len(pcm), dtype=np.float64)
+        target_positions = np.linspace(0, len(pcm) - 1, target_frames)
+        pcm = np.stack(
+            [np.interp(target_positions, source_positions, pcm[:, c]) for c in range(channels)],
+            axis=1
+        )
+    
+    return np.ascontiguousarray(pcm, dtype=np.float32)
+
+class AudioMixer:
+    """Places timeline clips on a float32 buffer with gain envelopes, fades and loops"""
+    
+    def __init__(self, sample_rate: int = 44100, channels: int = 2, pcm_cache: Optional[Any] = None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # Optional PCMCache; reused sources are then read from memory-mapped .npy files
+        self.pcm_cache = pcm_cache
+    
+    def mix(self, audio_timeline: List[Dict[str, Any]], duration_seconds: float,
+            output_path: str) -> Dict[str, Any]:
+        """Mix every timeline entry that has a source and write the result in one pass"""
+        
+        timings = {}
+        started = time.perf_counter()
+        
+        # Decode each distinct source exactly once, however often it is placed
+        sources = {}
+        for entry in audio_timeline:
+            source_path = entry.get("source_path")
+            if source_path and source_path not in sources:
+                sources[source_path] = self._load_source(source_path)
+        timings["decode_seconds"] = time.perf_counter() - started
+        
+        mix_started = time.perf_counter()
+        total_frames = int(round(duration_seconds * self.sample_rate))
+        buffer = np.zeros((total_frames, self.channels), dtype=np.float32)
+        placed, skipped = [], []
+        
+        for entry in audio_timeline:
+            source = sources.get(entry.get("source_path"))
+            if source is None or not len(source):
+                skipped.append(entry.get("name") or entry.get("audio_type"))
+                continue
+            
+            start_frame = int(round(entry.get("start_time", 0) * self.sample_rate))
+            if start_frame >= total_frames:
+                continue
+            
+            clip_frames = int(round(entry.get("duration", len(source) / self.sample_rate) * self.sample_rate))
+            clip_frames = min(clip_frames, total_frames - start_frame)
+            
+            if entry.get("loop"):
+                crossfade_frames = int(entry.get("crossfade_seconds", 0) * self.sample_rate)
+                clip = self._loop_to_length(source, clip_frames, crossfade_frames)
+            else:
+                clip = source[:clip_frames]
+            
+            envelope = self._build_envelope(len(clip), entry)
+            buffer[start_frame:start_frame + len(clip)] += clip * envelope[:, np.newaxis]
+            placed.append(entry.get("name") or entry.get("audio_type"))
+        
+        # Scale the whole mix down rather than hard-clipping overlapping peaks
+        peak = float(np.abs(buffer).max()) if total_frames else 0.0
+        if peak > 0.99:
+            buffer *= 0.99 / peak
+        timings["mix_seconds"] = time.perf_counter() - mix_started
+        
+        write_started = time.perf_counter()
+        written = self._write_wav(buffer, output_path)
+        timings["write_seconds"] = time.perf_counter() - write_started
+        
+        total_seconds = time.perf_counter() - started
+        
+        return {
+            "output_path": output_path,
+            "written": written,
+            "duration_seconds": total_frames / float(self.sample_rate),
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "sources_decoded": sum(1 for source in sources.values() if source is not None),
+            "clips_placed": placed,
+            "clips_skipped": skipped,
+            "peak_before_limiting": peak,
+            "timings": timings,
+            "total_seconds": total_seconds,
+            "realtime_factor": (total_frames / float(self.sample_rate)) / total_seconds if total_seconds else None
+        }
+    
+    def _load_source(self, source_path: str) -> Optional[np.ndarray]:
+        """Load a source's samples, through the PCM cache when one is configured"""
+        
+        if not os.path.exists(source_path):
+            return None
+        
+        if self.pcm_cache is not None:
+            return self.pcm_cache.load(source_path)
+        
+        return decode_audio(source_path, self.sample_rate, self.channels)
+    
+    def _loop_to_length(self, source: np.ndarray, length: int, crossfade_frames: int) -> np.ndarray:
+        """Tile a source to an exact length, blending each seam with a crossfade"""
+        
+        if len(source) >= length:
+            return source[:length]
+        
+        crossfade_frames = min(crossfade_frames, len(source) // 4)
+        if crossfade_frames <= 0:
+            repeats = -(-length // len(source))
+            return np.tile(source, (repeats, 1))[:length]
+        
+        ramp = np.linspace(0.0, 1.0, crossfade_frames, dtype=np.float32)[:, np.newaxis]
+        seam = source[-crossfade_frames:] * (1.0 - ramp) + source[:crossfade_frames] * ramp
+        body = source[crossfade_frames:-crossfade_frames]
+        unit = np.concatenate([seam, body])
+        
+        first = source[:-crossfade_frames]
+        repeats = max(0, -(-(length - len(first)) // len(unit)))
+        return np.concatenate([first, np.tile(unit, (repeats, 1))])[:length]
+    
+    def _build_envelope(self, length: int, entry: Dict[str, Any]) -> np.ndarray:
+        """Build the per-frame gain curve for a clip"""
+        
+        envelope = np.full(length, float(entry.get("volume", 1.0)), dtype=np.float32)
+        
+        fade_in_frames = self._fade_frames(entry.get("fade_in"), length)
+        if fade_in_frames:
+            envelope[:fade_in_frames] *= np.linspace(0.0, 1.0, fade_in_frames, dtype=np.float32)
+        
+        fade_out_frames = self._fade_frames(entry.get("fade_out"), length)
+        if fade_out_frames:
+            envelope[-fade_out_frames:] *= np.linspace(1.0, 0.0, fade_out_frames, dtype=np.float32)
+        
+        return envelope
+    
+    def _fade_frames(self, fade: Any, length: int) -> int:
+        """Convert a fade flag or a fade length in seconds to frames"""
+        
+        if not fade:
+            return 0
+        
+        fade_seconds = DEFAULT_FADE_SECONDS if fade is True else float(fade)
+        return min(int(fade_seconds * self.sample_rate), length // 2)
+    
+    def _write_wav(self, buffer: np.ndarray, output_path: str) -> bool:
+        """Write the mix as 16-bit PCM in a single write"""
+        
+        temp_path = f"{output_path}.partial"
+        pcm = (np.clip(buffer, -1.0, 1.0) * 32767.0).astype('<i2')
+        
+        try:
+            with wave.open(temp_path, 'wb') as output_file:
+                output_file.setnchannels(self.channels)
+                output_file.setsampwidth(2)
+                output_file.setframerate(self.sample_rate)
+                output_file.writeframes(pcm.tobytes())
+            os.replace(temp_path, output_path)
+            return True
+        except (OSError, wave.Error) as e:
+            logger.error(f"Audio mix write failed: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
@@ -0,0 +1,283 @@
+"""
+File Manager
+SQLite catalog of generated assets, so lookups and listings never scan generated-assets
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from src.utils.helpers import hash_file
+from src.utils.logger import get_logger
+
+logger = get_logger("file_manager")
+
+# VisualAsset/AudioAsset asset_type values, plus rendered videos
+ASSET_KINDS = ["character", "background", "object", "text_overlay", "music", "voice", "sound_effect", "video"]
+MAX_LIST_LIMIT = 500
+
+ASSET_COLUMNS = ["asset_id", "kind", "style", "file_path", "size_bytes", "mtime_ns", "content_hash",
+                 "created_at", "last_used_at", "metadata"]
+
+class AssetCatalog:
+    """One row per generated asset, plus the projects that use it
+    
+    Generators record an asset every time they write or reuse its file, so
+    the row always names the current file, its size and content hash. The
+    hash is only recomputed when the file's size or modification time has
+    changed, and get() checks those with a single stat, so a lookup is one
+    indexed query however many assets are on disk.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.environ.get("PIPELINE_ASSET_DB") or os.path.join(
+                os.getcwd(), "generated-assets", "catalog", "assets.db"
+            )
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._create_schema()
+    
+    @contextmanager
+    def transaction(self):
+        """A connection holding the write lock; commits on success, rolls back on error"""
+        
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+    
+    def record_asset(self, asset_id: str, kind: str, file_path: str, style: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Insert or refresh an asset whose file exists; returns its entry, or None if there is no file"""
+        
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        
+        with self._connect() as connection:
+            existing = connection.execute(
+                "SELECT file_path, size_bytes, mtime_ns, content_hash FROM assets WHERE asset_id = ?", (asset_id,)
+            ).fetchone()
+        unchanged = (existing is not None and existing["file_path"] == file_path and
+                     (existing["size_bytes"], existing["mtime_ns"]) == (stat_result.st_size, stat_result.st_mtime_ns))
+        # Hashed before taking the write lock, so a large video doesn't hold up other writers
+        content_hash = existing["content_hash"] if unchanged else hash_file(file_path)
+        
+        now = time.time()
+        with self.transaction() as connection:
+            created = connection.execute("SELECT created_at FROM assets WHERE asset_id = ?", (asset_id,)).fetchone()
+            row = {
+                "asset_id": asset_id,
+                "kind": kind,
+                "style": style,
+                "file_path": file_path,
+                "size_bytes": stat_result.st_size,
+                "mtime_ns": stat_result.st_mtime_ns,
+                "content_hash": content_hash,
+                "created_at": created["created_at"] if created is not None else now,
+                "last_used_at": now,
+                "metadata": json.dumps(metadata or {}, sort_keys=True, default=str)
+            }
+            connection.execute(
+                f"INSERT OR REPLACE INTO assets ({', '.join(ASSET_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in ASSET_COLUMNS)})",
+                [row[column] for column in ASSET_COLUMNS]
+            )
+            projects = self._get_projects(connection, asset_id)
+        
+        return self._to_entry(row, projects, exists=True)
+    
+    def add_project_references(self, project_id: str, asset_ids: List[str]):
+        """Note that a project uses these assets"""
+        
+        now = time.time()
+        with self.transaction() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO asset_projects (asset_id, project_id, added_at) VALUES (?, ?, ?)",
+                [(asset_id, project_id, now) for asset_id in asset_ids]
+            )
+    
+    def get(self, asset_id: str) -> Optional[Dict[str, Any]]:
+        """An asset's entry, or None if it was never recorded
+        
+        A file changed since it was recorded is re-recorded first, so the
+        content hash always matches what a download would send.
+        """
+        
+        with self._connect() as connection:
+            row = connection.execute(f"SELECT {', '.join(ASSET_COLUMNS)} FROM assets WHERE asset_id = ?",
+                                     (asset_id,)).fetchone()
+            if row is None:
+                return None
+            row = dict(row)
+            projects = self._get_projects(connection, asset_id)
+        
+        try:
+            stat_result = os.stat(row["file_path"])
+        except FileNotFoundError:
+            return self._to_entry(row, projects, exists=False)
+        
+        if (stat_result.st_size, stat_result.st_mtime_ns) != (row["size_bytes"], row["mtime_ns"]):
+            refreshed = self.record_asset(asset_id, row["kind"], row["file_path"], row["style"],
+                                          json.loads(row["metadata"]))
+            if refreshed is not None:
+                return refreshed
+        return self._to_entry(row, projects, exists=True)
+    
+    def list_assets(self, kind: Optional[str] = None, style: Optional[str] = None, project_id: Optional[str] = None,
+                    limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Assets matching the filters, newest first, with the total count for paging"""
+        
+        where, params = [], []
+        if kind:
+            where.append("assets.kind = ?")
+            params.append(kind)
+        if style:
+            where.append("assets.style = ?")
+            params.append(style)
+        if project_id:
+            where.append("assets.asset_id IN (SELECT asset_id FROM asset_projects WHERE project_id = ?)")
+            params.append(project_id)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        limit = max(1, min(int(limit), MAX_LIST_LIMIT))
+        offset = max(0, int(offset))
+        
+        with self._connect() as connection:
+            total = connection.execute(f"SELECT COUNT(*) AS count FROM assets {where_sql}", params).fetchone()["count"]
+            rows = [dict(row) for row in connection.execute(
+                f"SELECT {', '.join(ASSET_COLUMNS)} FROM assets {where_sql} "
+                f"ORDER BY created_at DESC, asset_id LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )]
+            assets = [self._to_entry(row, self._get_projects(connection, row["asset_id"])) for row in rows]
+        
+        return {"assets": assets, "total": total, "limit": limit, "offset": offset}
+    
+    def remove_unused_since(self, cutoff: float) -> List[Dict[str, Any]]:
+        """Drop assets not written or reused since cutoff (epoch seconds); returns the removed entries
+        
+        Assets a project still references are kept however old they are, since
+        downloading them doesn't refresh last_used_at.
+        """
+        
+        unused = "last_used_at < ? AND asset_id NOT IN (SELECT asset_id FROM asset_projects)"
+        with self.transaction() as connection:
+            rows = [dict(row) for row in connection.execute(
+                f"SELECT {', '.join(ASSET_COLUMNS)} FROM assets WHERE {unused}", (cutoff,)
+            )]
+            removed = [self._to_entry(row, []) for row in rows]
+            connection.execute(f"DELETE FROM assets WHERE {unused}", (cutoff,))
+        if removed:
+            logger.info(f"Removed {len(removed)} assets from the catalog", extra={"details": {
+                "assets": len(removed),
+                "bytes": sum(entry["file_size_bytes"] for entry in removed),
+                "cutoff": datetime.fromtimestamp(cutoff).isoformat()
+            }})
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Asset counts and bytes per kind"""
+        
+        with self._connect() as connection:
+            by_kind = {
+                row["kind"]: {"assets": row["count"], "bytes": row["bytes"]}
+                for row in connection.execute(
+                    "SELECT kind, COUNT(*) AS count, SUM(size_bytes) AS bytes FROM assets GROUP BY kind ORDER BY kind"
+                )
+            }
+        return {
+            "assets": sum(entry["assets"] for entry in by_kind.values()),
+            "bytes": sum(entry["bytes"] for entry in by_kind.values()),
+            "by_kind": by_kind,
+            "db_path": self.db_path
+        }
+    
+    def _get_projects(self, connection: sqlite3.Connection, asset_id: str) -> List[str]:
+        return [row["project_id"] for row in connection.execute(
+            "SELECT project_id FROM asset_projects WHERE asset_id = ? ORDER BY added_at, project_id", (asset_id,)
+        )]
+    
+    def _to_entry(self, row: Dict[str, Any], projects: List[str], exists: Optional[bool] = None) -> Dict[str, Any]:
+        """API shape of a row; exists is only known when the caller has just stat'ed the file"""
+        
+        entry = {
+            "asset_id": row["asset_id"],
+            "kind": row["kind"],
+            "style": row["style"],
+            "file_path": row["file_path"],
+            "file_size_bytes": row["size_bytes"],
+            "content_hash": row["content_hash"],
+            "created_at": datetime.fromtimestamp(row["created_at"]).isoformat(),
+            "last_used_at": datetime.fromtimestamp(row["last_used_at"]).isoformat(),
+            "metadata": json.loads(row["metadata"]),
+            "projects": projects
+        }
+        if exists is not None:
+            entry["exists"] = exists
+        return entry
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode; SQLite connections are cheap"""
+        
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+    
+    def _create_schema(self):
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS assets (
+                    asset_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    style TEXT,
+                    file_path TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS asset_projects (
+                    asset_id TEXT NOT NULL,
+                    project_id TEXT NOT NULL,
+                    added_at REAL NOT NULL,
+                    PRIMARY KEY (asset_id, project_id)
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS assets_kind ON assets (kind, created_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS assets_style ON assets (style, created_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS assets_created ON assets (created_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS assets_last_used ON assets (last_used_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS asset_projects_project ON asset_projects (project_id)")
+
+_asset_catalog: Optional[AssetCatalog] = None
+_asset_catalog_lock = threading.Lock()
+
+def get_asset_catalog() -> AssetCatalog:
+    """Get the process-wide asset catalog"""
+    
+    global _asset_catalog
+    if _asset_catalog is not None:
+        return _asset_catalog
+    with _asset_catalog_lock:
+        if _asset_catalog is None:
+            _asset_catalog = AssetCatalog()
+        return _asset_catalog
@@ -0,0 +1,34 @@
+"""
+Frozen Catalogs
+Read-only copies of the nested dict/list libraries services load at startup
+"""
+
+from typing import Any
+
+class FrozenDict(dict):
+    """A dict that refuses changes after it is built
+    
+    Still a real dict, so lookups, iteration and JSON encoding work as before;
+    copy() returns an ordinary, mutable dict.
+    """
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("catalog is read-only; copy() it to make changes")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def __reduce__(self):
+        # Pickle and deepcopy rebuild through __init__ rather than item by item
+        return (FrozenDict, (dict(self),))
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of nested dicts, lists and sets: FrozenDict, tuple and frozenset"""
+    
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
@@ -0,0 +1,17 @@
+"""
+Helpers
+Small file utilities shared by services and routes
+"""
+
+import hashlib
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def hash_file(path: str) -> str:
+    """Hex sha256 of a file's contents, read in chunks"""
+    
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,302 @@
+"""
+Structured Logging
+JSON log records through a non-blocking queue into a rotating file and an indexed in-memory ring
+"""
+
+import os
+import sys
+import json
+import atexit
+import socket
+import logging
+import logging.handlers
+import queue
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+LOG_LEVELS = ["debug", "info", "warning", "error", "critical"]
+LOGGER_PREFIX = "pipeline"
+
+class LogRing:
+    """Bounded in-memory log history with per-level and per-component indexes
+    
+    Every index is a deque of references into the same entries, so filtering by
+    level or component walks only matching entries instead of the whole history.
+    """
+    
+    def __init__(self, capacity: int = 5000):
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+        self._by_level: Dict[str, deque] = {}
+        self._by_component: Dict[str, deque] = {}
+        self._sequence = 0
+        self._condition = threading.Condition()
+    
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Add an entry, assigning its sequence number, and wake any tail readers"""
+        
+        with self._condition:
+            self._sequence += 1
+            entry["sequence"] = self._sequence
+            self._entries.append(entry)
+            self._by_level.setdefault(entry["level"], deque(maxlen=self.capacity)).append(entry)
+            self._by_component.setdefault(entry["component"], deque(maxlen=self.capacity)).append(entry)
+            self._condition.notify_all()
+        return entry
+    
+    def query(self, level: Optional[str] = None, component: Optional[str] = None, limit: int = 100,
+              after: int = 0) -> List[Dict[str, Any]]:
+        """The newest `limit` matching entries with a sequence above `after`, oldest first"""
+        
+        with self._condition:
+            candidates = self._candidates(level, component)
+            oldest = self._entries[0]["sequence"] if self._entries else 0
+            
+            matches = []
+            for entry in reversed(candidates):
+                if len(matches) >= limit or entry["sequence"] <= after or entry["sequence"] < oldest:
+                    break
+                if self._matches(entry, level, component):
+                    matches.append(entry)
+        
+        matches.reverse()
+        return matches
+    
+    def wait_for_entries(self, after: int, timeout: float, level: Optional[str] = None,
+                         component: Optional[str] = None, limit: int = 500) -> Tuple[List[Dict[str, Any]], int]:
+        """Block until entries newer than `after` arrive or the timeout passes
+        
+        Returns the matching entries and the sequence they were read up to, which
+        callers pass back as `after` so filtered-out entries aren't waited on again.
+        """
+        
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > after, timeout)
+            return self.query(level, component, limit, after), self._sequence
+    
+    def get_latest_sequence(self) -> int:
+        """Sequence number of the newest entry, 0 when empty"""
+        
+        with self._condition:
+            return self._sequence
+    
+    def get_components(self) -> List[str]:
+        """Components that have logged since startup"""
+        
+        with self._condition:
+            return sorted(self._by_component)
+    
+    def _candidates(self, level: Optional[str], component: Optional[str]) -> deque:
+        """Smallest index that covers the filters"""
+        
+        indexes = [self._entries]
+        if level is not None:
+            indexes.append(self._by_level.get(level, deque()))
+        if component is not None:
+            indexes.append(self._by_component.get(component, deque()))
+        return min(indexes, key=len)
+    
+    def _matches(self, entry: Dict[str, Any], level: Optional[str], component: Optional[str]) -> bool:
+        return (level is None or entry["level"] == level) and (component is None or entry["component"] == component)
+
+def record_to_entry(record: logging.LogRecord) -> Dict[str, Any]:
+    """Structured form of a log record"""
+    
+    name = record.name
+    component = name[len(LOGGER_PREFIX) + 1:] if name.startswith(LOGGER_PREFIX + ".") else name
+    entry = {
+        "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+        "level": record.levelname.lower(),
+        "component": component,
+        "message": record.getMessage(),
+        "details": getattr(record, "details", None) or {},
+        "hostname": getattr(record, "hostname", None) or socket.gethostname(),
+        "process": record.process,
+        "thread": record.threadName
+    }
+    exception_text = getattr(record, "exception_text", None)
+    if exception_text:
+        entry["exception"] = exception_text
+    return entry
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record_to_entry(record), default=str)
+
+class ConsoleFormatter(logging.Formatter):
+    """Readable single-line output for the terminal"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S')} {record.levelname:<7} " \
+               f"[{record_to_entry(record)['component']}] {record.getMessage()}"
+        exception_text = getattr(record, "exception_text", None)
+        return f"{line}\n{exception_text}" if exception_text else line
+
+class RingHandler(logging.Handler):
+    """Handler that adds records to a LogRing"""
+    
+    def __init__(self, ring: LogRing):
+        super().__init__()
+        self.ring = ring
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.ring.append(record_to_entry(record))
+        except Exception:
+            self.handleError(record)
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the message and traceback as separate fields
+    
+    The stock handler folds the traceback into the message; structured consumers
+    want them apart. Records are made picklable so they can cross process queues.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        prepared.hostname = socket.gethostname()
+        if record.exc_info:
+            prepared.exception_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        prepared.exc_info = None
+        prepared.exc_text = None
+        prepared.stack_info = None
+        return prepared
+
+class LoggingManager:
+    """Owns the per-process logging pipeline: queue, listener thread and output handlers
+    
+    Callers only ever put records on an in-memory queue; file writes and ring
+    inserts happen on the listener thread, so request threads never wait on disk.
+    """
+    
+    def __init__(self):
+        self.ring = LogRing(int(os.environ.get("PIPELINE_LOG_RING_SIZE", 5000)))
+        self._handlers: List[logging.Handler] = []
+        self._listeners: List[logging.handlers.QueueListener] = []
+        self._worker_queue = None
+        self._configured = False
+        self._lock = threading.Lock()
+    
+    def configure(self, log_dir: Optional[str] = None, log_file: str = "pipeline.log", level: Optional[str] = None,
+                  worker_queue: Optional[Any] = None):
+        """Install the queue handler on the pipeline logger; safe to call more than once
+        
+        With a worker_queue (a spawned worker process), records are forwarded to the
+        parent's listener instead of being written here. That replaces any local
+        setup done while the worker imported the parent's modules.
+        """
+        
+        with self._lock:
+            # Only a local setup has output handlers; a worker queue always takes over from it
+            if self._configured and not (worker_queue is not None and self._handlers):
+                return
+            
+            pipeline_logger = logging.getLogger(LOGGER_PREFIX)
+            pipeline_logger.setLevel((level or os.environ.get("PIPELINE_LOG_LEVEL", "info")).upper())
+            pipeline_logger.propagate = False
+            
+            if worker_queue is not None:
+                for handler in list(pipeline_logger.handlers):
+                    pipeline_logger.removeHandler(handler)
+                self.shutdown()
+                self._handlers = []
+                pipeline_logger.addHandler(StructuredQueueHandler(worker_queue))
+                self._configured = True
+                return
+            
+            if log_dir is None:
+                log_dir = os.path.join(os.getcwd(), "generated-assets", "logs")
+            os.makedirs(log_dir, exist_ok=True)
+            
+            file_handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, log_file), maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"
+            )
+            file_handler.setFormatter(JsonFormatter())
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(ConsoleFormatter())
+            self._handlers = [file_handler, RingHandler(self.ring), console_handler]
+            
+            local_queue = queue.SimpleQueue()
+            pipeline_logger.addHandler(StructuredQueueHandler(local_queue))
+            self._start_listener(local_queue)
+            atexit.register(self.shutdown)
+            self._configured = True
+    
+    def get_worker_queue(self, context) -> Any:
+        """Queue for spawned worker processes to log through this process's handlers"""
+        
+        with self._lock:
+            if self._worker_queue is None:
+                self._worker_queue = context.Queue()
+                self._start_listener(self._worker_queue)
+            return self._worker_queue
+    
+    def forward_to_parent(self, worker_queue: Any):
+        """In a forked worker: send records to the parent's listener, keeping a ring for this worker only
+        
+        The parent's listener threads don't exist after fork, so its local queue
+        would just fill up. The parent stays the one writer of the log file.
+        """
+        
+        pipeline_logger = logging.getLogger(LOGGER_PREFIX)
+        for handler in list(pipeline_logger.handlers):
+            pipeline_logger.removeHandler(handler)
+        
+        # A fresh ring and lock: the parent's could have been held by one of its threads at fork time
+        self.ring = LogRing(self.ring.capacity)
+        self._lock = threading.Lock()
+        self._handlers = []
+        self._listeners = []
+        self._worker_queue = None
+        pipeline_logger.addHandler(StructuredQueueHandler(worker_queue))
+        pipeline_logger.addHandler(RingHandler(self.ring))
+        self._configured = True
+    
+    def shutdown(self):
+        """Drain the queues and close the output handlers"""
+        
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+        for handler in self._handlers:
+            handler.close()
+    
+    def _start_listener(self, record_queue: Any):
+        listener = logging.handlers.QueueListener(record_queue, *self._handlers, respect_handler_level=True)
+        listener.start()
+        self._listeners.append(listener)
+
+_logging_manager = LoggingManager()
+
+def configure_logging(log_dir: Optional[str] = None, log_file: str = "pipeline.log", level: Optional[str] = None,
+                      worker_queue: Optional[Any] = None):
+    """Set up structured logging for this process"""
+    
+    _logging_manager.configure(log_dir, log_file, level, worker_queue)
+
+def get_logger(component: str) -> logging.Logger:
+    """Logger for a pipeline component; pass details with extra={"details": {...}}"""
+    
+    return logging.getLogger(f"{LOGGER_PREFIX}.{component}")
+
+def get_log_ring() -> LogRing:
+    """This process's in-memory log history"""
+    
+    return _logging_manager.ring
+
+def get_worker_log_queue(context) -> Any:
+    """Queue that spawned workers pass to configure_logging(worker_queue=...)"""
+    
+    return _logging_manager.get_worker_queue(context)
+
+def forward_logs_to_parent(worker_queue: Any):
+    """Switch a forked worker's logging over to its parent's worker queue"""
+    
+    _logging_manager.forward_to_parent(worker_queue)
@@ -3,7 +3,11 @@ Utility functions for media generation using actual AI tools
 """
 
 import os
-from typing import Dict, Any, Optional
+import wave
+from typing import Dict, Any, List, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger("media_tools")
 
 def generate_image(prompt: str, output_path: str, aspect_ratio: str = "square") -> bool:
     """Generate image using AI image generation tools"""
@@ -30,10 +34,10 @@ def generate_image(prompt: str, output_path: str, aspect_ratio: str = "square")
         return True
         
     except ImportError:
-        print(f"Media generation tool not available, creating placeholder for: {output_path}")
+        logger.warning(f"Media generation tool not available, creating placeholder for: {output_path}")
         return False
     except Exception as e:
-        print(f"Image generation failed: {e}")
+        logger.error(f"Image generation failed: {e}")
         return False
 
 def generate_audio(prompt: str, output_path: str, duration_seconds: float) -> bool:
@@ -54,10 +58,10 @@ def generate_audio(prompt: str, output_path: str, duration_seconds: float) -> bo
         return True
         
     except ImportError:
-        print(f"Audio generation tool not available, creating placeholder for: {output_path}")
+        logger.warning(f"Audio generation tool not available, creating placeholder for: {output_path}")
         return False
     except Exception as e:
-        print(f"Audio generation failed: {e}")
+        logger.error(f"Audio generation failed: {e}")
         return False
 
 def generate_speech(text: str, output_path: str, voice_settings: Dict[str, Any]) -> bool:
@@ -78,10 +82,10 @@ def generate_speech(text: str, output_path: str, voice_settings: Dict[str, Any])
         return True
         
     except ImportError:
-        print(f"Speech generation tool not available, creating placeholder for: {output_path}")
+        logger.warning(f"Speech generation tool not available, creating placeholder for: {output_path}")
         return False
     except Exception as e:
-        print(f"Speech generation failed: {e}")
+        logger.error(f"Speech generation failed: {e}")
         return False
 
 def generate_video(prompt: str, output_path: str, duration_seconds: float, 
@@ -105,42 +109,108 @@ def generate_video(prompt: str, output_path: str, duration_seconds: float,
         return True
         
     except ImportError:
-        print(f"Video generation tool not available, creating placeholder for: {output_path}")
+        logger.warning(f"Video generation tool not available, creating placeholder for: {output_path}")
         return False
     except Exception as e:
-        print(f"Video generation failed: {e}")
+        logger.error(f"Video generation failed: {e}")
         return False
 
 def combine_video_assets(visual_assets: list, audio_assets: list, 
                         output_path: str, timeline: Dict[str, Any]) -> bool:
-    """Combine visual and audio assets into final video"""
+    """Combine visual and audio assets into final video
+    
+    The timeline is an assembly plan as built by VideoAssembler. When it has no
+    scenes or audio timeline, the given assets are laid out evenly instead.
+    """
     
     try:
-        # Use ffmpeg or similar tool to combine assets
-        import subprocess
-        
-        # Build ffmpeg command based on timeline
-        # This is a simplified version - production would be more complex
-        
-        cmd = [
-            'ffmpeg',
-            '-y',  # Overwrite output file
-            '-f', 'lavfi',
-            '-i', 'color=c=blue:size=1920x1080:d=10',  # Placeholder video
-            '-c:v', 'libx264',
-            '-t', '10',
-            output_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        from src.services.video_assembler import FilterGraphRenderer
+        from src.utils.audio_mixer import AudioMixer
+        
+        assembly_plan = dict(timeline)
+        duration_seconds = float(timeline.get("duration_seconds", 10))
+        
+        if not assembly_plan.get("scenes"):
+            visual_paths = [getattr(asset, "file_path", asset) for asset in visual_assets]
+            scene_duration = duration_seconds / max(1, len(visual_paths))
+            assembly_plan["scenes"] = [
+                {"duration_seconds": scene_duration, "background_path": path}
+                for path in visual_paths
+            ] or [{"duration_seconds": duration_seconds}]
+        
+        if not assembly_plan.get("audio_timeline"):
+            assembly_plan["audio_timeline"] = [
+                {
+                    "source_path": getattr(asset, "file_path", asset),
+                    "start_time": 0,
+                    "duration": duration_seconds,
+                    "volume": 1.0
+                }
+                for asset in audio_assets
+            ]
+        
+        renderer = FilterGraphRenderer(timeline.get("rendering_settings", {}))
+        mix_path = f"{output_path}.mix.wav"
+        try:
+            mix_result = AudioMixer().mix(assembly_plan["audio_timeline"],
+                                          renderer.get_plan_duration(assembly_plan), mix_path)
+            result = renderer.render(assembly_plan, output_path,
+                                     audio_path=mix_path if mix_result["written"] else None)
+        finally:
+            if os.path.exists(mix_path):
+                os.remove(mix_path)
+        
+        if result["success"]:
             return True
         else:
-            print(f"Video combination failed: {result.stderr}")
+            logger.error(f"Video combination failed: {result['error']}")
             return False
             
     except Exception as e:
-        print(f"Video combination failed: {e}")
+        logger.error(f"Video combination failed: {e}")
         return False
 
+def get_wav_duration(file_path: str) -> Optional[float]:
+    """Measure the duration of a WAV file from its header"""
+    
+    try:
+        with wave.open(file_path, 'rb') as wav_file:
+            frame_rate = wav_file.getframerate()
+            if frame_rate <= 0:
+                return None
+            return wav_file.getnframes() / float(frame_rate)
+    except (OSError, EOFError, wave.Error):
+        return None
+
+def concatenate_wav_files(input_paths: List[str], output_path: str) -> bool:
+    """Concatenate WAV files that share the same sample format into one file"""
+    
+    if not input_paths:
+        return False
+    
+    temp_path = f"{output_path}.partial"
+    
+    try:
+        with wave.open(input_paths[0], 'rb') as first_file:
+            params = first_file.getparams()
+        
+        with wave.open(temp_path, 'wb') as output_file:
+            output_file.setparams(params)
+            
+            for input_path in input_paths:
+                with wave.open(input_path, 'rb') as input_file:
+                    if (input_file.getnchannels() != params.nchannels or
+                            input_file.getsampwidth() != params.sampwidth or
+                            input_file.getframerate() != params.framerate):
+                        raise wave.Error(f"Sample format mismatch in {input_path}")
+                    output_file.writeframes(input_file.readframes(input_file.getnframes()))
+        
+        # Publish atomically so readers never see a half-written narration
+        os.replace(temp_path, output_path)
+        return True
+        
+    except (OSError, EOFError, wave.Error) as e:
+        logger.error(f"Audio concatenation failed: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
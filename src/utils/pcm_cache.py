@@ -0,0 +1,172 @@
+"""
+Decoded Audio Cache
+Stores decoded PCM as memory-mapped .npy files keyed by source content hash
+"""
+
+import os
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from src.utils.audio_mixer import decode_audio
+from src.utils.logger import get_logger
+
+logger = get_logger("pcm_cache")
+
+# Decoded float32 stereo is about 21 MB per minute, so this holds roughly 50 minutes of audio
+DEFAULT_MAX_TOTAL_BYTES = 1024 * 1024 * 1024
+
+class PCMCache:
+    """Decode each reused audio source once and serve its samples zero-copy from the page cache
+    
+    Only files under reusable_dirs (sound effects, music beds) are cached;
+    anything else, such as a video's one-off narration, is decoded directly,
+    so the cache never fills up with audio that will not be read again.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None, sample_rate: int = 44100, channels: int = 2,
+                 reusable_dirs: Optional[List[str]] = None, max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.getcwd(), "generated-assets", "audio", "pcm_cache")
+        self.cache_dir = cache_dir
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.reusable_dirs = [os.path.abspath(directory) for directory in reusable_dirs or []]
+        self.max_total_bytes = max_total_bytes
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "uncached": 0, "decode_failures": 0, "pruned": 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def is_reusable(self, file_path: str) -> bool:
+        """Whether a source lives under one of the reusable directories"""
+        
+        path = os.path.abspath(file_path)
+        return any(os.path.commonpath([directory, path]) == directory for directory in self.reusable_dirs)
+    
+    def load(self, file_path: str) -> Optional[np.ndarray]:
+        """Get read-only (frames, channels) float32 samples for an audio file"""
+        
+        if not os.path.exists(file_path):
+            return None
+        
+        if not self.is_reusable(file_path):
+            samples = decode_audio(file_path, self.sample_rate, self.channels)
+            with self._lock:
+                self.stats["uncached" if samples is not None else "decode_failures"] += 1
+            return samples
+        
+        cache_path = self._get_cache_path(file_path)
+        
+        if os.path.exists(cache_path):
+            with self._lock:
+                self.stats["hits"] += 1
+            return np.load(cache_path, mmap_mode='r')
+        
+        samples = decode_audio(file_path, self.sample_rate, self.channels)
+        if samples is None:
+            with self._lock:
+                self.stats["decode_failures"] += 1
+            return None
+        
+        # Write under a unique name and rename, so concurrent decoders never collide
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.partial"
+        try:
+            with open(temp_path, 'wb') as temp_file:
+                np.save(temp_file, np.ascontiguousarray(samples, dtype=np.float32))
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            # A full disk shouldn't fail the mix; use the decoded samples uncached
+            logger.warning(f"PCM cache write failed for {file_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return samples
+        
+        with self._lock:
+            self.stats["misses"] += 1
+        pruned = self.prune(self.max_total_bytes, keep=cache_path)
+        if pruned:
+            with self._lock:
+                self.stats["pruned"] += pruned
+        return np.load(cache_path, mmap_mode='r')
+    
+    def warm(self, file_paths: List[str]) -> Dict[str, bool]:
+        """Decode a set of frequently reused sources ahead of time"""
+        
+        return {file_path: self.load(file_path) is not None for file_path in file_paths}
+    
+    def prune(self, max_total_bytes: int, keep: Optional[str] = None) -> int:
+        """Remove least recently used entries (other than keep) until the cache fits in max_total_bytes"""
+        
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_bytes <= max_total_bytes:
+                break
+            if path == keep:
+                continue
+            # Arrays already memory-mapped from a removed entry stay readable until released
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+        
+        return removed
+    
+    def get_cache_info(self) -> Dict[str, Any]:
+        """Summarize cache contents and hit rate"""
+        
+        sizes = [
+            os.path.getsize(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir) if name.endswith(".npy")
+        ]
+        lookups = self.stats["hits"] + self.stats["misses"]
+        
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(sizes),
+            "total_bytes": sum(sizes),
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+            **self.stats
+        }
+    
+    def _get_cache_path(self, file_path: str) -> str:
+        """Map a source file to its cache entry via its content hash"""
+        
+        digest = self._get_content_digest(file_path)
+        return os.path.join(self.cache_dir, f"{digest}_{self.sample_rate}_{self.channels}.npy")
+    
+    def _get_content_digest(self, file_path: str) -> str:
+        """Hash file contents, remembering the digest while the file is unchanged"""
+        
+        stat = os.stat(file_path)
+        identity = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        
+        with self._lock:
+            digest = self._digests.get(identity)
+        if digest:
+            return digest
+        
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as source_file:
+            for chunk in iter(lambda: source_file.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()[:32]
+        
+        with self._lock:
+            self._digests[identity] = digest
+        return digest